@@ -15,6 +15,11 @@ if current_dir not in sys.path:
 
 from api_client import GroqClient
 from chat_ui import ChatUI
+from http_pool import RequestQueue
+from context_builder import ContextBuilder
+from history_store import HistoryStore
+
+HISTORY_PAGE = 100 # Mensagens carregadas na inicialização e a cada página ao rolar para cima
 
 class AIChatPlugin:
     def __init__(self):
@@ -23,17 +28,23 @@ class AIChatPlugin:
         self.config_file = os.path.join(current_dir, "config.json")
         self.config = self.load_config()
         self.api_key = self.config.get("api_key", "")
-        self.client = GroqClient(self.api_key)
+        self.client = GroqClient(self.api_key, self.config.get("api_url"))
+        self.requests = RequestQueue(workers=1, maxsize=4) # Pedidos à API (sem uma thread por mensagem)
+        self.context_builder = ContextBuilder()
+        self.context_budget = self.config.get("context_token_budget", 3000) # Tokens de código por pedido
         self.ui_component = ChatUI()
         self.context = None
         self.is_processing = False
+        self.streaming = False # Já chegou texto: a mensagem parcial substitui o spinner
         self.temperature = 0.7
         self.send_context = True
         self.custom_system_prompt = None
-        self.history_file = os.path.join(current_dir, "chat_history.json")
+        self.history_file = os.path.join(current_dir, "chat_history.json") # Formato antigo (migrado)
+        self.history_store = HistoryStore(os.path.join(current_dir, "chat_history.jsonl"), self.history_file)
         
         # Configura callback e carrega histórico
         self.ui_component.on_message_added = self.save_chat_history_internal
+        self.ui_component.load_older = self.load_older_history
         self.load_chat_history()
         self.personas_file = os.path.join(current_dir, "personas.json")
         self.personas = self.load_personas()
@@ -102,20 +113,24 @@ class AIChatPlugin:
         except: pass
 
     def load_chat_history(self):
-        if os.path.exists(self.history_file):
-            try:
-                with open(self.history_file, 'r') as f:
-                    data = json.load(f)
-                    self.ui_component.history = [(item['role'], item['content']) for item in data]
-                    self.ui_component.scroll_offset = 0
-            except: pass
-
-    def save_chat_history_internal(self):
-        data = [{"role": r, "content": c} for r, c in self.ui_component.history]
-        try:
-            with open(self.history_file, 'w') as f:
-                json.dump(data, f)
-        except: pass
+        """Carrega só a página mais recente; as anteriores vêm ao rolar para cima."""
+        store = self.history_store
+        start = max(0, store.count - HISTORY_PAGE)
+        self.ui_component.set_history(store.read(start, store.count), start)
+
+    def load_older_history(self):
+        ui = self.ui_component
+        if ui.older_count <= 0:
+            return False
+        start = max(0, ui.older_count - HISTORY_PAGE)
+        older = self.history_store.read(start, ui.older_count)
+        ui.prepend_messages(older)
+        ui.older_count = start
+        return bool(older)
+
+    def save_chat_history_internal(self, message):
+        """Mensagem nova: uma linha no fim do log (nada é reescrito)."""
+        self.history_store.append(*message)
 
     def draw(self, stdscr, x, y, h, w):
         """Delega o desenho para o componente de UI."""
@@ -129,7 +144,7 @@ class AIChatPlugin:
                 self.ui.stdscr.timeout(-1) # Blocking (padrão)
             except: pass
             
-        self.ui_component.draw(stdscr, x, y, h, w, self.is_visible, self.is_processing)
+        self.ui_component.draw(stdscr, x, y, h, w, self.is_visible, self.is_processing and not self.streaming)
         if self.menu_active:
             self.ui_component.draw_menu(stdscr, x, y, h, w, self.menu_options, self.menu_index)
 
@@ -144,13 +159,15 @@ class AIChatPlugin:
             self.menu_index = 0
             return
 
+        if key == 3 and self.is_processing: # Ctrl+C - Cancela a resposta em andamento (Esc tira o foco)
+            self.client.cancel()
+            return
+
         if key in (10, 13): # Enter (13), Ctrl+J (10)
             message = self.ui_component.input_buffer.strip()
             if message:
                 # Se houver texto, envia a mensagem
-                self.ui_component.input_buffer = ""
-                self.ui_component.add_message("user", message)
-                self.process_command(message)
+                self.send_input(message)
         elif key == 263 or key == 127 or key == 8: # Backspace
             self.ui_component.input_buffer = self.ui_component.input_buffer[:-1]
         elif isinstance(key, int) and 32 <= key <= 126:
@@ -178,27 +195,43 @@ class AIChatPlugin:
         if action == "send":
             message = self.ui_component.input_buffer.strip()
             if message:
-                self.ui_component.input_buffer = ""
-                self.ui_component.add_message("user", message)
-                self.process_command(message)
+                self.send_input(message)
         elif action == "cancel":
             pass
         elif action.startswith("/"):
             # Comandos que precisam de argumentos apenas preenchem o input
             if action in ["/files", "/read", "/exec", "/apikey", "/persona", "/save", "/export", "/model", "/temp", "/system"]:
                 self.ui_component.input_buffer = action + " "
+            elif self.is_processing:
+                if action == "/cancel":
+                    self.client.cancel()
             else:
                 # Comandos diretos executam imediatamente
                 self.process_command(action)
 
+    def send_input(self, message):
+        """
+        Mensagem ou comando digitado. Com uma resposta chegando só /cancel é aceito (o texto
+        fica no input): o que entrasse no meio do stream iria para o log antes da resposta,
+        e /undo ou /reset mexeriam nos registros errados.
+        """
+        if self.is_processing:
+            if message.split()[0].lower() == '/cancel':
+                self.ui_component.input_buffer = ""
+                self.client.cancel()
+            return
+        self.ui_component.input_buffer = ""
+        self.ui_component.add_message("user", message)
+        self.process_command(message)
+
     def process_command(self, user_input):
         """Envia contexto do editor e input do usuário para a IA."""
         # Comandos locais
         if user_input.startswith('/'):
             cmd = user_input.split()[0].lower()
             if cmd in ('/clear', '/reset'):
-                self.ui_component.history = []
-                self.ui_component.scroll_offset = 0
+                self.history_store.clear()
+                self.ui_component.set_history([])
                 self.ui_component.add_message("system", "Chat limpo.")
             elif cmd == '/apply':
                 # /apply [index] [all]
@@ -213,8 +246,13 @@ class AIChatPlugin:
                 self.apply_code_block(index, mode)
             elif cmd == '/copy':
                 self.copy_last_message()
+            elif cmd == '/cancel':
+                if self.is_processing:
+                    self.client.cancel()
+                else:
+                    self.ui_component.add_message("system", "Nenhuma resposta em andamento.")
             elif cmd == '/help':
-                help_text = "Comandos:\n/apikey - Config Key\n/persona - Personas\n/apply - Aplicar\n/copy - Copiar\n/reset - Reiniciar\n/files - Listar"
+                help_text = "Comandos:\n/apikey - Config Key\n/persona - Personas\n/apply - Aplicar\n/copy - Copiar\n/cancel - Cancelar resposta (Ctrl+C)\n/reset - Reiniciar\n/files - Listar"
                 self.ui_component.add_message("system", help_text)
             elif cmd == '/files':
                 self.list_files(user_input)
@@ -247,8 +285,8 @@ class AIChatPlugin:
             elif cmd == '/undo':
                 if len(self.ui_component.history) >= 2:
                     # Remove User e AI (últimos 2)
-                    self.ui_component.history.pop()
-                    self.ui_component.history.pop()
+                    self.ui_component.pop_messages(2)
+                    self.history_store.pop(2)
                     self.ui_component.scroll_offset = 0
                     self.ui_component.add_message("system", "Última interação desfeita.")
                 else:
@@ -271,7 +309,8 @@ class AIChatPlugin:
             elif cmd == '/stats':
                 stats = (f"Modelo: {self.client.model}\n"
                          f"Temp: {self.temperature}\n"
-                         f"Contexto: {'ON' if self.send_context else 'OFF'}")
+                         f"Contexto: {'ON' if self.send_context else 'OFF'}\n"
+                         f"{self.client.stats()}")
                 self.ui_component.add_message("system", stats)
             elif cmd == '/insert':
                 # Força inserção no cursor (bypass smart replace)
@@ -299,21 +338,10 @@ class AIChatPlugin:
             self.ui_component.add_message("system", "Nenhum editor ativo.")
             return
 
-        # Captura o código atual
-        # Truncamento para evitar erro de Rate Limit (TPM)
-        # Limita o contexto a cerca de 150 linhas ao redor do cursor
-        limit_lines = 150
-        total_lines = len(editor.lines)
+        # Captura o código atual dentro do orçamento de tokens (seleção, cursor e símbolos do pedido)
         code_context = ""
-        
         if self.send_context:
-            if total_lines > limit_lines:
-                start = max(0, editor.cy - (limit_lines // 2))
-                end = min(total_lines, start + limit_lines)
-                if end - start < limit_lines: start = max(0, end - limit_lines)
-                code_context = f"# ... (Truncado: linhas {start+1}-{end} de {total_lines}) ...\n" + "\n".join(editor.lines[start:end]) + "\n# ..."
-            else:
-                code_context = "\n".join(editor.lines)
+            code_context, _ = self.context_builder.editor_context(editor, self.context_budget, user_input)
             
         cursor_info = f"Cursor na linha {editor.cy + 1}, coluna {editor.cx + 1}."
         
@@ -333,15 +361,44 @@ class AIChatPlugin:
             {"role": "user", "content": (f"Código Atual:\n```\n{code_context}\n```\n\n{cursor_info}\n\n" if self.send_context else "") + f"Pedido: {user_input}"}
         ]
 
+        self._submit(messages)
+
+    def _submit(self, messages):
+        """Põe o pedido na fila de requisições (fora da thread da UI). Um pedido por vez."""
+        if self.is_processing:
+            return
         self.is_processing = True
-        
-        # Thread para não travar a UI
-        threading.Thread(target=self._api_call, args=(messages,)).start()
+        if not self.requests.submit(self._api_call, messages):
+            self.is_processing = False
+            self.ui_component.add_message("system", "Fila de requisições cheia. Tente de novo.")
 
     def _api_call(self, messages):
-        response = self.client.send_message(messages, temperature=self.temperature)
-        self.ui_component.add_message("assistant", response)
-        self.is_processing = False
+        # Stream: a resposta aparece conforme chega (atualizações limitadas pelo throttle do cliente)
+        state = {'message': None, 'gone': False}
+
+        def on_delta(text):
+            ui = self.ui_component
+            if state['gone']:
+                return
+            if state['message'] is None:
+                state['message'] = ui.append_message("assistant", text)
+                ui.scroll_offset = 0
+                self.streaming = True
+            else:
+                state['message'] = ui.replace_message(state['message'], "assistant", text)
+                state['gone'] = state['message'] is None # Histórico limpo no meio do stream
+
+        try:
+            response = self.client.stream_message(messages, temperature=self.temperature, on_delta=on_delta)
+            if state['gone']:
+                pass # A mensagem não está mais no histórico: não vai para o log
+            elif state['message'] is None:
+                self.ui_component.add_message("assistant", response) # Erro antes do primeiro pedaço
+            elif self.ui_component.on_message_added:
+                self.ui_component.on_message_added(state['message']) # Persiste a mensagem completa
+        finally:
+            self.streaming = False
+            self.is_processing = False
         # Força refresh da UI se possível (no loop principal isso acontece naturalmente)
 
     def manage_persona(self, user_input):
@@ -584,6 +641,7 @@ class AIChatPlugin:
 
     def read_file_content(self, user_input):
         """Lê arquivo e envia para a IA."""
+        if self.is_processing: return
         args = user_input.split(' ', 1)
         if len(args) < 2:
             self.ui_component.add_message("system", "Uso: /read [arquivo]")
@@ -604,22 +662,20 @@ class AIChatPlugin:
             return
 
         try:
-            with open(path, 'r', encoding='utf-8', errors='replace') as f:
-                content = f.read()
+            # O arquivo lido fica com a maior parte do orçamento; o editor ativo com o resto
+            file_budget = self.context_budget * 7 // 10 if self.send_context else self.context_budget
+            content, file_tokens = self.context_builder.file_context(path, file_budget)
             
             self.ui_component.add_message("user", f"/read {filename}")
-            self.ui_component.add_message("system", f"Lendo '{filename}' ({len(content)} chars)...")
+            self.ui_component.add_message("system", f"Lendo '{filename}' (~{file_tokens} tokens)...")
             
             # Prepara contexto
             editor = self.get_active_editor()
             code_context = ""
             if self.send_context and editor:
-                # Contexto do editor (truncado)
-                limit_lines = 100
-                if len(editor.lines) > limit_lines:
-                    code_context = f"# Contexto Editor (Truncado):\n" + "\n".join(editor.lines[:limit_lines]) + "\n...\n\n"
-                else:
-                    code_context = f"# Contexto Editor:\n" + "\n".join(editor.lines) + "\n\n"
+                editor_text, _ = self.context_builder.editor_context(editor, self.context_budget - file_tokens)
+                if editor_text:
+                    code_context = f"# Contexto Editor:\n{editor_text}\n\n"
 
             prompt = f"Conteúdo do arquivo '{filename}':\n```\n{content}\n```\n\nAnalise este arquivo."
             final_content = f"{code_context}{prompt}"
@@ -629,8 +685,7 @@ class AIChatPlugin:
                 {"role": "user", "content": final_content}
             ]
             
-            self.is_processing = True
-            threading.Thread(target=self._api_call, args=(messages,)).start()
+            self._submit(messages)
 
         except Exception as e:
             self.ui_component.add_message("system", f"Erro: {e}")
@@ -660,7 +715,7 @@ class AIChatPlugin:
             full_path = os.path.join(base_path, filename)
             with open(full_path, 'w', encoding='utf-8') as f:
                 f.write(f"Log de Chat - {self.name}\n{'='*30}\n\n")
-                for role, text in self.ui_component.history:
+                for role, text in self.history_store.read_all(): # Inclui as páginas não carregadas
                     f.write(f"[{role.upper()}]:\n{text}\n{'-'*20}\n")
             self.ui_component.add_message("system", f"Salvo em: {filename}")
         except Exception as e:
@@ -672,7 +727,7 @@ class AIChatPlugin:
             base_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
             full_path = os.path.join(base_path, filename)
             with open(full_path, 'w', encoding='utf-8') as f:
-                for role, text in self.ui_component.history:
+                for role, text in self.history_store.read_all():
                     if role == 'assistant':
                         blocks = re.findall(r'```(?:\w+)?\n(.*?)```', text, re.DOTALL)
                         for block in blocks:
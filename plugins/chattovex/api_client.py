@@ -1,42 +1,136 @@
 # /home/johnb/tasma-code-absulut/plugins/chattovex/api_client.py
 import json
-import urllib.request
-import urllib.error
+import time
+import threading
+from http_pool import ConnectionPool, HTTPError
+
+DEFAULT_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+
 
 class GroqClient:
-    def __init__(self, api_key):
+    def __init__(self, api_key, api_url=None):
         self.api_key = api_key
-        self.api_url = "https://api.groq.com/openai/v1/chat/completions"
+        # api_url configurável (config.json) permite apontar para outro servidor compatível
+        self.api_url = api_url or DEFAULT_API_URL
         self.model = "llama-3.3-70b-versatile" # Modelo atualizado
+        self.streams = [] # Streams em andamento: {'cancel': Event, 'response': PooledResponse ou None}
+        self.lock = threading.Lock()
+        self.pool = None # Conexões keep-alive (recriado se api_url mudar)
 
-    def send_message(self, messages, temperature=0.7):
-        """Envia mensagens para a API e retorna a resposta."""
+    def get_pool(self):
+        if self.pool is None or self.pool_url != self.api_url:
+            if self.pool is not None:
+                self.pool.close()
+            self.pool = ConnectionPool(self.api_url)
+            self.pool_url = self.api_url
+        return self.pool
+
+    def _request(self, messages, temperature, stream=False, cancel_event=None):
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}",
             "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         }
-        
+
         data = {
             "model": self.model,
             "messages": messages,
             "temperature": temperature
         }
-        
+        if stream:
+            data["stream"] = True
+            headers["Accept"] = "text/event-stream"
+
+        # Novas tentativas (429/5xx) e keep-alive ficam no pool
+        return self.get_pool().request("POST", json.dumps(data).encode('utf-8'), headers, cancel_event)
+
+    def _error_text(self, e):
+        if isinstance(e, HTTPError):
+            return f"Erro API: {e.status} - {e.body or e.reason}"
+        return f"Erro: {str(e)}"
+
+    def send_message(self, messages, temperature=0.7):
+        """Envia mensagens para a API e retorna a resposta."""
+        try:
+            response = self._request(messages, temperature)
+            result = json.loads(response.read().decode('utf-8'))
+            return result['choices'][0]['message']['content']
+        except Exception as e:
+            return self._error_text(e)
+
+    def stream_message(self, messages, temperature=0.7, on_delta=None, throttle=0.1):
+        """
+        Pede a resposta com stream=True e lê os server-sent events ("data: {...}") conforme chegam.
+        on_delta(texto_até_agora) é chamado no máximo a cada 'throttle' segundos (e no final).
+        Retorna o texto completo; cancel() interrompe e devolve o que já chegou.
+        """
+        cancel_event = threading.Event() # Um por pedido: cancelar um stream não afeta o próximo
+        stream = {'cancel': cancel_event, 'response': None}
+        with self.lock:
+            self.streams.append(stream)
+        parts = []
+        last_update = 0.0
+        response = None
+        done = False
         try:
-            req = urllib.request.Request(
-                self.api_url, 
-                data=json.dumps(data).encode('utf-8'), 
-                headers=headers
-            )
-            with urllib.request.urlopen(req) as response:
-                result = json.loads(response.read().decode('utf-8'))
-                return result['choices'][0]['message']['content']
-        except urllib.error.HTTPError as e:
-            try:
-                error_body = e.read().decode('utf-8')
-                return f"Erro API: {e.code} - {error_body}"
-            except:
-                return f"Erro API: {e.code} - {e.reason}"
+            response = self._request(messages, temperature, stream=True, cancel_event=cancel_event)
+            stream['response'] = response
+            if cancel_event.is_set():
+                response.abort() # cancel() chegou durante a conexão
+            for raw in response:
+                if cancel_event.is_set():
+                    break
+                line = raw.decode('utf-8', 'replace').strip()
+                if not line.startswith("data:"):
+                    continue # Linhas vazias, comentários (": ping") e "event:"
+                payload = line[5:].strip()
+                if payload == "[DONE]":
+                    done = True
+                    break
+                try:
+                    chunk = json.loads(payload)
+                except ValueError:
+                    continue
+                if chunk.get("error"):
+                    return f"Erro API: {chunk['error']}"
+                for choice in chunk.get("choices", []):
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        parts.append(delta)
+                now = time.time()
+                if on_delta and parts and now - last_update >= throttle:
+                    last_update = now
+                    on_delta("".join(parts))
+            if done:
+                response.read() # Termina o corpo: a conexão volta ao pool para o próximo pedido
         except Exception as e:
-            return f"Erro: {str(e)}"
+            if not cancel_event.is_set():
+                partial = "".join(parts)
+                return (partial + "\n\n" if partial else "") + self._error_text(e)
+        finally:
+            with self.lock:
+                self.streams.remove(stream)
+            if response is not None and not response.closed:
+                response.abort()
+                response.close()
+
+        text = "".join(parts)
+        if cancel_event.is_set():
+            text += "\n[cancelado]"
+        if on_delta:
+            on_delta(text)
+        return text
+
+    def cancel(self):
+        """Interrompe os streams em andamento (pode ser chamado de outra thread)."""
+        with self.lock:
+            streams = list(self.streams)
+        for stream in streams:
+            stream['cancel'].set()
+            response = stream['response']
+            if response is not None:
+                # Fechar só a resposta não acorda uma leitura parada esperando o servidor
+                response.abort()
+
+    def stats(self):
+        return self.pool.metrics.summary() if self.pool is not None else "Nenhuma requisição ainda."
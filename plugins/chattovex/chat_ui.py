@@ -2,23 +2,73 @@
 import curses
 import textwrap
 import time
+import bisect
 
 class ChatUI:
     def __init__(self):
-        self.history = [] # Lista de (role, text)
+        self.history = [] # Lista de (role, text); alterar só pelos métodos abaixo (contam a geração)
+        self.generation = 0 # Muda a cada alteração do histórico; o layout compara com a sua
         self.input_buffer = ""
         self.scroll_offset = 0
         self.spinner_frames = ["⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏"]
-        self.on_message_added = None # Callback para persistência
+        self.on_message_added = None # Callback para persistência: on_message_added(mensagem)
+        self.older_count = 0 # Mensagens mais antigas que ainda estão só no disco
+        self.load_older = None # Callback que põe a página anterior no começo do histórico
+        self.at_top = False # A primeira linha carregada está visível (último draw)
+        # Cache de layout: (mensagem, largura) -> linhas já quebradas. A mensagem é a própria
+        # tupla (role, text) do histórico; trocar o texto (streaming) gera uma tupla nova.
+        self.layout_cache = {}
+        self.layout_cache_limit = 2048
+        self.layout_width = None
+        self.layout_generation = None # Geração do histórico que o layout atual representa
+        self.layout_messages = [] # Mensagens na ordem em que estão no layout
+        self.layout_blocks = [] # Linhas de cada mensagem
+        self.layout_ends = [] # Contagem acumulada de linhas (fim de cada bloco)
 
     def add_message(self, role, text):
-        self.history.append((role, text))
+        message = self.append_message(role, text)
         if self.on_message_added:
-            self.on_message_added()
+            self.on_message_added(message)
         # Auto-scroll para o final
         self.scroll_offset = 0 
 
+    def append_message(self, role, text):
+        """Põe a mensagem no fim sem persistir (a resposta em streaming começa assim)."""
+        message = (role, text)
+        self.history.append(message)
+        self.generation += 1
+        return message
+
+    def replace_message(self, old, role, text):
+        """Troca uma mensagem (streaming) sem persistir. Retorna a nova, ou None se ela sumiu (/reset)."""
+        for i in range(len(self.history) - 1, -1, -1):
+            if self.history[i] is old:
+                message = (role, text)
+                self.history[i] = message
+                self.generation += 1
+                return message
+        return None
+
+    def set_history(self, messages, older_count=0):
+        """Troca o histórico inteiro (carga inicial, /reset)."""
+        self.history = list(messages)
+        self.older_count = older_count
+        self.scroll_offset = 0
+        self.generation += 1
+
+    def prepend_messages(self, messages):
+        """Página mais antiga lida do disco vai para o começo."""
+        self.history[:0] = messages
+        self.generation += 1
+
+    def pop_messages(self, n):
+        """Remove as n últimas mensagens (/undo)."""
+        del self.history[max(0, len(self.history) - n):]
+        self.generation += 1
+
     def scroll_up(self):
+        if self.at_top and self.older_count > 0 and self.load_older:
+            self.load_older() # O scroll conta a partir do fim: a tela não pula
         self.scroll_offset += 1
 
     def scroll_down(self):
@@ -47,65 +97,17 @@ class ChatUI:
         chat_height = h - input_height - 1
         chat_width = w - 3 # Margem esquerda (2) + direita (1)
 
-        # 4. Construção do Buffer Virtual de Linhas
-        lines_buffer = [] # (texto, atributo, alinhamento_direita)
-        
-        temp_history = list(self.history)
+        # 4. Layout incremental: só mensagens novas ou alteradas são quebradas
+        self._sync_layout(chat_width)
+        blocks = self.layout_blocks
+        extra = []
         if is_processing:
             frame = self.spinner_frames[int(time.time() * 10) % len(self.spinner_frames)]
-            temp_history.append(("system", f"{frame} Pensando..."))
-
-        for role, text in temp_history:
-            is_user = (role == "user")
-            is_system = (role == "system")
-            
-            # Configuração de Estilo
-            if is_user:
-                header = "You"
-                header_attr = curses.color_pair(2) | curses.A_BOLD
-                align_right = True
-            elif is_system:
-                header = "System"
-                header_attr = curses.color_pair(3) | curses.A_BOLD
-                align_right = False
-            else:
-                header = "AI"
-                header_attr = curses.color_pair(6) | curses.A_BOLD
-                align_right = False
-
-            # Adiciona Cabeçalho da Mensagem
-            lines_buffer.append((f"[{header}]", header_attr, align_right))
-
-            # Processa Conteúdo
-            raw_lines = text.splitlines()
-            in_code = False
-            
-            for line in raw_lines:
-                # Detecção de bloco de código
-                if line.strip().startswith("```"):
-                    in_code = not in_code
-                    lines_buffer.append(("─" * chat_width, curses.color_pair(0) | curses.A_DIM, False))
-                    continue
-                
-                # Atributos da linha
-                line_attr = curses.color_pair(0)
-                if in_code:
-                    line_attr = curses.color_pair(3) # Amarelo para código
-                elif is_system:
-                    line_attr = curses.color_pair(3) | curses.A_DIM
-
-                # Quebra de linha (Word Wrap)
-                wrapped = textwrap.wrap(line, chat_width)
-                if not wrapped: wrapped = [""]
-                
-                for wrapped_line in wrapped:
-                    lines_buffer.append((wrapped_line, line_attr, False)) # Conteúdo sempre à esquerda para leitura
-
-            # Espaçador entre mensagens
-            lines_buffer.append(("", 0, False))
+            extra = self._message_lines("system", f"{frame} Pensando...", chat_width)
 
         # 5. Lógica de Scroll e Renderização
-        total_lines = len(lines_buffer)
+        laid_out = self.layout_ends[-1] if self.layout_ends else 0
+        total_lines = laid_out + len(extra)
         
         # Clamp scroll
         max_scroll = max(0, total_lines - chat_height)
@@ -119,8 +121,16 @@ class ChatUI:
         
         render_y = y + 1
         
+        # Acha o bloco da primeira linha visível pelas contagens acumuladas
+        block_idx = bisect.bisect_right(self.layout_ends, start_idx)
         for i in range(start_idx, end_idx):
-            text, attr, align_right = lines_buffer[i]
+            if i < laid_out:
+                while self.layout_ends[block_idx] <= i:
+                    block_idx += 1
+                block_start = self.layout_ends[block_idx - 1] if block_idx else 0
+                text, attr, align_right = blocks[block_idx][i - block_start]
+            else:
+                text, attr, align_right = extra[i - laid_out]
             
             draw_x = x + 2
             if align_right:
@@ -132,11 +142,13 @@ class ChatUI:
             except: pass
             render_y += 1
 
+        self.at_top = start_idx == 0
+
         # Indicadores de Scroll
         if self.scroll_offset > 0:
             try: stdscr.addch(y + h - input_height - 1, x + w - 1, 'v', curses.color_pair(0) | curses.A_BOLD)
             except: pass
-        if start_idx > 0:
+        if start_idx > 0 or self.older_count > 0:
              try: stdscr.addch(y + 1, x + w - 1, '^', curses.color_pair(0) | curses.A_BOLD)
              except: pass
 
@@ -167,6 +179,90 @@ class ChatUI:
                         stdscr.addch(input_y + 1, cursor_x, '█', curses.color_pair(0))
         except: pass
 
+    def _sync_layout(self, width):
+        """Atualiza o layout para o histórico atual reaproveitando o prefixo que não mudou."""
+        if width != self.layout_width:
+            self.layout_width = width
+            self.layout_generation = None
+            self.layout_messages, self.layout_blocks, self.layout_ends = [], [], []
+
+        # Caminho comum (quadro sem alteração no histórico): nada a refazer
+        if self.layout_generation == self.generation:
+            return
+        self.layout_generation = self.generation
+        history = self.history
+        laid = self.layout_messages
+        common = 0
+        limit = min(len(laid), len(history))
+        while common < limit and laid[common] is history[common]:
+            common += 1
+        del laid[common:], self.layout_blocks[common:], self.layout_ends[common:]
+        total = self.layout_ends[-1] if self.layout_ends else 0
+        for message in history[common:]:
+            key = (message, width)
+            lines = self.layout_cache.get(key)
+            if lines is None:
+                lines = self._message_lines(message[0], message[1], width)
+                self.layout_cache[key] = lines
+            laid.append(message)
+            self.layout_blocks.append(lines)
+            total += len(lines)
+            self.layout_ends.append(total)
+
+        if len(self.layout_cache) > self.layout_cache_limit:
+            # Mantém só o que está no layout atual (mensagens apagadas e larguras antigas saem)
+            self.layout_cache = {(m, width): b for m, b in zip(laid, self.layout_blocks)}
+
+    def _message_lines(self, role, text, width):
+        """Linhas de uma mensagem: (texto, atributo, alinhamento_direita)."""
+        lines = []
+        is_user = (role == "user")
+        is_system = (role == "system")
+        
+        # Configuração de Estilo
+        if is_user:
+            header = "You"
+            header_attr = curses.color_pair(2) | curses.A_BOLD
+            align_right = True
+        elif is_system:
+            header = "System"
+            header_attr = curses.color_pair(3) | curses.A_BOLD
+            align_right = False
+        else:
+            header = "AI"
+            header_attr = curses.color_pair(6) | curses.A_BOLD
+            align_right = False
+
+        # Adiciona Cabeçalho da Mensagem
+        lines.append((f"[{header}]", header_attr, align_right))
+
+        # Processa Conteúdo
+        in_code = False
+        for line in text.splitlines():
+            # Detecção de bloco de código
+            if line.strip().startswith("```"):
+                in_code = not in_code
+                lines.append(("─" * width, curses.color_pair(0) | curses.A_DIM, False))
+                continue
+            
+            # Atributos da linha
+            line_attr = curses.color_pair(0)
+            if in_code:
+                line_attr = curses.color_pair(3) # Amarelo para código
+            elif is_system:
+                line_attr = curses.color_pair(3) | curses.A_DIM
+
+            # Quebra de linha (Word Wrap)
+            wrapped = textwrap.wrap(line, width)
+            if not wrapped: wrapped = [""]
+            
+            for wrapped_line in wrapped:
+                lines.append((wrapped_line, line_attr, False)) # Conteúdo sempre à esquerda para leitura
+
+        # Espaçador entre mensagens
+        lines.append(("", 0, False))
+        return lines
+
     def draw_menu(self, stdscr, x, y, h, w, options, selected_idx):
         """Desenha o menu de contexto (Ctrl+M)."""
         menu_h = len(options) + 2
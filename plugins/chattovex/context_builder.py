@@ -0,0 +1,149 @@
+# /home/johnb/tasma-code-absulut/plugins/chattovex/context_builder.py
+import os
+import re
+import weakref
+import collections
+
+CHUNK_LINES = 40 # Tamanho máximo de um pedaço (cortes preferem linhas em branco e def/class)
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+DEFINITION = re.compile(r"^\s*(?:async\s+)?(?:def|class)\s+([A-Za-z_][A-Za-z0-9_]*)")
+
+
+def estimate_tokens(text):
+    """Estimativa barata (~4 caracteres por token), a mesma usada em /tokens."""
+    return len(text) // 4 + 1
+
+
+class Chunk:
+    __slots__ = ("start", "end", "text", "tokens", "defines", "words")
+
+    def __init__(self, start, lines):
+        self.start = start # Linha inicial (0-based)
+        self.end = start + len(lines) # Exclusivo
+        self.text = "\n".join(lines)
+        self.tokens = estimate_tokens(self.text)
+        self.defines = {m.group(1) for m in map(DEFINITION.match, lines) if m}
+        self.words = set(IDENTIFIER.findall(self.text))
+
+
+def split_chunks(lines, size=CHUNK_LINES):
+    """Divide em pedaços de até 'size' linhas, cortando antes de def/class ou depois de linha vazia."""
+    chunks = []
+    start = 0
+    for i in range(1, len(lines) + 1):
+        length = i - start
+        at_end = i == len(lines)
+        boundary = not at_end and (DEFINITION.match(lines[i]) or not lines[i - 1].strip())
+        if at_end or length >= size or (boundary and length >= size // 2):
+            chunks.append(Chunk(start, lines[start:i]))
+            start = i
+    return chunks
+
+
+class ContextBuilder:
+    """
+    Responsabilidade: Montar o contexto de código do prompt dentro de um orçamento de tokens.
+    Os arquivos são divididos em pedaços (digests) guardados em cache pelo mtime (buffers abertos,
+    pela versão do editor); os pedaços recebem nota (seleção, vizinhança do cursor, símbolos citados
+    no pedido) e entram do mais relevante para o menos, até o orçamento acabar.
+    """
+    def __init__(self, cache_size=32):
+        self.file_cache = collections.OrderedDict() # caminho -> (mtime, tamanho, pedaços)
+        self.buffer_cache = weakref.WeakKeyDictionary() # editor -> (versão, pedaços); sai com a aba
+        self.cache_size = cache_size
+
+    # --- Digests ------------------------------------------------------------------
+
+    def file_chunks(self, path):
+        """Pedaços do arquivo no disco; só relê se o mtime ou o tamanho mudou."""
+        stat = os.stat(path)
+        cached = self.file_cache.get(path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            self.file_cache.move_to_end(path)
+            return cached[2]
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            chunks = split_chunks(f.read().splitlines())
+        self.file_cache[path] = (stat.st_mtime_ns, stat.st_size, chunks)
+        self.file_cache.move_to_end(path)
+        while len(self.file_cache) > self.cache_size:
+            self.file_cache.popitem(last=False)
+        return chunks
+
+    def buffer_chunks(self, editor):
+        """Pedaços do buffer aberto (pode ter alterações não salvas); refeitos só quando a versão muda."""
+        version = getattr(editor, 'version', None)
+        cached = self.buffer_cache.get(editor)
+        if cached and version is not None and cached[0] == version:
+            return cached[1]
+        chunks = split_chunks(editor.lines)
+        self.buffer_cache[editor] = (version, chunks)
+        return chunks
+
+    # --- Seleção dos pedaços ------------------------------------------------------
+
+    def rank(self, chunks, query="", cursor=None, selection=None):
+        """Nota de cada pedaço: seleção > definição de símbolo citado > perto do cursor > menção."""
+        symbols = set(IDENTIFIER.findall(query))
+        scores = []
+        for chunk in chunks:
+            score = 0.0
+            if selection and chunk.start <= selection[1] and selection[0] < chunk.end:
+                score += 100
+            if cursor is not None:
+                if chunk.start <= cursor < chunk.end:
+                    score += 50
+                else:
+                    distance = chunk.start - cursor if chunk.start > cursor else cursor - chunk.end + 1
+                    score += 30 / (1 + distance / CHUNK_LINES)
+            if symbols:
+                score += 40 * len(symbols & chunk.defines) + 5 * len(symbols & chunk.words)
+            scores.append(score)
+        return scores
+
+    def assemble(self, chunks, budget, query="", cursor=None, selection=None):
+        """Texto com os pedaços escolhidos, na ordem do arquivo, com marcadores nas lacunas."""
+        if not chunks or budget <= 0:
+            return "", 0
+        total_lines = chunks[-1].end
+        scores = self.rank(chunks, query, cursor, selection)
+        order = sorted(range(len(chunks)), key=lambda i: (-scores[i], chunks[i].start))
+        chosen = []
+        used = 0
+        for i in order:
+            cost = chunks[i].tokens
+            if used + cost > budget:
+                continue # Um pedaço menor mais abaixo na lista ainda pode caber
+            chosen.append(i)
+            used += cost
+        if not chosen:
+            # Nem o melhor pedaço cabe: corta o começo dele
+            best = chunks[order[0]]
+            text = best.text[:budget * 4]
+            return f"# ... (linhas {best.start + 1}+ de {total_lines}, cortado) ...\n{text}\n# ...", budget
+
+        parts = []
+        position = 0
+        for i in sorted(chosen):
+            chunk = chunks[i]
+            if chunk.start > position:
+                parts.append(f"# ... (linhas {position + 1}-{chunk.start} omitidas) ...")
+            parts.append(chunk.text)
+            position = chunk.end
+        if position < total_lines:
+            parts.append(f"# ... (linhas {position + 1}-{total_lines} omitidas) ...")
+        return "\n".join(parts), used
+
+    def editor_context(self, editor, budget, query=""):
+        """Contexto do buffer ativo: seleção, cursor e símbolos do pedido (e da linha do cursor)."""
+        selection = None
+        if hasattr(editor, 'get_normalized_selection'):
+            coords = editor.get_normalized_selection()
+            if coords:
+                selection = (coords[0][0], coords[1][0])
+        cursor_line = editor.lines[editor.cy] if 0 <= editor.cy < len(editor.lines) else ""
+        return self.assemble(self.buffer_chunks(editor), budget, f"{query} {cursor_line}",
+                             editor.cy, selection)
+
+    def file_context(self, path, budget, query=""):
+        """Contexto de um arquivo do disco (/read): símbolos do pedido, começo do arquivo como desempate."""
+        return self.assemble(self.file_chunks(path), budget, query, cursor=0)
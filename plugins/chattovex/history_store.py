@@ -0,0 +1,198 @@
+# /home/johnb/tasma-code-absulut/plugins/chattovex/history_store.py
+import os
+import json
+import array
+import tempfile
+
+HEADER = array.array('Q', [0]).itemsize # O índice começa com o tamanho do log que ele descreve
+
+
+class HistoryStore:
+    """
+    Responsabilidade: Guardar o histórico do chat num log JSONL só de acréscimo
+    (uma mensagem {"role", "content"} por linha) com um índice de offsets ao lado,
+    para carregar só a página mais recente e ler as antigas sob demanda.
+    - Nova mensagem: uma linha no fim do log e 8 bytes no fim do índice.
+    - /undo e /reset mexem só no fim: o log é truncado no lugar, sem reescrever nada.
+    - Se o índice não bate com o log (crash no meio de uma escrita), compact() reconstrói
+      os dois a partir das linhas válidas. Uma escrita que falha também leva a compact()
+      (agora ou, se nem isso der, na próxima abertura: o índice é apagado).
+    """
+    def __init__(self, path, legacy_path=None):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.offsets = array.array('Q') # Offset de cada mensagem no log
+        self.size = 0 # Tamanho do log (fim da última linha válida)
+        self.needs_repair = False # Log e offsets podem ter divergido (escrita falhou)
+        if not os.path.exists(self.path) and legacy_path and os.path.exists(legacy_path):
+            self._migrate(legacy_path)
+        self._load_index()
+
+    @property
+    def count(self):
+        return len(self.offsets)
+
+    # --- Índice -------------------------------------------------------------------
+
+    def _load_index(self):
+        try:
+            log_size = os.path.getsize(self.path)
+        except OSError:
+            self.offsets, self.size = array.array('Q'), 0
+            return
+        try:
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+            header = array.array('Q', data[:HEADER])
+            offsets = array.array('Q', data[HEADER:len(data) - (len(data) - HEADER) % HEADER])
+            if header and header[0] == log_size and all(o < log_size for o in offsets[-1:]):
+                self.offsets, self.size = offsets, log_size
+                return
+        except (OSError, ValueError):
+            pass
+        self.compact()
+
+    def _write_index(self):
+        header = array.array('Q', [self.size])
+        try:
+            with open(self.index_path, 'wb') as f:
+                f.write(header.tobytes() + self.offsets.tobytes())
+        except OSError:
+            self._invalidate()
+
+    # --- Leitura ------------------------------------------------------------------
+
+    def read(self, start, end):
+        """Mensagens [start, end) como tuplas (role, content)."""
+        start, end = max(0, start), min(self.count, end)
+        if start >= end:
+            return []
+        first = self.offsets[start]
+        last = self.offsets[end] if end < self.count else self.size
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(first)
+                data = f.read(last - first)
+        except OSError:
+            return []
+        messages = []
+        for line in data.decode('utf-8', 'replace').splitlines():
+            try:
+                item = json.loads(line)
+                messages.append((item['role'], item['content']))
+            except (ValueError, KeyError, TypeError):
+                messages.append(("system", "[mensagem ilegível]"))
+        return messages
+
+    def read_all(self):
+        return self.read(0, self.count)
+
+    # --- Escrita ------------------------------------------------------------------
+
+    def append(self, role, content):
+        if self.needs_repair:
+            self.compact()
+            if self.needs_repair:
+                return # Ainda sem conseguir reescrever: não empilha offsets errados
+        line = (json.dumps({"role": role, "content": content}) + "\n").encode('utf-8')
+        try:
+            with open(self.path, 'ab') as f:
+                f.write(line)
+        except OSError:
+            # Pode ter escrito só parte da linha: os offsets não valem mais para o log
+            self._invalidate()
+            self.compact()
+            return
+        self.offsets.append(self.size)
+        self.size += len(line)
+        if not os.path.exists(self.index_path):
+            self._write_index() # Índice sumiu: grava inteiro (nunca um offset solto num arquivo novo)
+            return
+        # Só o cabeçalho e o novo offset mudam: 8 bytes no início, 8 no fim
+        try:
+            with open(self.index_path, 'r+b') as f:
+                f.write(array.array('Q', [self.size]).tobytes())
+                f.seek(HEADER + (self.count - 1) * HEADER)
+                f.write(self.offsets[-1:].tobytes())
+        except OSError:
+            self._invalidate()
+
+    def _invalidate(self):
+        """Apaga o índice: a próxima abertura não confia nele e roda compact()."""
+        self.needs_repair = True
+        try:
+            os.remove(self.index_path)
+        except OSError:
+            pass
+
+    def pop(self, n=1):
+        """Remove as n últimas mensagens (trunca o log e o índice)."""
+        n = min(n, self.count)
+        if n <= 0:
+            return
+        new_size = self.offsets[self.count - n]
+        del self.offsets[self.count - n:]
+        self._truncate(new_size)
+
+    def clear(self):
+        self.offsets = array.array('Q')
+        self._truncate(0)
+
+    def _truncate(self, new_size):
+        try:
+            with open(self.path, 'r+b') as f:
+                f.truncate(new_size)
+        except OSError:
+            pass
+        self.size = new_size
+        self._write_index()
+
+    def compact(self):
+        """Reescreve log e índice só com as linhas válidas (troca atômica do log)."""
+        messages = []
+        try:
+            with open(self.path, 'rb') as f:
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break # Última linha cortada por um crash
+                    try:
+                        item = json.loads(raw)
+                        messages.append((item['role'], item['content']))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except OSError:
+            pass
+        self._rewrite(messages)
+
+    def _rewrite(self, messages):
+        self.offsets = array.array('Q')
+        chunks = []
+        size = 0
+        for role, content in messages:
+            line = (json.dumps({"role": role, "content": content}) + "\n").encode('utf-8')
+            self.offsets.append(size)
+            chunks.append(line)
+            size += len(line)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".chat_history.")
+            with os.fdopen(fd, 'wb') as f:
+                f.write(b"".join(chunks))
+            os.replace(tmp_path, self.path)
+        except OSError:
+            self.offsets, self.size = array.array('Q'), 0
+            self._invalidate()
+            return
+        self.needs_repair = False
+        self.size = size
+        self._write_index()
+
+    def _migrate(self, legacy_path):
+        """Converte o chat_history.json antigo (lista inteira num JSON) para o log."""
+        try:
+            with open(legacy_path, 'r') as f:
+                data = json.load(f)
+            messages = [(item['role'], item['content']) for item in data]
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        self._rewrite(messages)
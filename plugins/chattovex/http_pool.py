@@ -0,0 +1,241 @@
+# /home/johnb/tasma-code-absulut/plugins/chattovex/http_pool.py
+import time
+import queue
+import random
+import select
+import socket
+import threading
+import collections
+import http.client
+import urllib.parse
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+IDEMPOTENT = ("GET", "HEAD", "PUT", "DELETE", "OPTIONS") # Podem ser repetidos mesmo depois de enviados
+
+
+class HTTPError(Exception):
+    """Resposta HTTP de erro (depois das novas tentativas)."""
+    def __init__(self, status, reason, body):
+        super().__init__(f"{status} {reason}")
+        self.status = status
+        self.reason = reason
+        self.body = body
+
+
+class PoolMetrics:
+    """Latência das requisições (últimas 'size'), tentativas extras, erros e conexões reaproveitadas."""
+    def __init__(self, size=100):
+        self.latencies = collections.deque(maxlen=size) # Segundos até o primeiro byte da resposta
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.lock = threading.Lock()
+
+    def add(self, field, amount=1):
+        with self.lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def summary(self):
+        with self.lock:
+            ordered = sorted(self.latencies)
+            requests, retries, errors = self.requests, self.retries, self.errors
+            opened, reused = self.connections_opened, self.connections_reused
+        p50 = ordered[len(ordered) // 2] * 1000 if ordered else 0
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000 if ordered else 0
+        return (f"Requisições: {requests} (retentativas {retries}, erros {errors})\n"
+                f"Latência p50/p95: {p50:.0f}/{p95:.0f} ms\n"
+                f"Conexões: {opened} abertas, {reused} reaproveitadas")
+
+
+class PooledResponse:
+    """Resposta aberta. Ler até o fim (ou close()) devolve a conexão ao pool."""
+    def __init__(self, pool, conn, response, sock):
+        self.pool = pool
+        self.conn = conn
+        self.response = response
+        self.sock = sock # A conexão esquece o socket quando o servidor avisa que vai fechar
+        self.status = response.status
+        self.closed = False
+
+    def __iter__(self):
+        """Linhas da resposta (para server-sent events). Quem para no meio chama read() ou close()."""
+        while True:
+            line = self.response.readline()
+            if not line:
+                self.close()
+                return
+            yield line
+
+    def read(self):
+        try:
+            return self.response.read()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        # Só volta ao pool se a resposta foi lida inteira (senão o próximo pedido leria o resto)
+        reusable = self.response.isclosed() and not self.response.will_close
+        self.pool.release(self.conn, reusable)
+
+    def abort(self):
+        """Interrompe a leitura de outra thread: derruba o socket (a conexão não volta ao pool)."""
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class ConnectionPool:
+    """
+    Responsabilidade: Manter até 'size' conexões keep-alive com um servidor (sem novo handshake
+    TCP/TLS por mensagem) e refazer pedidos com espera exponencial em 429/5xx e falhas de rede
+    (depois do envio, só em métodos idempotentes).
+    """
+    def __init__(self, url, size=2, timeout=60, max_retries=3, backoff=0.5):
+        parsed = urllib.parse.urlsplit(url)
+        self.scheme = parsed.scheme or "https"
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.path = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.idle = queue.LifoQueue() # Conexões livres (a mais recente tem menos chance de ter expirado)
+        self.slots = threading.BoundedSemaphore(size) # Conexões em uso ao mesmo tempo
+        self.metrics = PoolMetrics()
+
+    def _connect(self):
+        conn_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        self.metrics.add("connections_opened")
+        return conn_class(self.host, self.port, timeout=self.timeout)
+
+    def acquire(self):
+        self.slots.acquire()
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                return self._connect(), False
+            if self._stale(conn):
+                conn.close()
+                continue
+            self.metrics.add("connections_reused")
+            return conn, True
+
+    def _stale(self, conn):
+        """Conexão parada que o servidor já fechou: o socket fica legível (EOF) sem pedido nenhum."""
+        if conn.sock is None:
+            return False
+        try:
+            readable, _, _ = select.select([conn.sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def release(self, conn, reusable=True):
+        if reusable:
+            self.idle.put(conn)
+        else:
+            conn.close()
+        self.slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _delay(self, attempt, retry_after=None):
+        if retry_after:
+            try:
+                return min(30.0, float(retry_after))
+            except ValueError:
+                pass
+        return self.backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+
+    def _wait(self, seconds, cancel_event):
+        if cancel_event is not None:
+            cancel_event.wait(seconds) # Cancelar não espera o fim da pausa
+        else:
+            time.sleep(seconds)
+
+    def request(self, method, body=None, headers=None, cancel_event=None):
+        """
+        Faz o pedido e devolve PooledResponse (status 2xx). Levanta HTTPError para outros status
+        e OSError/HTTPException se a rede falhar em todas as tentativas.
+        Falha de rede depois do envio (sem resposta) só é repetida em métodos idempotentes:
+        um POST pode já ter sido processado pelo servidor.
+        """
+        self.metrics.add("requests")
+        attempt = 0
+        while True:
+            conn, reused = self.acquire()
+            started = time.time()
+            sent = False
+            try:
+                conn.request(method, self.path, body=body, headers=headers or {})
+                sent = True
+                sock = conn.sock
+                response = conn.getresponse()
+            except (OSError, http.client.HTTPException):
+                self.release(conn, reusable=False)
+                if not sent and reused:
+                    continue # Conexão parada expirou no servidor: tenta já com uma nova (não conta)
+                if (sent and method not in IDEMPOTENT) or attempt >= self.max_retries \
+                        or (cancel_event and cancel_event.is_set()):
+                    self.metrics.add("errors")
+                    raise
+                self._wait(self._delay(attempt), cancel_event)
+                attempt += 1
+                self.metrics.add("retries")
+                continue
+
+            with self.metrics.lock:
+                self.metrics.latencies.append(time.time() - started)
+            pooled = PooledResponse(self, conn, response, sock)
+            if 200 <= response.status < 300:
+                return pooled
+            error_body = pooled.read().decode('utf-8', 'replace')
+            if response.status in RETRY_STATUS and attempt < self.max_retries and not (cancel_event and cancel_event.is_set()):
+                self._wait(self._delay(attempt, response.getheader("Retry-After")), cancel_event)
+                attempt += 1
+                self.metrics.add("retries")
+                continue
+            self.metrics.add("errors")
+            raise HTTPError(response.status, response.reason, error_body)
+
+
+class RequestQueue:
+    """
+    Responsabilidade: Rodar os pedidos à API em poucas threads fixas, com fila limitada
+    (no lugar de uma thread nova por mensagem). submit() devolve False se a fila está cheia.
+    """
+    def __init__(self, workers=2, maxsize=8):
+        self.jobs = queue.Queue(maxsize=maxsize)
+        self.threads = []
+        for _ in range(workers):
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, func, *args):
+        try:
+            self.jobs.put_nowait((func, args))
+            return True
+        except queue.Full:
+            return False
+
+    def _worker(self):
+        while True:
+            func, args = self.jobs.get()
+            try:
+                func(*args)
+            except Exception:
+                pass
@@ -0,0 +1,71 @@
+# /home/johnb/tasma-code-absulut/src/buffer_spill.py
+import os
+import zlib
+import pickle
+import shutil
+import tempfile
+from editor import Editor
+
+
+class BufferSpill:
+    """
+    Responsabilidade: Tirar da memória buffers modificados de abas inativas.
+    Conteúdo, histórico de undo/redo e estado de visualização vão comprimidos (pickle + zlib)
+    para um arquivo temporário desta sessão e voltam como um Editor novo quando a aba é exibida.
+    """
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.files = set()
+
+    def _ensure_dir(self):
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix='tasma_spill_')
+        return self.directory
+
+    def store(self, editor):
+        """Grava o buffer e retorna o caminho do arquivo (None se não deu para gravar)."""
+        payload = {
+            'lines': editor.lines,
+            'undo': editor.undo_stack,
+            'redo': editor.redo_stack,
+            'view': editor.view_state(),
+            'modified': editor.is_modified,
+        }
+        try:
+            data = zlib.compress(pickle.dumps(payload, pickle.HIGHEST_PROTOCOL), 1)
+            fd, path = tempfile.mkstemp(suffix='.buf', dir=self._ensure_dir())
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+        except (OSError, pickle.PicklingError):
+            return None
+        self.files.add(path)
+        return path
+
+    def load(self, path):
+        """Recria o Editor a partir do arquivo e apaga o arquivo. Retorna None se falhar."""
+        try:
+            with open(path, 'rb') as f:
+                payload = pickle.loads(zlib.decompress(f.read()))
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError):
+            return None
+        finally:
+            self.discard(path)
+        editor = Editor(payload['lines'])
+        editor.apply_view_state(payload['view'])
+        editor.undo_stack = payload['undo']
+        editor.redo_stack = payload['redo']
+        editor.is_modified = payload['modified']
+        return editor
+
+    def discard(self, path):
+        self.files.discard(path)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def close(self):
+        """Fim da sessão: remove a pasta temporária inteira."""
+        self.files.clear()
+        if self.directory and os.path.isdir(self.directory):
+            shutil.rmtree(self.directory, ignore_errors=True)
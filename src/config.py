@@ -2,6 +2,8 @@
 import json
 import os
 import curses
+from file_walker import DEFAULT_EXCLUDE_GLOBS
+from plugin_metrics import DEFAULT_BUDGETS_MS
 
 class Config:
     def __init__(self, filepath="config.json"):
@@ -14,7 +16,16 @@ class Config:
             os.makedirs(self.theme_dir)
         self.settings = {
             "confirm_navigation": True,
-            "relative_line_numbers": False
+            "relative_line_numbers": False,
+            "respect_gitignore": True,
+            "max_file_size_kb": 1024,
+            "exclude_globs": list(DEFAULT_EXCLUDE_GLOBS),
+            "idle_tick_ms": 250,
+            "async_open_threshold_kb": 1024,
+            "tab_memory_budget_mb": 512,
+            "server_mode": True,
+            "plugin_budgets_ms": dict(DEFAULT_BUDGETS_MS),
+            "plugin_budget_strikes": 5
         }
         self.colors = {
             "keyword": "YELLOW",
@@ -60,6 +71,11 @@ class Config:
             "new_file": ord('n'),
             "new_dir": ord('N'),
             "toggle_hidden": ord('h'),
+            "tree_expand_all": ord('E'),
+            "tree_collapse_all": ord('C'),
+            "cancel_file_op": ord('x'),
+            "show_problems": ord('p'),
+            "sweep_project": ord('S'),
             "delete_file": curses.KEY_DC,
             "delete_forward": curses.KEY_DC,
             "toggle_bookmark": curses.KEY_F3,
@@ -81,7 +97,8 @@ class Config:
             "set_root": 80, # Shift+P
             "fuzzy_find_file": 16, # Ctrl+P
             "toggle_structure": 18, # Ctrl+R
-            "import_theme": 5 # Ctrl+E
+            "import_theme": 5, # Ctrl+E
+            "plugin_stats": 237 # Alt+m (109 + 128)
         }
         self.snippets = {
             "def": "def name(args):\n    pass",
@@ -52,7 +52,8 @@ class ConfigWindow:
         while self.active:
             self.draw()
             key = self.ui.get_input()
-            self.handle_input(key)
+            if key is not None:
+                self.handle_input(key)
 
     def draw(self):
         h, w = self.ui.height, self.ui.width
@@ -0,0 +1,151 @@
+# /home/johnb/tasma-code-absulut/src/diagnostics.py
+import os
+import threading
+import multiprocessing
+import concurrent.futures
+from lint_worker import analyze_file, lower_priority
+
+class DiagnosticsService:
+    """
+    Responsabilidade: Reunir os problemas de lint de todas as abas abertas e, sob demanda,
+    de todos os arquivos Python do projeto.
+    - Abas abertas: lintadas pelo Linter (worker compartilhado, versões e cache) quando o editor está ocioso.
+    - Projeto: varredura em um pool de processos com prioridade baixa; resultados em cache por
+      mtime e hash do arquivo.
+    A lista agregada (problems) alimenta o modo 'problems' da sidebar.
+    """
+    def __init__(self, linter, file_handler, max_workers=None):
+        self.linter = linter
+        self.file_handler = file_handler
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.lock = threading.Lock()
+        self.file_results = {} # caminho -> (mtime_ns, digest, erros)
+        self.sweep_thread = None
+        self.sweep_cancel = threading.Event()
+        self.sweep_progress = (0, 0) # (feitos, total)
+        self.changed = False # Há resultados novos desde o último problems()
+
+    # --- Abas abertas -----------------------------------------------------------
+
+    def lint_open_tabs(self, open_tabs):
+        """Pede lint de todas as abas carregadas (barato: o Linter ignora versões já pedidas)."""
+        for tab in open_tabs:
+            editor = tab['editor']
+            if editor is None or editor.loading:
+                continue
+            filepath = tab['filepath']
+            if filepath and not filepath.endswith('.py'):
+                continue
+            self.linter.lint(editor, filepath)
+
+    # --- Varredura do projeto ---------------------------------------------------
+
+    def is_sweeping(self):
+        return bool(self.sweep_thread and self.sweep_thread.is_alive())
+
+    def sweep(self, root, show_hidden=False):
+        """Inicia a varredura dos .py abaixo de 'root'. Retorna False se já houver uma em andamento."""
+        if self.is_sweeping():
+            return False
+        self.sweep_cancel.clear()
+        self.sweep_thread = threading.Thread(target=self._sweep, args=(root, show_hidden), daemon=True)
+        self.sweep_thread.start()
+        return True
+
+    def cancel_sweep(self):
+        self.sweep_cancel.set()
+
+    def _sweep(self, root, show_hidden):
+        walker = self.file_handler.make_walker(show_hidden)
+        todo = []
+        seen = set()
+        for path, _, _ in walker.walk(root):
+            if self.sweep_cancel.is_set():
+                return
+            if not path.endswith('.py'):
+                continue
+            seen.add(path)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            with self.lock:
+                cached = self.file_results.get(path)
+            if cached and cached[0] == mtime:
+                continue # Não mudou desde a última varredura
+            todo.append((path, mtime, cached[1] if cached else None))
+
+        with self.lock:
+            # Arquivos que sumiram do projeto saem da lista
+            root_prefix = os.path.join(os.path.abspath(root), "")
+            for path in [p for p in self.file_results if p.startswith(root_prefix) and p not in seen]:
+                del self.file_results[path]
+                self.changed = True
+            self.sweep_progress = (0, len(todo))
+        if not todo:
+            return
+
+        # spawn: o processo principal tem threads e curses, fork não é seguro aqui
+        context = multiprocessing.get_context('spawn')
+        done = 0
+        try:
+            with concurrent.futures.ProcessPoolExecutor(self.max_workers, mp_context=context,
+                                                        initializer=lower_priority) as pool:
+                futures = {pool.submit(analyze_file, path, digest): (path, mtime, digest)
+                           for path, mtime, digest in todo}
+                for future in concurrent.futures.as_completed(futures):
+                    if self.sweep_cancel.is_set():
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        return
+                    path, mtime, old_digest = futures[future]
+                    done += 1
+                    try:
+                        digest, errors = future.result()
+                    except Exception:
+                        continue
+                    with self.lock:
+                        if errors is None:
+                            # Só o mtime mudou (conteúdo igual): reaproveita os erros
+                            cached = self.file_results.get(path)
+                            errors = cached[2] if cached else {}
+                        self.file_results[path] = (mtime, digest, errors)
+                        self.sweep_progress = (done, len(todo))
+                        self.changed = True
+        except (OSError, RuntimeError):
+            pass # Sem suporte a processos (ambientes restritos): fica só com as abas abertas
+
+    def progress_text(self):
+        if not self.is_sweeping():
+            return ""
+        done, total = self.sweep_progress
+        return f"Diagnósticos {done}/{total}"
+
+    # --- Lista agregada ---------------------------------------------------------
+
+    def problems(self, open_tabs):
+        """
+        Lista de problemas para a sidebar: [{'file', 'line', 'content', 'is_dir'}].
+        Para arquivos abertos vale o buffer (mais novo que o disco).
+        """
+        by_file = {}
+        with self.lock:
+            for path, (_, _, errors) in self.file_results.items():
+                if errors:
+                    by_file[path] = errors
+            self.changed = False
+        for tab in open_tabs:
+            editor = tab['editor']
+            if editor is None or editor.loading or not tab['filepath']:
+                continue
+            path = os.path.abspath(tab['filepath'])
+            if editor.linter_errors:
+                by_file[path] = dict(editor.linter_errors.items())
+            else:
+                by_file.pop(path, None)
+
+        items = []
+        for path in sorted(by_file):
+            for line_idx in sorted(by_file[path]):
+                for msg in by_file[path][line_idx]:
+                    items.append({'file': path, 'line': line_idx + 1, 'content': msg, 'is_dir': False})
+        return items
@@ -0,0 +1,219 @@
+# /home/johnb/tasma-code-absulut/src/directory_cache.py
+import os
+import sys
+import select
+import struct
+import threading
+import collections
+import ctypes
+import ctypes.util
+
+class DirectoryCache:
+    """
+    Responsabilidade: Guardar listagens de diretório já ordenadas, validadas pelo mtime
+    do próprio diretório (um único stat em vez de um por entrada).
+    """
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict() # (path, show_hidden) -> (mtime_ns, items)
+        self.lock = threading.Lock()
+
+    def get(self, path, show_hidden):
+        key = (path, show_hidden)
+        with self.lock:
+            cached = self.entries.get(key)
+        if cached is None:
+            return None
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            self.invalidate(path)
+            return None
+        if mtime != cached[0]:
+            return None
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+        return cached[1]
+
+    def put(self, path, show_hidden, mtime_ns, items):
+        with self.lock:
+            self.entries[(path, show_hidden)] = (mtime_ns, items)
+            self.entries.move_to_end((path, show_hidden))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, path):
+        """Descarta a listagem do diretório (nas duas variantes de ocultos)."""
+        path = os.path.abspath(path)
+        with self.lock:
+            self.entries.pop((path, False), None)
+            self.entries.pop((path, True), None)
+
+    def invalidate_parent(self, path):
+        """Invalida o diretório que contém 'path' (após criar/remover/renomear algo nele)."""
+        self.invalidate(os.path.dirname(os.path.abspath(path)))
+
+
+# Constantes do inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_ONLYDIR = 0x01000000
+IN_Q_OVERFLOW = 0x00004000
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def _load_inotify():
+    """Retorna a libc com inotify ou None (macOS, BSD, ambientes restritos)."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class DirectoryWatcher:
+    """
+    Responsabilidade: Observar os diretórios exibidos na sidebar e avisar quando mudam.
+    Usa inotify no Linux e cai para polling de mtime nos demais sistemas.
+    As mudanças invalidam o DirectoryCache e são coletadas pelo loop principal via poll_changes().
+    """
+    def __init__(self, cache, poll_interval=1.0):
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.watched = {} # path -> wd (inotify) ou mtime_ns (polling)
+        self.failed = set() # Não deu para observar (sem permissão, limite do inotify): até retry_failed()
+        self.changed = set()
+        self.stop_event = threading.Event()
+
+        self.libc = _load_inotify()
+        self.fd = -1
+        if self.libc:
+            fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd >= 0:
+                self.fd = fd
+            else:
+                self.libc = None
+        self.wd_to_path = {}
+
+        target = self._inotify_loop if self.fd >= 0 else self._polling_loop
+        self.thread = threading.Thread(target=target, daemon=True)
+        self.thread.start()
+
+    @property
+    def backend(self):
+        return "inotify" if self.fd >= 0 else "polling"
+
+    def watch_only(self, paths):
+        """Passa a observar exatamente 'paths' (chamado a cada frame; barato se nada mudou)."""
+        wanted = {os.path.abspath(p) for p in paths} - self.failed
+        with self.lock:
+            current = set(self.watched)
+            if wanted == current:
+                return
+            for path in current - wanted:
+                handle = self.watched.pop(path)
+                if self.fd >= 0:
+                    self.libc.inotify_rm_watch(self.fd, handle)
+                    self.wd_to_path.pop(handle, None)
+            for path in wanted - current:
+                if self.fd >= 0:
+                    wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+                    if wd >= 0:
+                        self.watched[path] = wd
+                        self.wd_to_path[wd] = path
+                    else:
+                        self.failed.add(path) # Não tenta de novo a cada frame
+                else:
+                    try:
+                        self.watched[path] = os.stat(path).st_mtime_ns
+                    except OSError:
+                        self.failed.add(path)
+
+    def retry_failed(self):
+        """Esquece as pastas que falharam (raiz trocada ou sidebar atualizada)."""
+        with self.lock:
+            self.failed.clear()
+
+    def poll_changes(self):
+        """Retorna (e limpa) o conjunto de diretórios alterados desde a última chamada."""
+        with self.lock:
+            if not self.changed:
+                return set()
+            changed, self.changed = self.changed, set()
+        return changed
+
+    def _mark_changed(self, path):
+        self.cache.invalidate(path)
+        with self.lock:
+            self.changed.add(path)
+
+    def _inotify_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                ready, _, _ = select.select([self.fd], [], [], 0.5)
+            except (OSError, ValueError):
+                return
+            if not ready:
+                continue
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError:
+                return
+
+            offset = 0
+            touched = set()
+            while offset + EVENT_HEADER.size <= len(data):
+                wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size + name_len
+                if mask & IN_Q_OVERFLOW:
+                    # Fila do kernel estourou: invalida tudo que é observado
+                    with self.lock:
+                        touched.update(self.watched)
+                    continue
+                with self.lock:
+                    path = self.wd_to_path.get(wd)
+                if path:
+                    touched.add(path)
+            # Uma rajada de eventos (ex: git checkout) vira uma única invalidação por diretório
+            for path in touched:
+                self._mark_changed(path)
+
+    def _polling_loop(self):
+        while not self.stop_event.wait(self.poll_interval):
+            with self.lock:
+                snapshot = list(self.watched.items())
+            for path, old_mtime in snapshot:
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except OSError:
+                    mtime = None
+                if mtime != old_mtime:
+                    with self.lock:
+                        if path in self.watched:
+                            self.watched[path] = mtime
+                    self._mark_changed(path)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.fd >= 0:
+            try:
+                os.close(self.fd)
+            except OSError:
+                pass
+            self.fd = -1
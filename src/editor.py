@@ -1,8 +1,18 @@
 # /home/johnb/tasma-code-absulut/src/editor.py
+import sys
 import copy
+import itertools
 import re
 import subprocess
 import shutil
+from markers import MarkerStore, MarkerSet, MarkerMap
+
+def _find_all(line, query):
+    start = line.find(query)
+    while start != -1:
+        yield start
+        start = line.find(query, start + len(query))
+
 
 class Editor:
     """
@@ -10,6 +20,9 @@ class Editor:
     Lógica pura de edição (inserir, deletar, mover).
     """
     def __init__(self, lines=None):
+        # Marcadores ancorados em linhas (bookmarks, dobras, diagnósticos...) que acompanham as edições
+        self.markers = MarkerStore()
+        self.edit_listeners = [] # callback(editor, start, removed, inserted) após cada alteração
         self.lines = lines if lines else [""]
         self.cx = 0  # Cursor X (coluna)
         self.cy = 0  # Cursor Y (linha)
@@ -17,21 +30,109 @@ class Editor:
         self.search_query = ""
         self.search_mode = "text" # 'text' or 'regex'
         self.clipboard = ""
-        self.bookmarks = set()
-        self.linter_errors = {} # {line_index: [error_msg, ...]}
-        self.folds = set() # Set of line indices that are folded
         self.scroll_offset_x = 0
         self.scroll_offset_y = 0
 
         self.selection_anchor_x = None
         self.selection_anchor_y = None
 
+        self.version = 0 # Incrementado a cada alteração do buffer (usado pelo linter)
+        self._memory = (None, 0) # (chave da versão, bytes) de memory_usage()
         self.undo_stack = []
         self.redo_stack = []
         self._save_state() # Save initial state
+        self.is_modified = False # O estado inicial não é uma alteração
         self.dirty_lines = set()
         self.needs_full_redraw = True
 
+        # Carregamento em background (arquivos grandes): buffer só leitura até terminar
+        self.loading = False
+        self.pending_goto = None # Linha pedida antes de ter sido carregada
+
+    def begin_loading(self):
+        """Marca o buffer como em carregamento; as linhas chegam por append_loaded_lines()."""
+        self.loading = True
+        self.lines = [""]
+        self.is_modified = False
+
+    def append_loaded_lines(self, lines):
+        """Acrescenta um bloco lido pelo worker (sempre chamado na thread principal)."""
+        if not lines:
+            return
+        self.version += 1
+        first_y = len(self.lines)
+        if self.lines == [""]:
+            self.lines = list(lines)
+            self._edit(0, 1, len(lines))
+            self.mark_all_dirty()
+        else:
+            self.lines.extend(lines)
+            self._edit(first_y, 0, len(lines))
+            for y in range(first_y, len(self.lines)):
+                self.mark_dirty(y)
+        if self.pending_goto is not None and self.pending_goto <= len(self.lines):
+            line_number, self.pending_goto = self.pending_goto, None
+            self.goto_line(line_number)
+
+    def finish_loading(self):
+        """Fim do carregamento: o conteúdo lido vira o estado inicial do undo."""
+        self.loading = False
+        if self.pending_goto is not None:
+            # Linha além do fim do arquivo: vai para a última
+            self.pending_goto = None
+            self.goto_line(len(self.lines))
+        # Strings são imutáveis: copiar a lista basta (deepcopy seria lento em arquivos grandes)
+        self.undo_stack = [(list(self.lines), self.cx, self.cy, copy.deepcopy(self.bookmarks), copy.deepcopy(self.folds))]
+        self.redo_stack.clear()
+        self.is_modified = False
+        self.mark_all_dirty()
+
+    def view_state(self):
+        """Cursor, rolagem, dobras e marcadores do buffer (guardados na sessão)."""
+        return {
+            'cx': self.cx, 'cy': self.cy,
+            'scroll_x': self.scroll_offset_x, 'scroll_y': self.scroll_offset_y,
+            'folds': self.markers.tree("fold").lines(),
+            'bookmarks': self.markers.tree("bookmark").lines(),
+        }
+
+    def apply_view_state(self, state):
+        """Restaura o que view_state() guardou, ajustado ao tamanho atual do arquivo."""
+        last = len(self.lines) - 1
+        try:
+            self.folds = [y for y in state.get('folds', []) if isinstance(y, int) and 0 <= y <= last]
+            self.bookmarks = [y for y in state.get('bookmarks', []) if isinstance(y, int) and 0 <= y <= last]
+            self.cy = min(max(0, int(state.get('cy', 0))), last)
+            self.cx = min(max(0, int(state.get('cx', 0))), len(self.lines[self.cy]))
+            self.scroll_offset_y = min(max(0, int(state.get('scroll_y', 0))), last)
+            self.scroll_offset_x = max(0, int(state.get('scroll_x', 0)))
+        except (TypeError, ValueError):
+            pass # Sessão com valores inválidos: fica com o que deu para aplicar
+        # O estado restaurado é a base do undo (não conta como modificação)
+        self.undo_stack = [(list(self.lines), self.cx, self.cy, copy.deepcopy(self.bookmarks), copy.deepcopy(self.folds))]
+        self.mark_all_dirty()
+
+    def memory_usage(self):
+        """Estimativa em bytes do conteúdo e do histórico de undo/redo (em cache até a próxima alteração)."""
+        key = (self.version, len(self.undo_stack), len(self.redo_stack))
+        if self._memory[0] != key:
+            size = sys.getsizeof(self.lines) + sum(map(sys.getsizeof, self.lines))
+            # Os snapshots compartilham as strings com o buffer (deepcopy não copia str): pesa a lista de cada um
+            for state in itertools.chain(self.undo_stack, self.redo_stack):
+                size += sys.getsizeof(state[0])
+            self._memory = (key, size)
+        return self._memory[1]
+
+    def replace_all_lines(self, lines):
+        """Troca todo o conteúdo como uma única edição (desfazível)."""
+        self._save_state()
+        removed = len(self.lines)
+        self.lines = list(lines) if lines else [""]
+        self._edit(0, removed, len(self.lines))
+        self.cy = min(self.cy, len(self.lines) - 1)
+        self.cx = min(self.cx, len(self.lines[self.cy]))
+        self.mark_all_dirty()
+
     def move_cursor(self, dx, dy):
         """Move o cursor garantindo que ele fique dentro dos limites do texto."""
         # Move vertically in visual space
@@ -62,6 +163,10 @@ class Editor:
         """Move o cursor para a linha especificada (1-based)."""
         target_y = line_number - 1
         old_y = self.cy
+        if self.loading and target_y >= len(self.lines):
+            # Ainda não chegou: aplicado quando o bloco com essa linha for carregado
+            self.pending_goto = line_number
+            return True
         if 0 <= target_y < len(self.lines):
             self.cy = target_y
             self.cx = 0
@@ -84,8 +189,47 @@ class Editor:
         self.dirty_lines.clear()
         self.needs_full_redraw = False
 
+    @property
+    def bookmarks(self):
+        return MarkerSet(self.markers.tree("bookmark"))
+
+    @bookmarks.setter
+    def bookmarks(self, lines):
+        self.markers.tree("bookmark").replace((line, True) for line in lines)
+
+    @property
+    def folds(self):
+        """Linhas dobradas."""
+        return MarkerSet(self.markers.tree("fold"))
+
+    @folds.setter
+    def folds(self, lines):
+        self.markers.tree("fold").replace((line, True) for line in lines)
+
+    @property
+    def linter_errors(self):
+        """{line_index: [error_msg, ...]}"""
+        return MarkerMap(self.markers.tree("diagnostic"))
+
+    @linter_errors.setter
+    def linter_errors(self, errors):
+        self.markers.tree("diagnostic").replace(errors.items())
+
+    def _edit(self, start, removed, inserted):
+        """
+        Registra uma alteração já feita em self.lines: as linhas [start, start+removed)
+        viraram 'inserted' linhas. Desloca os marcadores e avisa os listeners.
+        """
+        self.markers.apply_edit(start, removed, inserted)
+        for listener in self.edit_listeners:
+            try:
+                listener(self, start, removed, inserted)
+            except Exception:
+                pass
+
     def _save_state(self):
         """Saves the current editor state to the undo stack."""
+        self.version += 1 # Chamado antes de toda modificação
         # Only save if the current state is different from the last saved state
         if not self.undo_stack or (self.lines, self.cx, self.cy, self.bookmarks, self.folds) != self.undo_stack[-1]:
             self.undo_stack.append((copy.deepcopy(self.lines), self.cx, self.cy, copy.deepcopy(self.bookmarks), copy.deepcopy(self.folds)))
@@ -99,7 +243,21 @@ class Editor:
 
     def _restore_state(self, state_tuple):
         """Restores the editor to a given state."""
-        self.lines, self.cx, self.cy, self.bookmarks, self.folds = copy.deepcopy(state_tuple[0]), state_tuple[1], state_tuple[2], copy.deepcopy(state_tuple[3]), copy.deepcopy(state_tuple[4])
+        self.version += 1
+        old_lines = self.lines
+        self.lines, self.cx, self.cy = copy.deepcopy(state_tuple[0]), state_tuple[1], state_tuple[2]
+        # Só o trecho entre o prefixo e o sufixo em comum mudou (as strings são as mesmas, comparar é barato)
+        start = 0
+        limit = min(len(old_lines), len(self.lines))
+        while start < limit and old_lines[start] == self.lines[start]:
+            start += 1
+        end_old, end_new = len(old_lines), len(self.lines)
+        while end_old > start and end_new > start and old_lines[end_old - 1] == self.lines[end_new - 1]:
+            end_old -= 1
+            end_new -= 1
+        if end_old > start or end_new > start:
+            self._edit(start, end_old - start, end_new - start)
+        self.bookmarks, self.folds = state_tuple[3], state_tuple[4]
         # Determine if modified by comparing with the very first state in undo_stack
         if self.undo_stack and self.lines == self.undo_stack[0][0]:
             self.is_modified = False
@@ -119,6 +277,7 @@ class Editor:
             self.lines[self.cy] = line[:self.cx] + char + pairs[char] + line[self.cx:]
         else:
             self.lines[self.cy] = line[:self.cx] + char + line[self.cx:]
+        self._edit(self.cy, 1, 1)
         self.cx += 1
         self.mark_dirty(self.cy)
 
@@ -145,6 +304,12 @@ class Editor:
         
         self.lines[self.cy] = left_part
         self.lines.insert(self.cy + 1, indent + right_part)
+        if left_part:
+            self._edit(self.cy, 1, 2)
+        else:
+            # Enter no início da linha: o texto (e seus marcadores) desce
+            self._edit(self.cy, 0, 1)
+            self._edit(self.cy + 1, 1, 1)
         self.cy += 1 # Move cursor to new line
         self.cx = len(indent) # Move cursor to end of indentation
         self.mark_all_dirty() # Inserir linha desloca tudo abaixo
@@ -160,6 +325,7 @@ class Editor:
             line = self.lines[self.cy]
             self._save_state() # Save state before modification
             self.lines[self.cy] = line[:self.cx - 1] + line[self.cx:]
+            self._edit(self.cy, 1, 1)
             self.cx -= 1
             self.mark_dirty(self.cy)
         elif self.cy > 0:
@@ -169,6 +335,7 @@ class Editor:
             self.cx = len(self.lines[self.cy])
             self._save_state() # Save state before modification
             self.lines[self.cy] += current_line
+            self._edit(self.cy, 2, 1)
             self.mark_all_dirty() # Remover linha desloca tudo
 
     def delete_forward(self):
@@ -181,11 +348,29 @@ class Editor:
         if self.cx < len(line):
             self._save_state()
             self.lines[self.cy] = line[:self.cx] + line[self.cx + 1:]
+            self._edit(self.cy, 1, 1)
             self.mark_dirty(self.cy)
         elif self.cy < len(self.lines) - 1:
             self._save_state()
             next_line = self.lines.pop(self.cy + 1)
             self.lines[self.cy] += next_line
+            self._edit(self.cy, 2, 1)
+            self.mark_all_dirty()
+
+    def _mark_search_hits(self, finder):
+        """Marca as linhas com ocorrências da busca: payload = [(início, fim), ...]."""
+        hits = []
+        for y, line in enumerate(self.lines):
+            spans = finder(line)
+            if spans:
+                hits.append((y, spans))
+        self.markers.tree("search").replace(hits)
+        self.mark_all_dirty()
+
+    def clear_search_hits(self):
+        """Apaga os sublinhados da busca (busca cancelada, vazia ou padrão inválido)."""
+        if self.markers.tree("search"):
+            self.markers.tree("search").clear()
             self.mark_all_dirty()
 
     def find(self, query):
@@ -195,10 +380,12 @@ class Editor:
         Retorna uma tupla (y, x) ou None.
         """
         if not query:
+            self.clear_search_hits()
             return None
         
         self.search_query = query
         self.search_mode = "text"
+        self._mark_search_hits(lambda line: [(m, m + len(query)) for m in _find_all(line, query)])
 
         # Itera por todas as linhas, começando pela atual, em ordem
         for i in range(len(self.lines)):
@@ -226,14 +413,18 @@ class Editor:
 
     def find_regex(self, query):
         """Encontra a próxima ocorrência de um padrão regex."""
-        if not query: return None
+        if not query:
+            self.clear_search_hits()
+            return None
         try:
             regex = re.compile(query)
         except re.error:
+            self.clear_search_hits() # Não deixa sublinhada a busca anterior
             return None
         
         self.search_query = query
         self.search_mode = "regex"
+        self._mark_search_hits(lambda line: [m.span() for m in regex.finditer(line) if m.end() > m.start()])
         
         for i in range(len(self.lines)):
             y = (self.cy + i) % len(self.lines)
@@ -262,6 +453,7 @@ class Editor:
                 new_line = line.replace(find_str, replace_str)
                 if new_line != line:
                     self.lines[i] = new_line
+                    self._edit(i, 1, 1)
                     count += line.count(find_str)
         self.mark_all_dirty()
         return count
@@ -279,6 +471,7 @@ class Editor:
             new_line, n = regex.subn(replace_pattern, line)
             if n > 0:
                 self.lines[i] = new_line
+                self._edit(i, 1, 1)
                 count += n
         self.mark_all_dirty()
         return count
@@ -327,9 +520,13 @@ class Editor:
             self.delete_selected_text()
         else:
             # No selection, cut the whole line
+            cut_y = self.cy
             self.clipboard = self.lines.pop(self.cy)
             if not self.lines:
                 self.lines.append("")
+                self._edit(0, 1, 1)
+            else:
+                self._edit(cut_y, 1, 0)
             
             if self.cy >= len(self.lines):
                 self.cy = len(self.lines) - 1
@@ -356,6 +553,7 @@ class Editor:
                 # Single line paste
                 line = self.lines[self.cy]
                 self.lines[self.cy] = line[:self.cx] + pasted_lines[0] + line[self.cx:]
+                self._edit(self.cy, 1, 1)
                 self.cx += len(pasted_lines[0])
             else:
                 # Multi-line paste
@@ -372,6 +570,7 @@ class Editor:
                 # Last line of paste
                 last_pasted_line = pasted_lines[-1]
                 self.lines.insert(self.cy + len(pasted_lines) - 1, last_pasted_line + after_cursor)
+                self._edit(self.cy, 1, len(pasted_lines))
                 
                 # Update cursor position
                 self.cy += len(pasted_lines) - 1
@@ -390,6 +589,7 @@ class Editor:
         """Duplica a linha atual."""
         self._save_state()
         self.lines.insert(self.cy + 1, self.lines[self.cy])
+        self._edit(self.cy + 1, 0, 1)
         self.cy += 1
         self.mark_all_dirty()
 
@@ -398,11 +598,13 @@ class Editor:
         self._save_state()
         if len(self.lines) > 1:
             self.lines.pop(self.cy)
+            self._edit(self.cy, 1, 0)
             if self.cy >= len(self.lines):
                 self.cy = len(self.lines) - 1
             self.cx = min(self.cx, len(self.lines[self.cy]))
         else:
             self.lines[0] = ""
+            self._edit(0, 1, 1)
             self.cx = 0
         self.mark_all_dirty()
 
@@ -412,6 +614,7 @@ class Editor:
             self._save_state()
             self.lines[self.cy], self.lines[self.cy - 1] = self.lines[self.cy - 1], self.lines[self.cy]
             self.cy -= 1
+            self._edit(self.cy, 2, 2)
             self.mark_all_dirty()
 
     def move_line_down(self):
@@ -419,6 +622,7 @@ class Editor:
         if self.cy < len(self.lines) - 1:
             self._save_state()
             self.lines[self.cy], self.lines[self.cy + 1] = self.lines[self.cy + 1], self.lines[self.cy]
+            self._edit(self.cy, 2, 2)
             self.cy += 1
             self.mark_all_dirty()
 
@@ -435,6 +639,7 @@ class Editor:
 
         for i in range(start_y, end_y + 1):
             self.lines[i] = "    " + self.lines[i]
+        self._edit(start_y, end_y - start_y + 1, end_y - start_y + 1)
         
         self.cx += 4
         if self.has_selection():
@@ -456,6 +661,7 @@ class Editor:
                 self.lines[i] = self.lines[i][4:]
             elif self.lines[i].startswith(" ") and len(self.lines[i]) < 4:
                  self.lines[i] = self.lines[i].lstrip()
+        self._edit(start_y, end_y - start_y + 1, end_y - start_y + 1)
         
         self.cx = max(0, self.cx - 4)
         self.mark_all_dirty()
@@ -483,6 +689,7 @@ class Editor:
                 self.lines[i] = line.replace("# ", "", 1).replace("#", "", 1)
             else:
                 self.lines[i] = "# " + line
+        self._edit(start_y, end_y - start_y + 1, end_y - start_y + 1)
         self.mark_all_dirty()
 
     def start_selection(self):
@@ -540,8 +747,9 @@ class Editor:
         first_line_part = self.lines[start_y][:start_x]
         last_line_part = self.lines[end_y][end_x:]
 
-        del self.lines[start_y:end_y]
+        del self.lines[start_y:end_y + 1]
         self.lines.insert(start_y, first_line_part + last_line_part)
+        self._edit(start_y, end_y - start_y + 1, 1)
 
         self.cy, self.cx = start_y, start_x
         self.clear_selection()
@@ -782,16 +990,13 @@ class Editor:
 
     def next_bookmark(self):
         """Pula para o próximo marcador."""
-        if not self.bookmarks: return
-        sorted_marks = sorted(list(self.bookmarks))
-        for mark in sorted_marks:
-            if mark > self.cy:
-                self.cy = mark
-                self.mark_all_dirty() # Pulo longo
-                self.cx = 0
-                return
-        self.cy = sorted_marks[0] # Wrap around
-        self.mark_all_dirty()
+        marks = self.markers.tree("bookmark")
+        if not marks: return
+        mark = marks.next_after(self.cy)
+        if mark is None:
+            mark = marks.next_after(-1) # Wrap around
+        self.cy = mark
+        self.mark_all_dirty() # Pulo longo
         self.cx = 0
 
     def _get_indent_level(self, line_idx):
@@ -810,11 +1015,15 @@ class Editor:
 
     def get_visual_indices(self):
         """Retorna lista de índices de linhas visíveis (não dobradas)."""
+        folds = self.markers.tree("fold")
+        if not folds:
+            return list(range(len(self.lines)))
+        folds = set(folds.lines())
         indices = []
         i = 0
         while i < len(self.lines):
             indices.append(i)
-            if i in self.folds:
+            if i in folds:
                 end = self._get_fold_end(i)
                 i = end + 1
             else:
@@ -841,15 +1050,12 @@ class Editor:
 
     def prev_bookmark(self):
         """Pula para o marcador anterior."""
-        if not self.bookmarks: return
-        sorted_marks = sorted(list(self.bookmarks), reverse=True)
-        for mark in sorted_marks:
-            if mark < self.cy:
-                self.cy = mark
-                self.mark_all_dirty()
-                self.cx = 0
-                return
-        self.cy = sorted_marks[0] # Wrap around
+        marks = self.markers.tree("bookmark")
+        if not marks: return
+        mark = marks.prev_before(self.cy)
+        if mark is None:
+            mark = marks.prev_before(len(self.lines)) # Wrap around
+        self.cy = mark
         self.mark_all_dirty()
         self.cx = 0
 
@@ -890,6 +1096,7 @@ class Editor:
         
         snippet_text = snippets[word]
         snippet_lines = snippet_text.split('\n')
+        snippet_y = self.cy
         
         # Preserva o conteúdo da linha antes e depois da palavra
         prefix = line[:start_word_x]
@@ -914,6 +1121,7 @@ class Editor:
         else:
             self.lines[self.cy] += suffix
             self.cx = len(prefix) + len(snippet_lines[0])
+        self._edit(snippet_y, 1, len(snippet_lines))
             
         self.is_modified = True
         self.mark_all_dirty()
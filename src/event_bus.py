@@ -0,0 +1,97 @@
+# /home/johnb/tasma-code-absulut/src/event_bus.py
+import time
+
+# Eventos publicados pelo editor e o que cada um carrega
+EVENTS = (
+    "on_change", # {'path', 'start', 'removed', 'lines', 'version'}: linhas [start, start+removed) viraram 'lines'
+    "on_save",   # {'path'}
+    "on_open",   # {'path', 'lines'} (quantidade de linhas)
+    "on_cursor", # {'path', 'line', 'col'} (0-based)
+    "on_idle",   # {'idle': segundos sem teclas}
+)
+
+MODES = ("immediate", "coalesce", "debounce")
+
+
+class _Subscription:
+    __slots__ = ("event", "callback", "mode", "delay", "pending", "last_event")
+
+    def __init__(self, event, callback, mode, delay):
+        self.event = event
+        self.callback = callback
+        self.mode = mode
+        self.delay = delay
+        self.pending = []
+        self.last_event = 0.0
+
+
+class EventBus:
+    """
+    Responsabilidade: Entregar aos plugins os eventos do editor sem que eles precisem
+    olhar editor.lines a cada quadro.
+    emit() só enfileira (barato, pode ser chamado no meio de uma tecla); a entrega acontece
+    em dispatch(), chamado pelo loop principal depois do desenho. Modos de entrega:
+    - immediate: uma chamada por evento, callback(payload)
+    - coalesce:  uma chamada por dispatch com tudo que chegou, callback([payloads])
+    - debounce:  como coalesce, mas só depois de 'delay' segundos sem eventos novos
+    """
+    def __init__(self):
+        self.subscriptions = {event: [] for event in EVENTS}
+        self.errors = {} # callback -> último erro (um plugin com erro não derruba o editor)
+        self.metrics = None # PluginMetrics: tempo de cada callback, por plugin (módulo do callback)
+
+    def subscribe(self, event, callback, mode="immediate", delay=0.3):
+        """Inscreve callback no evento. Retorna o token para unsubscribe()."""
+        if event not in self.subscriptions:
+            raise ValueError(f"evento desconhecido: {event}")
+        if mode not in MODES:
+            raise ValueError(f"modo desconhecido: {mode}")
+        subscription = _Subscription(event, callback, mode, delay)
+        self.subscriptions[event].append(subscription)
+        return subscription
+
+    def unsubscribe(self, token):
+        subscriptions = self.subscriptions.get(getattr(token, "event", None), [])
+        if token in subscriptions:
+            subscriptions.remove(token)
+
+    def has_subscribers(self, event):
+        return bool(self.subscriptions.get(event))
+
+    def emit(self, event, payload):
+        subscriptions = self.subscriptions.get(event)
+        if not subscriptions:
+            return
+        now = time.time()
+        for subscription in subscriptions:
+            subscription.pending.append(payload)
+            subscription.last_event = now
+
+    def dispatch(self, now=None):
+        """Entrega o que está pendente (thread principal, fora do caminho da tecla)."""
+        now = now or time.time()
+        for subscriptions in self.subscriptions.values():
+            for subscription in list(subscriptions):
+                if not subscription.pending:
+                    continue
+                if subscription.mode == "debounce" and now - subscription.last_event < subscription.delay:
+                    continue
+                pending, subscription.pending = subscription.pending, []
+                if subscription.mode == "immediate":
+                    for payload in pending:
+                        self._deliver(subscription.callback, payload)
+                else:
+                    self._deliver(subscription.callback, pending)
+
+    def _deliver(self, callback, payload):
+        plugin = getattr(callback, '__module__', None) or "eventos"
+        if self.metrics is not None and not self.metrics.allowed(plugin, "event"):
+            return # Plugin estrangulado ou desativado pelo orçamento de tempo
+        started = time.perf_counter()
+        error = None
+        try:
+            callback(payload)
+        except Exception as e:
+            error = self.errors[callback] = f"{type(e).__name__}: {e}"
+        if self.metrics is not None:
+            self.metrics.record(plugin, "event", (time.perf_counter() - started) * 1000, error)
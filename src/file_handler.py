@@ -1,12 +1,25 @@
 # /home/johnb/tasma-code-absulut/src/file_handler.py
 import os
 import shutil
+import codecs
+from file_walker import FileWalker, BINARY_SNIFF_BYTES
+from directory_cache import DirectoryCache
+
+# Separadores reconhecidos por str.splitlines()
+LINE_BREAKS = ("\n", "\r", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
 
 class FileHandler:
     """
     Responsabilidade: Lidar com operações de I/O de arquivos.
     Não mantém estado do editor nem interage com o usuário.
     """
+    def __init__(self, config=None):
+        self.config = config
+        self.dir_cache = DirectoryCache()
+
+    def make_walker(self, show_hidden=False):
+        """Walker configurado com os filtros do usuário (gitignore, globs, tamanho)."""
+        return FileWalker.from_config(self.config, show_hidden)
     
     def load_file(self, filepath):
         """Lê um arquivo e retorna uma lista de strings (linhas)."""
@@ -20,31 +33,59 @@ class FileHandler:
         except IOError as e:
             raise IOError(f"Erro ao ler arquivo: {e}")
 
+    def iter_file_lines(self, filepath, first_chunk=64 * 1024, chunk_size=1024 * 1024):
+        """
+        Lê o arquivo em blocos e gera listas de linhas completas (mesma divisão de load_file).
+        O primeiro bloco é pequeno para a primeira tela aparecer logo.
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        pending = ""
+        size = first_chunk
+        try:
+            with open(filepath, 'rb') as f:
+                while True:
+                    data = f.read(size)
+                    size = chunk_size
+                    text = pending + decoder.decode(data, final=not data)
+                    lines = text.splitlines()
+                    pending = ""
+                    if data and lines and not text.endswith(LINE_BREAKS):
+                        pending = lines.pop() # Linha incompleta: continua no próximo bloco
+                    elif data and text.endswith('\r'):
+                        pending = lines.pop() + '\r' # Pode ser a metade de um \r\n
+                    if lines:
+                        yield lines
+                    if not data:
+                        return
+        except IOError as e:
+            raise IOError(f"Erro ao ler arquivo: {e}")
+
     def save_file(self, filepath, lines):
         """Escreve a lista de strings no arquivo."""
         try:
             with open(filepath, 'w', encoding='utf-8') as f:
                 f.write("\n".join(lines))
+            self.dir_cache.invalidate_parent(filepath)
         except IOError as e:
             raise IOError(f"Erro ao salvar arquivo: {e}")
 
     def list_directory(self, path, show_hidden=False):
         """Lista conteúdo do diretório, pastas primeiro. Retorna [(nome, is_dir), ...]"""
-        if not os.path.isdir(path):
-            return []
+        path = os.path.abspath(path)
+        cached = self.dir_cache.get(path, show_hidden)
+        if cached is not None:
+            return list(cached)
         try:
-            items = os.listdir(path)
-            if not show_hidden:
-                items = [i for i in items if not i.startswith('.')]
-            
-            items_info = [(i, os.path.isdir(os.path.join(path, i))) for i in items]
-            items_info.sort(key=lambda x: (not x[1], x[0].lower()))
-            
-            if os.path.abspath(path) != os.path.abspath(os.sep):
-                items_info.insert(0, ("..", True))
-            return items_info
+            # mtime lido antes da varredura: uma mudança durante o scan invalida na próxima leitura
+            mtime = os.stat(path).st_mtime_ns
+            items_info = FileWalker(show_hidden=show_hidden).scan(path)
         except OSError:
             return []
+        items_info.sort(key=lambda x: (not x[1], x[0].lower()))
+        if path != os.path.abspath(os.sep):
+            items_info.insert(0, ("..", True))
+        self.dir_cache.put(path, show_hidden, mtime, items_info)
+        return list(items_info)
 
     def is_dir(self, path):
         return os.path.isdir(path)
@@ -53,6 +94,8 @@ class FileHandler:
         """Move ou renomeia arquivo/diretório."""
         try:
             shutil.move(src, dst)
+            self.dir_cache.invalidate_parent(src)
+            self.dir_cache.invalidate_parent(dst)
             return True
         except OSError:
             return False
@@ -62,6 +105,7 @@ class FileHandler:
         try:
             with open(path, 'w') as f:
                 pass
+            self.dir_cache.invalidate_parent(path)
             return True
         except OSError:
             return False
@@ -70,6 +114,7 @@ class FileHandler:
         """Cria um diretório."""
         try:
             os.makedirs(path, exist_ok=True)
+            self.dir_cache.invalidate_parent(path)
             return True
         except OSError:
             return False
@@ -81,6 +126,7 @@ class FileHandler:
                 shutil.copytree(src, dst)
             else:
                 shutil.copy2(src, dst)
+            self.dir_cache.invalidate_parent(dst)
             return True
         except OSError:
             return False
@@ -90,22 +136,24 @@ class FileHandler:
         results = []
         if not query: return results
         
+        walker = self.make_walker(show_hidden)
+        needle = query.encode('utf-8')
         try:
-            for root, dirs, files in os.walk(root_path):
-                if not show_hidden:
-                    dirs[:] = [d for d in dirs if not d.startswith('.')]
-                    files = [f for f in files if not f.startswith('.')]
-                
-                for file in files:
-                    filepath = os.path.join(root, file)
-                    try:
-                        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                            for i, line in enumerate(f):
-                                if query in line:
-                                    results.append({
-                                        'file': filepath, 'line': i + 1, 'content': line.strip(), 'is_dir': False
-                                    })
-                                    if len(results) > 200: return results # Limite para performance
-                    except Exception: pass
+            for filepath, _, _ in walker.walk(root_path):
+                try:
+                    with open(filepath, 'rb') as f:
+                        data = f.read()
+                except OSError:
+                    continue
+                # Descarta rápido: sem ocorrência ou arquivo binário
+                if needle not in data or b'\0' in data[:BINARY_SNIFF_BYTES]:
+                    continue
+                text = data.decode('utf-8', errors='ignore')
+                for i, line in enumerate(text.splitlines()):
+                    if query in line:
+                        results.append({
+                            'file': filepath, 'line': i + 1, 'content': line.strip(), 'is_dir': False
+                        })
+                        if len(results) > 200: return results # Limite para performance
         except Exception: pass
         return results
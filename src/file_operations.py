@@ -0,0 +1,285 @@
+# /home/johnb/tasma-code-absulut/src/file_operations.py
+import os
+import stat
+import errno
+import queue
+import shutil
+import threading
+import collections
+
+COPY_CHUNK_SIZE = 8 * 1024 * 1024 # Bytes por chamada de cópia (checa cancelamento entre blocos)
+
+
+class OperationCancelled(Exception):
+    pass
+
+
+class FileOperation:
+    """Uma operação enfileirada (copy, move ou delete) e seu progresso."""
+    def __init__(self, kind, src, dst, undo=None, reverts=None):
+        self.kind = kind
+        self.src = src
+        self.dst = dst
+        self.undo = undo # Registro entregue à pilha de undo da sidebar quando terminar
+        self.reverts = reverts # Registro de undo que esta operação desfaz (volta à pilha se falhar)
+        self.status = "queued" # queued, running, done, cancelled, error
+        self.error = None
+        self.total_bytes = 0
+        self.done_bytes = 0
+        self.cancel_event = threading.Event()
+
+    @property
+    def name(self):
+        return os.path.basename(self.src.rstrip(os.sep))
+
+    def progress(self):
+        if self.total_bytes <= 0:
+            return 0
+        return min(100, int(self.done_bytes * 100 / self.total_bytes))
+
+    def describe(self):
+        labels = {"copy": "Copiando", "move": "Movendo", "delete": "Deletando"}
+        return f"{labels.get(self.kind, self.kind)} {self.name} {self.progress()}%"
+
+
+class FileOperationQueue:
+    """
+    Responsabilidade: Executar cópias, movimentações e exclusões da sidebar em uma thread,
+    sem travar o loop principal. Copia em blocos (copy_file_range/sendfile quando disponíveis),
+    informa o progresso e permite cancelar. Operações concluídas são coletadas via poll().
+    """
+    def __init__(self, file_handler):
+        self.file_handler = file_handler
+        self.pending = queue.Queue()
+        self.finished = collections.deque()
+        self.lock = threading.Lock()
+        self.current = None
+        self.queued = [] # Operações aguardando (para exibir e cancelar)
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+
+    # --- API (thread principal) -------------------------------------------------
+
+    def copy(self, src, dst, undo=None):
+        return self._submit(FileOperation("copy", src, dst, undo))
+
+    def move(self, src, dst, undo=None, reverts=None):
+        return self._submit(FileOperation("move", src, dst, undo, reverts))
+
+    def delete(self, path, trash_path, undo=None, reverts=None):
+        """Exclusão = mover para a lixeira (pode virar cópia se a lixeira estiver em outro disco)."""
+        return self._submit(FileOperation("delete", path, trash_path, undo, reverts))
+
+    def _submit(self, op):
+        with self.lock:
+            self.queued.append(op)
+        self.pending.put(op)
+        return op
+
+    def is_busy(self):
+        with self.lock:
+            return self.current is not None or bool(self.queued)
+
+    def cancel(self):
+        """Cancela a operação em andamento e as que estão na fila. Retorna quantas foram canceladas."""
+        with self.lock:
+            ops = list(self.queued)
+            if self.current:
+                ops.append(self.current)
+        for op in ops:
+            op.cancel_event.set()
+        return len(ops)
+
+    def progress_text(self):
+        """Texto curto para a barra de status ('' se não houver nada rodando)."""
+        with self.lock:
+            current = self.current
+            waiting = len(self.queued)
+        if not current:
+            return ""
+        text = current.describe()
+        if waiting:
+            text += f" (+{waiting})"
+        return text
+
+    def poll(self):
+        """Retorna as operações concluídas desde a última chamada (done, cancelled ou error)."""
+        done = []
+        while self.finished:
+            done.append(self.finished.popleft())
+        return done
+
+    # --- Worker -----------------------------------------------------------------
+
+    def _worker(self):
+        while True:
+            op = self.pending.get()
+            if op is None:
+                return
+            with self.lock:
+                if op in self.queued:
+                    self.queued.remove(op)
+                self.current = op
+            try:
+                if op.cancel_event.is_set():
+                    raise OperationCancelled()
+                op.status = "running"
+                if op.kind == "copy":
+                    self._copy_any(op, op.src, op.dst)
+                else:
+                    self._move(op, op.src, op.dst)
+                op.status = "done"
+            except OperationCancelled:
+                op.status = "cancelled"
+            except (OSError, shutil.Error) as e:
+                op.status = "error"
+                op.error = str(e)
+            finally:
+                self.file_handler.dir_cache.invalidate_parent(op.src)
+                self.file_handler.dir_cache.invalidate_parent(op.dst)
+                with self.lock:
+                    self.current = None
+                self.finished.append(op)
+
+    def _check_cancel(self, op):
+        if op.cancel_event.is_set():
+            raise OperationCancelled()
+
+    def _measure(self, path):
+        """Soma o tamanho dos arquivos (para a porcentagem de progresso)."""
+        total = 0
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            try:
+                st = os.lstat(current)
+            except OSError:
+                continue
+            if stat.S_ISDIR(st.st_mode):
+                try:
+                    with os.scandir(current) as it:
+                        stack.extend(entry.path for entry in it)
+                except OSError:
+                    pass
+            elif stat.S_ISREG(st.st_mode):
+                total += st.st_size
+        return total
+
+    def _move(self, op, src, dst):
+        if os.path.exists(dst):
+            raise OSError(errno.EEXIST, "Destino já existe", dst)
+        try:
+            os.rename(src, dst) # Mesmo sistema de arquivos: instantâneo
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        # Outro disco: copia e só remove a origem depois que a cópia terminou
+        self._copy_any(op, src, dst)
+        if op.cancel_event.is_set():
+            self._remove_partial(dst)
+            raise OperationCancelled()
+        if os.path.isdir(src) and not os.path.islink(src):
+            shutil.rmtree(src)
+        else:
+            os.remove(src)
+
+    def _copy_any(self, op, src, dst):
+        if os.path.exists(dst):
+            raise OSError(errno.EEXIST, "Destino já existe", dst)
+        op.total_bytes = self._measure(src)
+        try:
+            if os.path.isdir(src) and not os.path.islink(src):
+                self._copy_tree(op, src, dst)
+            else:
+                self._copy_entry(op, src, dst)
+        except BaseException:
+            # Cancelado ou falhou: não deixa cópia pela metade no destino
+            self._remove_partial(dst)
+            raise
+
+    def _copy_tree(self, op, src, dst):
+        stack = [(src, dst)]
+        dirs = []
+        while stack:
+            src_dir, dst_dir = stack.pop()
+            os.makedirs(dst_dir)
+            dirs.append((src_dir, dst_dir))
+            with os.scandir(src_dir) as it:
+                entries = list(it)
+            for entry in entries:
+                self._check_cancel(op)
+                target = os.path.join(dst_dir, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, target))
+                else:
+                    self._copy_entry(op, entry.path, target)
+        # Permissões/datas das pastas depois do conteúdo (copiar arquivos altera o mtime)
+        for src_dir, dst_dir in reversed(dirs):
+            try:
+                shutil.copystat(src_dir, dst_dir)
+            except OSError:
+                pass
+
+    def _copy_entry(self, op, src, dst):
+        if os.path.islink(src):
+            os.symlink(os.readlink(src), dst)
+            return
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            self._copy_data(op, fsrc.fileno(), fdst.fileno())
+        try:
+            shutil.copystat(src, dst)
+        except OSError:
+            pass
+
+    def _copy_data(self, op, in_fd, out_fd):
+        """Copia em blocos, do caminho mais rápido para o mais genérico."""
+        # copy_file_range: cópia dentro do kernel (e reflink em btrfs/xfs)
+        if hasattr(os, "copy_file_range"):
+            try:
+                while True:
+                    self._check_cancel(op)
+                    sent = os.copy_file_range(in_fd, out_fd, COPY_CHUNK_SIZE)
+                    if not sent:
+                        return
+                    op.done_bytes += sent
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EPERM):
+                    raise
+        # sendfile: também evita passar os dados pelo Python
+        if hasattr(os, "sendfile"):
+            offset = os.lseek(in_fd, 0, os.SEEK_CUR)
+            try:
+                while True:
+                    self._check_cancel(op)
+                    sent = os.sendfile(out_fd, in_fd, offset, COPY_CHUNK_SIZE)
+                    if not sent:
+                        return
+                    offset += sent
+                    op.done_bytes += sent
+            except OSError as e:
+                if e.errno not in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+                    raise
+                os.lseek(in_fd, offset, os.SEEK_SET)
+        while True:
+            self._check_cancel(op)
+            data = os.read(in_fd, 1024 * 1024)
+            if not data:
+                return
+            view = memoryview(data)
+            while view:
+                view = view[os.write(out_fd, view):]
+            op.done_bytes += len(data)
+
+    def _remove_partial(self, path):
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            elif os.path.lexists(path):
+                os.remove(path)
+        except OSError:
+            pass
+
+    def stop(self):
+        self.cancel()
+        self.pending.put(None)
@@ -44,7 +44,8 @@ class FilePicker:
         while self.active:
             self.draw()
             key = self.ui.get_input()
-            self.handle_input(key)
+            if key is not None:
+                self.handle_input(key)
         return self.selected_file
 
     def draw(self):
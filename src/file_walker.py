@@ -0,0 +1,272 @@
+# /home/johnb/tasma-code-absulut/src/file_walker.py
+import os
+import re
+import fnmatch
+
+# Pastas/arquivos que quase nunca interessam para busca ou fuzzy finder
+DEFAULT_EXCLUDE_GLOBS = [
+    ".git", ".hg", ".svn", "node_modules", "venv", ".venv", "env",
+    "__pycache__", ".mypy_cache", ".pytest_cache", ".ruff_cache", ".tox", ".nox",
+    "build", "dist", "target", "*.egg-info", "*.pyc", "*.pyo", "*.so", "*.o",
+]
+
+BINARY_SNIFF_BYTES = 8192
+
+
+def _glob_to_regex(pattern):
+    """Converte um glob estilo gitignore (com suporte a **) em regex."""
+    i, n = 0, len(pattern)
+    out = []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if i + 1 < n and pattern[i + 1] == '*':
+                # '**/' casa zero ou mais diretórios; '**' no fim casa tudo
+                if i + 2 < n and pattern[i + 2] == '/':
+                    out.append('(?:.*/)?')
+                    i += 3
+                    continue
+                out.append('.*')
+                i += 2
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            j = pattern.find(']', i + 1)
+            if j == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = j + 1
+                continue
+        elif c == '\\' and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+class IgnoreRules:
+    """
+    Regras compiladas de um arquivo .gitignore.
+    Os caminhos testados são relativos ao diretório onde o arquivo está.
+    """
+    def __init__(self, base_dir, lines):
+        self.base_dir = base_dir
+        self.rules = [] # [(regex, negate, dir_only)]
+        for raw in lines:
+            rule = self._compile(raw)
+            if rule:
+                self.rules.append(rule)
+
+    @classmethod
+    def from_file(cls, path):
+        """Carrega um .gitignore. Retorna None se não existir ou estiver vazio."""
+        try:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                rules = cls(os.path.dirname(path), f.read().splitlines())
+        except OSError:
+            return None
+        return rules if rules.rules else None
+
+    def _compile(self, line):
+        line = line.rstrip('\n')
+        # Espaços finais são ignorados, a menos que escapados
+        while line.endswith(' ') and not line.endswith('\\ '):
+            line = line[:-1]
+        if not line or line.startswith('#'):
+            return None
+
+        negate = False
+        if line.startswith('!'):
+            negate = True
+            line = line[1:]
+        elif line.startswith('\\!') or line.startswith('\\#'):
+            line = line[1:]
+
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            return None
+
+        # Padrão com '/' no início ou no meio é ancorado no diretório do .gitignore
+        anchored = '/' in line
+        line = line.lstrip('/')
+        body = _glob_to_regex(line)
+        if anchored:
+            regex = re.compile('^' + body + '$')
+        else:
+            regex = re.compile('^(?:.*/)?' + body + '$')
+        return regex, negate, dir_only
+
+    def match(self, rel_path, is_dir):
+        """Retorna True (ignorar), False (re-incluído por '!') ou None (sem regra)."""
+        result = None
+        for regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                result = not negate
+        return result
+
+
+class FileWalker:
+    """
+    Responsabilidade: Percorrer árvores de diretórios aplicando os filtros do editor
+    (ocultos, .gitignore aninhados, globs de exclusão, tamanho máximo e binários).
+    Compartilhado pelo fuzzy finder, grep e sidebar.
+    """
+    def __init__(self, show_hidden=False, exclude_globs=None, max_file_size=None,
+                 respect_gitignore=True, skip_binary=False):
+        self.show_hidden = show_hidden
+        self.exclude_globs = list(DEFAULT_EXCLUDE_GLOBS if exclude_globs is None else exclude_globs)
+        self.max_file_size = max_file_size
+        self.respect_gitignore = respect_gitignore
+        self.skip_binary = skip_binary
+
+        # Globs sem '/' testam só o nome (caso comum, mais rápido); com '/' testam o caminho relativo
+        name_globs = [g.rstrip('/') for g in self.exclude_globs if '/' not in g.rstrip('/')]
+        path_globs = [g.strip('/') for g in self.exclude_globs if '/' in g.rstrip('/')]
+        self._name_regex = re.compile('|'.join(fnmatch.translate(g) for g in name_globs)) if name_globs else None
+        self._path_regex = re.compile('|'.join(fnmatch.translate(g) for g in path_globs)) if path_globs else None
+
+    @classmethod
+    def from_config(cls, config, show_hidden=False, skip_binary=False):
+        """Cria um walker a partir das configurações do editor."""
+        settings = config.settings if config else {}
+        max_kb = settings.get("max_file_size_kb", 1024)
+        return cls(
+            show_hidden=show_hidden,
+            exclude_globs=settings.get("exclude_globs", DEFAULT_EXCLUDE_GLOBS),
+            max_file_size=max_kb * 1024 if max_kb else None,
+            respect_gitignore=settings.get("respect_gitignore", True),
+            skip_binary=skip_binary,
+        )
+
+    @staticmethod
+    def is_hidden(name):
+        return name.startswith('.')
+
+    @staticmethod
+    def is_binary(path):
+        """Heurística do git: arquivo com byte NUL no início é binário."""
+        try:
+            with open(path, 'rb') as f:
+                return b'\0' in f.read(BINARY_SNIFF_BYTES)
+        except OSError:
+            return True
+
+    def is_excluded(self, name, rel_path):
+        if not self.show_hidden and self.is_hidden(name):
+            return True
+        if self._name_regex and self._name_regex.match(name):
+            return True
+        if self._path_regex and self._path_regex.match(rel_path):
+            return True
+        return False
+
+    def _is_ignored(self, ignore_stack, path, is_dir):
+        """Avalia os .gitignore do mais externo para o mais interno; a última regra vence."""
+        ignored = False
+        for rules in ignore_stack:
+            # relpath e não fatiar o prefixo: base_dir pode terminar em separador (ex: "/")
+            rel = os.path.relpath(path, rules.base_dir).replace(os.sep, '/')
+            result = rules.match(rel, is_dir)
+            if result is not None:
+                ignored = result
+        return ignored
+
+    def scan(self, path):
+        """Lista um único nível. Retorna [(nome, is_dir)] só com o filtro de ocultos."""
+        items = []
+        with os.scandir(path) as it:
+            for entry in it:
+                if not self.show_hidden and self.is_hidden(entry.name):
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                items.append((entry.name, is_dir))
+        return items
+
+    def walk(self, root, include_dirs=False):
+        """
+        Gera (caminho_absoluto, caminho_relativo, is_dir) para cada arquivo aceito
+        (e diretório, se include_dirs). Usa os.scandir e o cache de tipo do DirEntry.
+        """
+        root = os.path.abspath(root)
+        base_stack = []
+        if self.respect_gitignore:
+            # .gitignore dos diretórios acima da raiz (até o topo do repositório) também valem
+            parent = root
+            ancestors = []
+            while True:
+                ancestors.append(parent)
+                if os.path.isdir(os.path.join(parent, '.git')):
+                    break
+                up = os.path.dirname(parent)
+                if up == parent:
+                    ancestors = [root]
+                    break
+                parent = up
+            for d in reversed(ancestors[1:]):
+                rules = IgnoreRules.from_file(os.path.join(d, '.gitignore'))
+                if rules:
+                    base_stack.append(rules)
+
+        # Pilha explícita (sem recursão) de (diretório, relativo, regras acumuladas)
+        pending = [(root, "", base_stack)]
+        while pending:
+            dir_path, dir_rel, ignore_stack = pending.pop()
+            if self.respect_gitignore:
+                rules = IgnoreRules.from_file(os.path.join(dir_path, '.gitignore'))
+                if rules:
+                    ignore_stack = ignore_stack + [rules]
+            try:
+                with os.scandir(dir_path) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+
+            subdirs = []
+            for entry in entries:
+                name = entry.name
+                rel = f"{dir_rel}/{name}" if dir_rel else name
+                if self.is_excluded(name, rel):
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    continue
+                if ignore_stack and self._is_ignored(ignore_stack, entry.path, is_dir):
+                    continue
+
+                if is_dir:
+                    # Não segue links simbólicos para diretórios (evita ciclos)
+                    if not entry.is_symlink():
+                        subdirs.append((entry.path, rel, ignore_stack))
+                    if include_dirs:
+                        yield entry.path, rel, True
+                    continue
+
+                if self.max_file_size is not None:
+                    try:
+                        if entry.stat().st_size > self.max_file_size:
+                            continue
+                    except OSError:
+                        continue
+                if self.skip_binary and self.is_binary(entry.path):
+                    continue
+                yield entry.path, rel, False
+
+            # Ordem alfabética na saída: empilha ao contrário
+            subdirs.sort(key=lambda d: d[1], reverse=True)
+            pending.extend(subdirs)
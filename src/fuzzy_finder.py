@@ -1,5 +1,6 @@
 import curses
 import os
+from file_walker import FileWalker
 
 class FuzzyFinderWindow:
     def __init__(self, ui, project_root, tab_manager, show_hidden=False):
@@ -18,20 +19,10 @@ class FuzzyFinderWindow:
         self.filtered_files = self.all_files
 
     def _get_file_list(self):
-        """Recursively gets all files in the project root."""
-        file_list = []
-        for root, dirs, files in os.walk(self.project_root):
-            if not self.show_hidden:
-                # Exclude hidden directories and files
-                dirs[:] = [d for d in dirs if not d.startswith('.')]
-                files = [f for f in files if not f.startswith('.')]
-            
-            for file in files:
-                # Store path relative to project root
-                full_path = os.path.join(root, file)
-                relative_path = os.path.relpath(full_path, self.project_root)
-                file_list.append(relative_path)
-        return sorted(file_list)
+        """Recursively gets all files in the project root (respecting ignore rules)."""
+        walker = FileWalker.from_config(self.ui.config, self.show_hidden)
+        # Store path relative to project root
+        return sorted(rel.replace('/', os.sep) for _, rel, _ in walker.walk(self.project_root))
 
     def _fuzzy_match(self):
         """Filters and sorts files based on the query."""
@@ -57,7 +48,8 @@ class FuzzyFinderWindow:
         while self.active:
             self.draw()
             key = self.ui.get_input()
-            self.handle_input(key)
+            if key is not None:
+                self.handle_input(key)
 
     def draw(self):
         h, w = self.ui.height, self.ui.width
@@ -68,6 +68,7 @@ class HelpWindow:
                 ("Alternar Sidebar", "toggle_sidebar"), ("Alternar Chat IA", "toggle_right_sidebar"),
                 ("Alternar Split", "toggle_split"), ("Abrir Configurações", "open_settings"),
                 ("Abrir Git", "open_git_window"), ("Mostrar Ajuda", "help"),
+                ("Desempenho de Plugins", "plugin_stats"),
             ]
         }
         
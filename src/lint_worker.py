@@ -0,0 +1,379 @@
+# /home/johnb/tasma-code-absulut/src/lint_worker.py
+"""
+Processo de lint de longa duração.
+O editor inicia este arquivo uma vez (python lint_worker.py) e conversa com ele por
+stdin/stdout, uma mensagem JSON por linha:
+    pedido:   {"id": 1, "filepath": "...", "content": "..."}
+    resposta: {"id": 1, "errors": {"<linha 0-based>": ["msg", ...]}}
+pyflakes/pycodestyle (o que o flake8 roda por baixo) são importados só uma vez, e só nos
+processos que analisam (o editor importa este módulo, mas não carrega os checadores).
+Como antes, os checadores só rodam com o flake8 instalado, e a seção [flake8] do projeto
+(setup.cfg, tox.ini ou .flake8, procurados a partir da pasta do arquivo) vale.
+"""
+import os
+import sys
+import ast
+import json
+import queue
+import hashlib
+import shutil
+import select
+import threading
+import subprocess
+import configparser
+
+# O lint de estilo sempre dependeu do flake8 instalado: sem ele, só a checagem de sintaxe
+FLAKE8_INSTALLED = shutil.which("flake8") is not None
+
+pyflakes = None
+pycodestyle = None
+_CollectReport = None
+_checkers_loaded = False
+
+
+def load_checkers():
+    """Importa pyflakes/pycodestyle na primeira análise (worker ou varredura do projeto)."""
+    global pyflakes, pycodestyle, _CollectReport, _checkers_loaded
+    if _checkers_loaded:
+        return
+    _checkers_loaded = True
+    if not FLAKE8_INSTALLED:
+        return
+    try:
+        import pyflakes.checker
+    except ImportError:
+        pyflakes = None
+
+    try:
+        import pycodestyle
+    except ImportError:
+        pycodestyle = None
+        return
+
+    class CollectReport(pycodestyle.BaseReport):
+        """Guarda os erros do pycodestyle em vez de imprimir."""
+        def __init__(self, options):
+            super().__init__(options)
+            self.found = []
+
+        def error(self, line_number, offset, text, check):
+            code = super().error(line_number, offset, text, check)
+            if code:
+                self.found.append((line_number, text))
+            return code
+
+    _CollectReport = CollectReport
+
+
+FLAKE8_CONFIG_FILES = ("setup.cfg", "tox.ini", ".flake8")
+# Códigos que o flake8 dá às mensagens do pyflakes (para valer o ignore do projeto)
+PYFLAKES_CODES = {
+    "UnusedImport": "F401", "ImportShadowedByLoopVar": "F402", "ImportStarUsed": "F403",
+    "LateFutureImport": "F404", "ImportStarUsage": "F405", "ImportStarNotPermitted": "F406",
+    "FutureFeatureNotDefined": "F407", "PercentFormatInvalidFormat": "F501",
+    "StringDotFormatExtraPositionalArguments": "F523", "MultiValueRepeatedKeyLiteral": "F601",
+    "TooManyExpressionsInStarredAssignment": "F621", "AssertTuple": "F631", "IsLiteral": "F632",
+    "FStringMissingPlaceholders": "F541", "BreakOutsideLoop": "F701", "ContinueOutsideLoop": "F702",
+    "ReturnOutsideFunction": "F706", "DefaultExceptNotLast": "F707", "DoctestSyntaxError": "F721",
+    "ForwardAnnotationSyntaxError": "F722", "RedefinedWhileUnused": "F811", "UndefinedName": "F821",
+    "UndefinedExport": "F822", "UndefinedLocal": "F823", "DuplicateArgument": "F831",
+    "UnusedVariable": "F841", "UnusedAnnotation": "F842", "RaiseNotImplemented": "F901",
+}
+
+_config_for_dir = {} # pasta -> arquivo de config do flake8 (ou None)
+_style_guides = {} # (arquivo de config, mtime) -> (StyleGuide, códigos ignorados)
+
+
+def _find_flake8_config(directory):
+    """Primeiro setup.cfg/tox.ini/.flake8 com seção [flake8], subindo a partir da pasta."""
+    if directory in _config_for_dir:
+        return _config_for_dir[directory]
+    found = None
+    current = directory
+    while True:
+        for name in FLAKE8_CONFIG_FILES:
+            path = os.path.join(current, name)
+            if os.path.isfile(path):
+                parser = configparser.RawConfigParser()
+                try:
+                    parser.read(path, encoding='utf-8')
+                except (configparser.Error, OSError, UnicodeDecodeError):
+                    continue
+                if parser.has_section("flake8"):
+                    found = path
+                    break
+        if found:
+            break
+        up = os.path.dirname(current)
+        if up == current:
+            break
+        current = up
+    _config_for_dir[directory] = found
+    return found
+
+
+def _split_codes(value):
+    return [code.strip() for code in value.replace(",", " ").split() if code.strip()]
+
+
+def _style_guide_for(filepath):
+    """StyleGuide do pycodestyle com ignore/max-line-length do [flake8] do projeto."""
+    directory = os.path.dirname(os.path.abspath(filepath)) if filepath else os.getcwd()
+    config = _find_flake8_config(directory)
+    try:
+        mtime = os.stat(config).st_mtime_ns if config else None
+    except OSError:
+        mtime = None
+    key = (config, mtime)
+    cached = _style_guides.get(key)
+    if cached is not None:
+        return cached
+
+    options = {}
+    if config:
+        parser = configparser.RawConfigParser()
+        try:
+            parser.read(config, encoding='utf-8')
+            options = {k.replace("_", "-"): v for k, v in parser.items("flake8")}
+        except (configparser.Error, OSError, UnicodeDecodeError):
+            options = {}
+    # Como no flake8: ignore substitui a lista padrão, extend-ignore soma a ela
+    ignore = _split_codes(options["ignore"]) if "ignore" in options else sorted(pycodestyle.DEFAULT_IGNORE.split(","))
+    ignore += _split_codes(options.get("extend-ignore", ""))
+    kwargs = {"quiet": True, "parse_argv": False, "config_file": False, "ignore": ignore}
+    for name in ("max-line-length", "max-doc-length"):
+        if name in options:
+            try:
+                kwargs[name.replace("-", "_")] = int(options[name])
+            except ValueError:
+                pass
+    cached = _style_guides[key] = (pycodestyle.StyleGuide(**kwargs), tuple(ignore))
+    return cached
+
+
+def _add(errors, lineno, msg):
+    errors.setdefault(lineno, []).append(msg)
+
+
+def analyze(content, filepath=None):
+    """Analisa o código e retorna {linha_0_based: [mensagens]}."""
+    load_checkers()
+    errors = {}
+    filename = filepath if filepath else "<string>"
+
+    # 1. Verificação de Sintaxe (Rápida, Built-in)
+    try:
+        compile(content, filename, 'exec')
+    except SyntaxError as e:
+        if e.lineno is not None:
+            errors[e.lineno - 1] = [f"SyntaxError: {e.msg}"]
+        return errors
+    except Exception:
+        return errors
+
+    # Só arquivos Python passam pelos checadores
+    if filepath and not filepath.endswith('.py'):
+        return errors
+
+    ignore = ()
+    if pycodestyle:
+        try:
+            style_guide, ignore = _style_guide_for(filepath)
+        except Exception:
+            style_guide = None
+
+    # 2. pyflakes (nomes não usados/indefinidos)
+    if pyflakes:
+        try:
+            tree = ast.parse(content, filename)
+            checker = pyflakes.checker.Checker(tree, filename=filename)
+            for m in sorted(checker.messages, key=lambda m: m.lineno):
+                code = PYFLAKES_CODES.get(type(m).__name__, "F")
+                if any(code.startswith(prefix) for prefix in ignore):
+                    continue
+                _add(errors, m.lineno - 1, m.message % m.message_args)
+        except Exception:
+            pass
+
+    # 3. pycodestyle (estilo)
+    if pycodestyle and style_guide is not None:
+        try:
+            report = _CollectReport(style_guide.options)
+            lines = content.splitlines(True)
+            pycodestyle.Checker(filename, lines=lines, options=style_guide.options, report=report).check_all()
+            for lineno, text in report.found:
+                _add(errors, lineno - 1, text)
+        except Exception:
+            pass
+
+    return errors
+
+
+def analyze_file(path, known_digest=None):
+    """
+    Lê e analisa um arquivo do disco (usado pela varredura do projeto em outro processo).
+    Retorna (digest, erros); erros é None se o conteúdo tem o mesmo digest já conhecido.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None, {}
+    digest = hashlib.sha1(data).hexdigest()
+    if digest == known_digest:
+        return digest, None
+    return digest, analyze(data.decode('utf-8', errors='replace'), path)
+
+
+def lower_priority():
+    """Initializer dos processos de varredura: roda com prioridade baixa (nice)."""
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+
+def serve(stdin, stdout):
+    """Loop do processo worker: lê pedidos, responde com os erros."""
+    for line in stdin:
+        try:
+            request = json.loads(line)
+        except ValueError:
+            continue
+        errors = analyze(request.get("content", ""), request.get("filepath"))
+        response = {"id": request.get("id"), "errors": {str(k): v for k, v in errors.items()}}
+        stdout.write(json.dumps(response) + "\n")
+        stdout.flush()
+
+
+class LintWorker:
+    """
+    Responsabilidade: Manter um único processo de lint vivo, compartilhado por todas as abas.
+    Pedidos entram numa fila limitada (os mais antigos são descartados se encher) e são
+    enviados um por vez; se o processo morrer ou travar, ele é reiniciado.
+    Um pedido com a mesma 'key' (ex: o mesmo buffer) substitui o anterior ainda não enviado.
+    """
+    def __init__(self, max_pending=8, timeout=10.0):
+        self.requests = queue.Queue(maxsize=max_pending)
+        self.timeout = timeout
+        self.proc = None
+        self.unavailable = False # Não foi possível criar o processo (usa a thread mesmo)
+        self.next_id = 0
+        self.latest = {} # key -> id do pedido mais recente (os anteriores são cancelados)
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def submit(self, content, filepath, callback, key=None):
+        """
+        Agenda um lint. callback(errors) é chamado na thread do worker
+        (errors é None em falha ou se o pedido foi substituído por outro com a mesma key).
+        """
+        with self.lock:
+            self.next_id += 1
+            request = {"id": self.next_id, "filepath": filepath, "content": content}
+            if key is not None:
+                self.latest[key] = self.next_id
+        while True:
+            try:
+                self.requests.put_nowait((request, callback, key))
+                return request["id"]
+            except queue.Full:
+                # Fila cheia: o pedido mais antigo já está desatualizado
+                try:
+                    dropped = self.requests.get_nowait()
+                except queue.Empty:
+                    continue
+                if dropped:
+                    try:
+                        dropped[1](None)
+                    except Exception:
+                        pass
+
+    def _start(self):
+        self.stop_process()
+        try:
+            self.proc = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__)],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                text=True, encoding='utf-8', bufsize=1
+            )
+        except OSError:
+            self.proc = None
+            self.unavailable = True
+        return self.proc
+
+    def _request(self, request):
+        """Envia um pedido e espera a resposta. Retorna os erros ou None se o processo falhou."""
+        if (self.proc is None or self.proc.poll() is not None) and not self._start():
+            return None
+        try:
+            self.proc.stdin.write(json.dumps(request) + "\n")
+            self.proc.stdin.flush()
+            while True:
+                ready, _, _ = select.select([self.proc.stdout], [], [], self.timeout)
+                if not ready:
+                    raise TimeoutError()
+                line = self.proc.stdout.readline()
+                if not line:
+                    raise EOFError()
+                response = json.loads(line)
+                if response.get("id") == request["id"]:
+                    return {int(k): v for k, v in response.get("errors", {}).items()}
+        except (OSError, ValueError, EOFError, TimeoutError):
+            # Processo morreu ou travou: o próximo pedido sobe um novo
+            self.stop_process()
+            return None
+
+    def _loop(self):
+        while True:
+            item = self.requests.get()
+            if item is None:
+                return
+            request, callback, key = item
+            with self.lock:
+                superseded = key is not None and self.latest.get(key) != request["id"]
+                if not superseded and key is not None:
+                    del self.latest[key]
+            if superseded:
+                # Já existe um pedido mais novo para o mesmo buffer: não gasta o worker com este
+                try:
+                    callback(None)
+                except Exception:
+                    pass
+                continue
+            errors = self._request(request)
+            if errors is None and self.unavailable:
+                # Sem processo (ex: sem permissão para criar): analisa aqui mesmo
+                try:
+                    errors = analyze(request["content"], request["filepath"])
+                except Exception:
+                    errors = None
+            try:
+                callback(errors)
+            except Exception:
+                pass
+
+    def stop_process(self):
+        proc, self.proc = self.proc, None
+        if proc and proc.poll() is None:
+            try:
+                proc.kill()
+                proc.wait(timeout=1)
+            except Exception:
+                pass
+
+    def stop(self):
+        self.stop_process()
+        try:
+            self.requests.put_nowait(None)
+        except queue.Full:
+            pass
+
+
+if __name__ == "__main__":
+    # O protocolo usa o stdout: qualquer print perdido dos checadores vai para o stderr
+    out = sys.stdout
+    sys.stdout = sys.stderr
+    load_checkers()
+    serve(sys.stdin, out)
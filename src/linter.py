@@ -1,62 +1,92 @@
 # /home/johnb/tasma-code-absulut/src/linter.py
 import threading
-import subprocess
-import sys
-import shutil
+import hashlib
+import collections
+from lint_worker import LintWorker
 
 class Linter:
-    def __init__(self):
-        self.thread = None
-        self.lock = threading.Lock()
+    """
+    Responsabilidade: Agendar lints no worker compartilhado e aplicar os resultados.
+    Cada pedido leva a versão do buffer; pedidos antigos do mesmo editor são substituídos
+    e resultados que chegam depois de uma nova edição são descartados.
+    Resultados ficam em cache pelo hash do conteúdo (undo e troca de aba reaproveitam).
+    """
+    # Um único processo de lint para todas as abas (e todas as instâncias de Linter)
+    _worker = None
+    _worker_lock = threading.Lock()
+
+    def __init__(self, cache_size=64):
+        self.cache = collections.OrderedDict() # (hash, filepath) -> erros
+        self.cache_size = cache_size
+        self.results = collections.deque() # (editor, versão, chave do cache, erros) vindos do worker
+        self.requested = {} # id(editor) -> versão já pedida ou aplicada
+
+    @classmethod
+    def get_worker(cls):
+        with cls._worker_lock:
+            if cls._worker is None:
+                cls._worker = LintWorker()
+            return cls._worker
+
+    def _cache_get(self, key):
+        errors = self.cache.get(key)
+        if errors is not None:
+            self.cache.move_to_end(key)
+        return errors
+
+    def _cache_put(self, key, errors):
+        self.cache[key] = errors
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
 
     def lint(self, editor, filepath):
-        """Inicia o processo de linting em background."""
-        if self.thread and self.thread.is_alive():
-            return # Evita sobreposição de threads
+        """Pede o lint da versão atual do buffer (no máximo um pedido por versão)."""
+        version = editor.version
+        if self.requested.get(id(editor)) == version:
+            return # Essa versão já foi pedida
 
         # Captura o conteúdo no thread principal para evitar condições de corrida
         content = "\n".join(editor.lines)
-        
-        self.thread = threading.Thread(target=self._run_lint, args=(editor, filepath, content))
-        self.thread.daemon = True
-        self.thread.start()
-
-    def _run_lint(self, editor, filepath, content):
-        errors = {}
-        
-        # 1. Verificação de Sintaxe (Rápida, Built-in)
-        try:
-            compile(content, filepath if filepath else "<string>", 'exec')
-        except SyntaxError as e:
-            # Apenas adiciona o erro se o número da linha for válido
-            if e.lineno is not None:
-                lineno = e.lineno - 1 # Converte para 0-based
-                errors[lineno] = [f"SyntaxError: {e.msg}"]
-        except Exception:
-            pass
-
-        # 2. Flake8 (Externo) - Opcional
-        # Só roda se tiver flake8 instalado e for arquivo Python
-        if (not filepath or filepath.endswith('.py')) and shutil.which("flake8"):
-            try:
-                # Passa conteúdo via stdin
-                proc = subprocess.run(
-                    [sys.executable, "-m", "flake8", "-", "--format=%(row)d:%(text)s"],
-                    input=content.encode('utf-8'),
-                    capture_output=True,
-                    timeout=3
-                )
-                if proc.stdout:
-                    for line in proc.stdout.decode('utf-8').splitlines():
-                        parts = line.split(':', 1)
-                        if len(parts) == 2:
-                            try:
-                                lineno = int(parts[0]) - 1
-                                msg = parts[1].strip()
-                                if lineno not in errors: errors[lineno] = []
-                                errors[lineno].append(msg)
-                            except ValueError: pass
-            except Exception: pass
-
-        # Atualiza o editor (operação atômica de atribuição de dict é segura em CPython)
-        editor.linter_errors = errors
\ No newline at end of file
+        key = (hashlib.sha1(content.encode('utf-8', 'surrogatepass')).hexdigest(), filepath)
+        self.requested[id(editor)] = version
+
+        cached = self._cache_get(key)
+        if cached is not None:
+            editor.linter_errors = dict(cached)
+            editor.mark_all_dirty()
+            return
+
+        def done(errors):
+            # errors None: falhou, foi substituído ou descartado da fila cheia (poll() decide)
+            self.results.append((editor, version, key, errors))
+
+        self.get_worker().submit(content, filepath, done, key=id(editor))
+
+    def poll(self):
+        """Aplica os resultados prontos (thread principal). Retorna True se algum editor mudou."""
+        changed = False
+        while self.results:
+            editor, version, key, errors = self.results.popleft()
+            if errors is None:
+                # Sem resultado: se ainda é a versão pedida, libera para pedir de novo
+                if self.requested.get(id(editor)) == version:
+                    del self.requested[id(editor)]
+                continue
+            self._cache_put(key, errors)
+            if editor.version != version:
+                continue # Buffer mudou desde o pedido: resultado velho não é mostrado
+            editor.linter_errors = dict(errors)
+            editor.mark_all_dirty()
+            changed = True
+        return changed
+
+    def forget(self, editor):
+        """Esquece o editor (aba fechada)."""
+        self.requested.pop(id(editor), None)
+
+    def stop(self):
+        with Linter._worker_lock:
+            if Linter._worker:
+                Linter._worker.stop()
+                Linter._worker = None
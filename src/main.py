@@ -1,4 +1,5 @@
 # /home/johnb/tasma-code-absulut/src/main.py
+from startup_profiler import profiler
 import sys
 import curses
 import os
@@ -9,57 +10,336 @@ from editor import Editor
 from ui import UI
 from file_handler import FileHandler
 from config import Config
-from config_window import ConfigWindow
-from fuzzy_finder import FuzzyFinderWindow
 import locale
 import time
 from linter import Linter
+from diagnostics import DiagnosticsService
+from recovery_journal import RecoveryJournal
 from plugin_manager import PluginManager
-from html_exporter import HtmlExporter
 from session_manager import SessionManager
-from extractor import ThemeExtractor
-from file_picker import FilePicker
-import json
+from directory_cache import DirectoryWatcher
+from sidebar_tree import SidebarTree
+from file_operations import FileOperationQueue
+from buffer_spill import BufferSpill
+from server import EditorServer, parse_target
+from event_bus import EventBus
+from plugin_metrics import PluginMetrics
 import importlib
-try:
-    import psutil
-except ImportError:
-    psutil = None
+import queue
+import threading
+
+# Módulos de janelas e ferramentas pouco usadas (config_window, fuzzy_finder, file_picker,
+# html_exporter, extractor) e o psutil são importados só quando precisam: não atrasam o primeiro quadro
+profiler.mark("imports")
 
 class TabManager:
     """
     Responsabilidade: Gerenciar múltiplos arquivos abertos como abas.
     Mantém uma lista de objetos Editor e o índice da aba ativa.
     """
-    def __init__(self, initial_filepath, file_handler):
+    def __init__(self, initial_filepath, file_handler, journal=None, events=None):
         self.file_handler = file_handler
-        self.open_tabs = [] # List of {'filepath': str, 'editor': Editor}
+        self.journal = journal # Diário de recuperação (edições não salvas)
+        self.events = events # EventBus dos plugins (on_change, on_open, on_save)
+        # List of {'filepath': str, 'editor': Editor}
+        # Abas restauradas da sessão começam com 'editor': None e 'state' (cursor, dobras...)
+        # e só carregam o arquivo quando são exibidas pela primeira vez (ensure_loaded).
+        # Abas inativas despejadas pelo orçamento de memória voltam a esse formato; se estavam
+        # modificadas, guardam também 'spill' (arquivo comprimido) e 'journal_entry'.
+        self.open_tabs = []
         self.current_tab_index = -1
-        self.open_file(initial_filepath) # Open the initial file
+        self.loaders = {} # Editor -> (fila de blocos, evento de cancelamento) dos arquivos carregando
+        self.spill = BufferSpill()
+        self.use_clock = 0 # Contador de acessos (LRU das abas)
+        self.memory = {'current': 0, 'total': 0} # Última medição de memory_report()
+        self.dropped = None # (índice, erro) da última aba da sessão que não pôde ser lida
+        if initial_filepath:
+            self.open_file(initial_filepath) # Open the initial file
 
     def open_file(self, filepath):
         # Check if file is already open
+        abs_path = os.path.abspath(filepath)
         for i, tab in enumerate(self.open_tabs):
-            if tab['filepath'] == filepath:
+            if tab['filepath'] == filepath or os.path.abspath(tab['filepath']) == abs_path:
                 self.current_tab_index = i
-                return tab['editor']
-
-        # If not open, load it and create a new editor
+                editor = self.ensure_loaded(i)
+                if editor is None and self.dropped:
+                    raise IOError(self.dropped[1])
+                return editor
+
+        # If not open, load it and create a new editor (erros sobem para o main mostrar no status)
+        editor = self._load_editor(filepath)
+        self.open_tabs.append({'filepath': filepath, 'editor': editor})
+        self.current_tab_index = len(self.open_tabs) - 1
+        self._touch(self.open_tabs[-1])
+        return editor
+
+    def _load_editor(self, filepath):
+        """Cria o Editor de um arquivo (síncrono ou, se for grande, carregando em background)."""
+        # Arquivos grandes abrem em background: a aba aparece na hora e o texto vai chegando
+        settings = self.file_handler.config.settings if self.file_handler.config else {}
+        threshold = settings.get("async_open_threshold_kb", 1024) * 1024
         try:
-            initial_lines = self.file_handler.load_file(filepath)
-            editor = Editor(initial_lines)
-            self.open_tabs.append({'filepath': filepath, 'editor': editor})
-            self.current_tab_index = len(self.open_tabs) - 1
+            is_large = os.path.getsize(filepath) > threshold
+        except OSError:
+            is_large = False
+        if is_large:
+            editor = Editor()
+            editor.begin_loading()
+            self._start_loader(editor, filepath)
             return editor
-        except Exception as e:
-            # Re-raise for main to handle status_msg
-            raise e
 
-    def get_current_editor(self):
-        if self.open_tabs and 0 <= self.current_tab_index < len(self.open_tabs):
-            return self.open_tabs[self.current_tab_index]['editor']
+        editor = Editor(self.file_handler.load_file(filepath))
+        if self.journal:
+            self.journal.attach(editor, filepath)
+        self._watch(editor, filepath, opened=True)
+        return editor
+
+    def _watch(self, editor, filepath, opened=False):
+        """Publica as edições do editor no EventBus (e o on_open, se acabou de ser lido)."""
+        if not self.events:
+            return
+        editor.edit_listeners.append(self._on_edit)
+        if opened:
+            self.events.emit("on_open", {'path': filepath, 'lines': len(editor.lines)})
+
+    def _on_edit(self, editor, start, removed, inserted):
+        if self.events.has_subscribers("on_change"):
+            self.events.emit("on_change", {
+                'path': self._filepath_of(editor), 'start': start, 'removed': removed,
+                'lines': editor.lines[start:start + inserted], 'version': editor.version,
+            })
+
+    def add_placeholder(self, filepath, state=None):
+        """Aba restaurada da sessão: aparece na barra de abas, mas o arquivo só é lido ao ser exibida."""
+        self.open_tabs.append({'filepath': filepath, 'editor': None, 'state': state or {}})
+
+    def ensure_loaded(self, index):
+        """Carrega a aba se ainda for um placeholder da sessão. Retorna o Editor (None se falhar)."""
+        if not 0 <= index < len(self.open_tabs):
+            return None
+        tab = self.open_tabs[index]
+        self._touch(tab)
+        if tab['editor'] is None and 'spill' in tab:
+            self._restore_spilled(tab)
+        if tab['editor'] is None:
+            try:
+                tab['editor'] = self._load_editor(tab['filepath'])
+            except FileNotFoundError:
+                # Arquivo apagado desde a última sessão: abre vazio como um arquivo novo
+                tab['editor'] = Editor()
+                self._watch(tab['editor'], tab['filepath'])
+            except Exception as e:
+                # Ilegível (encoding, permissão...): a aba sai. Um buffer vazio salvaria por cima do arquivo
+                self._drop_tab(index, f"Erro ao abrir {tab['filepath']}: {e}")
+                return None
+            if not tab['editor'].loading:
+                tab['editor'].apply_view_state(tab.pop('state', {}))
+        return tab['editor']
+
+    def _drop_tab(self, index, error):
+        """Tira da lista a aba da sessão que não pôde ser lida; o main mostra 'dropped' no status."""
+        tab = self.open_tabs.pop(index)
+        if tab.get('journal_entry') and self.journal:
+            self.journal.abandon(tab['journal_entry']) # Edições despejadas ficam para a recuperação
+        if self.current_tab_index >= len(self.open_tabs) or self.current_tab_index > index:
+            self.current_tab_index = max(0, self.current_tab_index - 1) if self.open_tabs else -1
+        self.dropped = (index, error)
+
+    def _touch(self, tab):
+        self.use_clock += 1
+        tab['last_used'] = self.use_clock
+
+    def _restore_spilled(self, tab):
+        path = tab.pop('spill')
+        entry = tab.pop('journal_entry', None)
+        editor = self.spill.load(path)
+        if editor is None:
+            # Não deu para ler de volta: reabre do disco e deixa o diário para a recuperação
+            if entry and self.journal:
+                self.journal.abandon(entry)
+            return
+        tab['editor'] = editor
+        tab.pop('state', None)
+        if entry and self.journal:
+            self.journal.resume(editor, entry)
+        self._watch(editor, tab['filepath'])
+
+    # --- Orçamento de memória ---------------------------------------------------
+
+    def memory_report(self):
+        """Mede a memória dos buffers carregados: {'current': bytes da aba atual, 'total': bytes}."""
+        total = 0
+        current = 0
+        for i, tab in enumerate(self.open_tabs):
+            if tab['editor'] is None:
+                continue
+            size = tab['editor'].memory_usage()
+            total += size
+            if i == self.current_tab_index:
+                current = size
+        self.memory = {'current': current, 'total': total}
+        return self.memory
+
+    def enforce_memory_budget(self, keep_indices=()):
+        """
+        Se os buffers passam de "tab_memory_budget_mb", despeja as abas usadas há mais tempo
+        (nunca as visíveis nem as que ainda estão carregando). Não modificadas são só descartadas
+        (recarregam do disco); modificadas vão comprimidas para o BufferSpill.
+        Retorna os Editors despejados.
+        """
+        settings = self.file_handler.config.settings if self.file_handler.config else {}
+        budget = settings.get("tab_memory_budget_mb", 512) * 1024 * 1024
+        total = self.memory_report()['total']
+        if total <= budget:
+            return []
+        keep = set(keep_indices) | {self.current_tab_index}
+        candidates = [tab for i, tab in enumerate(self.open_tabs)
+                      if i not in keep and tab['editor'] is not None and not tab['editor'].loading]
+        candidates.sort(key=lambda tab: tab.get('last_used', 0))
+        evicted = []
+        for tab in candidates:
+            if total <= budget:
+                break
+            editor = tab['editor']
+            size = editor.memory_usage()
+            if self._evict(tab):
+                evicted.append(editor)
+                total -= size
+        self.memory['total'] = total
+        return evicted
+
+    def _evict(self, tab):
+        editor = tab['editor']
+        if editor.is_modified:
+            path = self.spill.store(editor)
+            if path is None:
+                return False # Sem espaço no temp: a aba fica na memória
+            tab['spill'] = path
+            if self.journal:
+                tab['journal_entry'] = self.journal.suspend(editor)
+        elif self.journal:
+            self.journal.detach(editor) # Igual ao disco: nada a recuperar
+        tab['state'] = editor.view_state()
+        tab['editor'] = None
+        return True
+
+    def _is_modified(self, tab):
+        if tab['editor'] is not None:
+            return tab['editor'].is_modified
+        return 'spill' in tab # Só buffers modificados são guardados no spill
+
+    def session_tabs(self):
+        """Estado das abas para a sessão (placeholders nunca exibidos mantêm o estado salvo)."""
+        tabs = []
+        for tab in self.open_tabs:
+            editor = tab['editor']
+            if editor is None or editor.loading:
+                state = dict(tab.get('state', {}))
+            else:
+                state = editor.view_state()
+            state['path'] = os.path.abspath(tab['filepath'])
+            tabs.append(state)
+        return tabs
+
+    def _start_loader(self, editor, filepath):
+        chunks = queue.Queue(maxsize=8) # Limita quanto o worker lê à frente da UI
+        cancel = threading.Event()
+
+        def target():
+            try:
+                for lines in self.file_handler.iter_file_lines(filepath):
+                    while not cancel.is_set():
+                        try:
+                            chunks.put(('lines', lines), timeout=0.2)
+                            break
+                        except queue.Full:
+                            pass
+                    if cancel.is_set():
+                        return
+                chunks.put(('done', None))
+            except Exception as e:
+                chunks.put(('error', str(e)))
+
+        self.loaders[editor] = (chunks, cancel)
+        threading.Thread(target=target, daemon=True).start()
+
+    def poll_loading(self, time_budget=0.02):
+        """
+        Aplica nos editores os blocos lidos pelos workers (chamado a cada volta do loop).
+        Para ao estourar o orçamento de tempo para não atrasar o desenho.
+        Retorna mensagens de status (arquivos concluídos ou com erro).
+        """
+        messages = []
+        deadline = time.time() + time_budget
+        for editor, (chunks, cancel) in list(self.loaders.items()):
+            while time.time() < deadline:
+                try:
+                    kind, payload = chunks.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == 'lines':
+                    editor.append_loaded_lines(payload)
+                    continue
+                del self.loaders[editor]
+                filepath = self._filepath_of(editor)
+                if kind == 'done':
+                    editor.finish_loading()
+                    state = self._pop_state(editor)
+                    if state:
+                        editor.apply_view_state(state)
+                    if self.journal:
+                        self.journal.attach(editor, filepath)
+                    self._watch(editor, filepath, opened=True)
+                    messages.append(f"Carregado: {os.path.basename(filepath or '')} ({len(editor.lines)} linhas)")
+                else:
+                    # Falhou no meio da leitura: fecha a aba como faria o open_file síncrono
+                    self._remove_editor(editor)
+                    messages.append(f"Erro ao abrir arquivo: {payload}")
+                break
+        return messages
+
+    def _pop_state(self, editor):
+        for tab in self.open_tabs:
+            if tab['editor'] is editor:
+                return tab.pop('state', None)
         return None
 
+    def _filepath_of(self, editor):
+        for tab in self.open_tabs:
+            if tab['editor'] is editor:
+                return tab['filepath']
+        return None
+
+    def _remove_editor(self, editor):
+        for i, tab in enumerate(self.open_tabs):
+            if tab['editor'] is editor:
+                del self.open_tabs[i]
+                if self.current_tab_index >= i and self.current_tab_index > 0:
+                    self.current_tab_index -= 1
+                return
+
+    def restore_file(self, filepath, base_lines, recovered_lines):
+        """Abre o arquivo e aplica o conteúdo recuperado do diário (fica como modificado)."""
+        editor = self.open_file(filepath)
+        if editor.loading:
+            # A base já foi lida para o replay: não precisa esperar o carregamento
+            self.cancel_loading(editor)
+            editor.lines = list(base_lines)
+            editor.finish_loading()
+        if self.journal:
+            self.journal.attach(editor, filepath, base_lines)
+        editor.replace_all_lines(recovered_lines)
+        return editor
+
+    def cancel_loading(self, editor):
+        loader = self.loaders.pop(editor, None)
+        if loader:
+            loader[1].set()
+
+    def get_current_editor(self):
+        return self.ensure_loaded(self.current_tab_index)
+
     def get_current_filepath(self):
         if self.open_tabs and 0 <= self.current_tab_index < len(self.open_tabs):
             return self.open_tabs[self.current_tab_index]['filepath']
@@ -75,7 +355,7 @@ class TabManager:
         for i, tab in enumerate(self.open_tabs):
             info.append({
                 'filepath': tab['filepath'],
-                'is_modified': tab['editor'].is_modified,
+                'is_modified': self._is_modified(tab),
                 'is_current': (i == self.current_tab_index)
             })
         return info
@@ -84,14 +364,20 @@ class TabManager:
         editor = self.get_current_editor()
         filepath = self.get_current_filepath()
         if editor and filepath:
+            if editor.loading:
+                raise IOError("arquivo ainda está carregando")
             self.file_handler.save_file(filepath, editor.lines)
             editor.is_modified = False # Reset modified flag after saving
+            if self.journal:
+                self.journal.compact(editor)
+            if self.events:
+                self.events.emit("on_save", {'path': filepath})
             return True
         return False
 
     def check_all_modified(self):
         for tab in self.open_tabs:
-            if tab['editor'].is_modified:
+            if self._is_modified(tab):
                 return True
         return False
 
@@ -100,6 +386,13 @@ class TabManager:
         if not self.open_tabs:
             return False
         
+        if 'spill' in self.open_tabs[self.current_tab_index]:
+            self.ensure_loaded(self.current_tab_index) # Libera o spill e o diário do jeito normal
+        editor = self.open_tabs[self.current_tab_index]['editor']
+        if editor is not None:
+            self.cancel_loading(editor)
+            if self.journal:
+                self.journal.detach(editor)
         del self.open_tabs[self.current_tab_index]
         
         if not self.open_tabs:
@@ -112,29 +405,85 @@ class TabManager:
         return True
 
     def rename_open_file(self, old_path, new_path):
-        for tab in self.open_tabs:
+        for i, tab in enumerate(self.open_tabs):
             if tab['filepath'] == old_path:
+                if 'spill' in tab:
+                    self.ensure_loaded(i) # O diário do buffer despejado precisa do caminho novo
                 tab['filepath'] = new_path
+                if self.journal and tab['editor'] is not None:
+                    self.journal.rename(tab['editor'], new_path)
 
-def main(stdscr, filepath):
+def main(stdscr, filepaths, profile_startup=False):
     # Inicialização dos módulos
     config = Config()
+    profiler.mark("config")
     ui = UI(stdscr, config) # Initialize UI once
-    file_handler = FileHandler()
-    tab_manager = TabManager(filepath, file_handler) # Initialize TabManager
+    profiler.mark("ui + tema")
+    file_handler = FileHandler(config)
+    journal = RecoveryJournal()
+    orphan_journals = journal.find_orphans() # Antes de abrir qualquer aba desta sessão
+
+    # Session Management (SRP: Delegado para SessionManager)
+    session_manager = SessionManager()
+    session = session_manager.load_session()
+    events = EventBus() # Eventos do editor para os plugins (entregues depois do desenho)
+    tab_manager = TabManager(None, file_handler, journal, events) # Initialize TabManager
+    # Abas da sessão anterior entram como placeholders (nada é lido do disco aqui)
+    for tab_state in session["tabs"]:
+        tab_manager.add_placeholder(tab_state["path"], tab_state)
+    tab_manager.current_tab_index = session["current_tab"]
+    if filepaths or not tab_manager.open_tabs:
+        first_index = None
+        for filepath, target_line in map(parse_target, filepaths or []): # Aceita 'arquivo:linha'
+            try:
+                editor = tab_manager.open_file(filepath)
+                if target_line:
+                    editor.goto_line(target_line)
+                if first_index is None:
+                    first_index = tab_manager.current_tab_index
+            except Exception:
+                pass
+        if first_index is None:
+            tab_manager.open_file("novo_arquivo.txt")
+            first_index = tab_manager.current_tab_index
+        tab_manager.current_tab_index = first_index # O primeiro arquivo da linha de comando fica em foco
     status_msg = f"Arquivo: {tab_manager.get_current_filepath()}"
+    profiler.mark("sessão + abas")
+
+    # Recuperação de crash: diários deixados por uma sessão que não terminou
+    for journal_file, lost_path in orphan_journals:
+        answer = ui.prompt(f"Recuperar alterações não salvas de {os.path.basename(lost_path)}? (s/n): ")
+        if not answer or answer.lower() != 's':
+            journal.discard(journal_file)
+            continue
+        try:
+            base_lines = file_handler.load_file(lost_path)
+            recovered = journal.replay(journal_file, base_lines)
+            if recovered is None:
+                status_msg = f"Não foi possível recuperar {os.path.basename(lost_path)}: arquivo mudou no disco."
+            else:
+                tab_manager.restore_file(lost_path, base_lines, recovered)
+                status_msg = f"Recuperado: {os.path.basename(lost_path)} (não salvo)"
+        except Exception as e:
+            status_msg = f"Erro ao recuperar {os.path.basename(lost_path)}: {e}"
+        journal.discard(journal_file)
     
+    # Modo servidor: tasma_client.py abre arquivos nesta instância em vez de subir outra
+    server = EditorServer()
+    if config.settings.get("server_mode", True):
+        server.start()
+
     # Sidebar State
     sidebar_visible = False
     sidebar_focus = False
     show_hidden = False
     
-    # Session Management (SRP: Delegado para SessionManager)
-    session_manager = SessionManager()
     sidebar_path = session_manager.load_sidebar_path()
     project_root = sidebar_path
-    sidebar_items = file_handler.list_directory(sidebar_path, show_hidden)
+    sidebar_tree = SidebarTree(file_handler, sidebar_path, show_hidden)
+    sidebar_items = sidebar_tree.rows
     sidebar_idx = 0
+    dir_watcher = DirectoryWatcher(file_handler.dir_cache) # Recarrega a sidebar quando a pasta muda
     sidebar_clipboard = None # Armazena o caminho do arquivo copiado
     sidebar_mode = 'files' # 'files' ou 'search'
     right_sidebar_focus = False # Foco no chat
@@ -142,17 +491,26 @@ def main(stdscr, filepath):
     
     # Linter & Plugins
     linter = Linter()
+    diagnostics = DiagnosticsService(linter, file_handler)
     # Caminho absoluto para a pasta plugins na raiz do projeto
     plugins_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "plugins")
-    plugin_manager = PluginManager(plugin_dir=plugins_path)
+    plugin_metrics = PluginMetrics(config.settings) # Tempo por plugin e orçamentos
+    ui.plugin_metrics = plugin_metrics
+    events.metrics = plugin_metrics
+    ui.status_bar.plugin_manager.start(events, plugin_metrics) # Provedores da barra de status no worker
+    plugin_manager = PluginManager(plugin_dir=plugins_path, metrics=plugin_metrics)
     
     # Carrega plugins passando contexto
     global_commands = {}
     plugin_context = {
         'ui': ui, 'file_handler': file_handler, 'tab_manager': tab_manager,
-        'config': config, 'global_commands': global_commands
+        'config': config, 'global_commands': global_commands, 'events': events
     }
+    profiler.mark("linter + diagnósticos")
     plugin_manager.load_plugins(plugin_context)
+    profiler.mark("plugins")
+    for name, seconds in plugin_manager.load_times.items():
+        profiler.add(name, seconds)
     
     # Carrega TasmaStore manualmente
     try:
@@ -169,30 +527,41 @@ def main(stdscr, filepath):
             tasmatore.register(plugin_context)
     except Exception as e:
         status_msg = f"Erro ao carregar TasmaStore: {e}"
+    profiler.mark("tasmatore")
 
     last_keypress_time = time.time()
+    last_journal_flush = time.time()
+    last_cursor_state = None # (arquivo, linha, coluna) do último on_cursor
+    idle_notified = False # on_idle já foi publicado neste período sem teclas
     lint_needed = True
-    last_stats_time = 0
+    last_stats_time = time.time() # Primeira amostra depois do primeiro quadro
     system_status = ""
-    current_process = psutil.Process(os.getpid()) if psutil else None
+    current_process = None
     
     # Split View State
-    split_mode = 0 # 0: None, 1: Vertical, 2: Horizontal
-    active_split = 0 # 0 or 1
-    split_tab_indices = [0, 0] # Tab index for each split
+    split_mode = session["split_mode"] # 0: None, 1: Vertical, 2: Horizontal
+    active_split = session["active_split"] # 0 or 1
+    split_tab_indices = list(session["split_tab_indices"]) # Tab index for each split
+    split_tab_indices[active_split] = tab_manager.current_tab_index # Arquivo pedido na linha de comando fica em foco
     
-    # Exporter
-    html_exporter = HtmlExporter()
-
-    # Theme Extractor
-    theme_extractor = ThemeExtractor(config.theme_dir)
+    # Exporter e Theme Extractor: criados no primeiro uso
+    html_exporter = None
+    theme_extractor = None
 
     # Sidebar Undo/Redo State
     sidebar_undo_stack = []
     sidebar_redo_stack = []
     trash_dir = os.path.join(tempfile.gettempdir(), 'tasma_trash')
     if not os.path.exists(trash_dir): os.makedirs(trash_dir)
+    file_ops = FileOperationQueue(file_handler) # Copiar/mover/deletar em background
     
+    # Teclas que alteram o buffer (bloqueadas enquanto um arquivo grande carrega)
+    loading_blocked_keys = {config.get_key(name) for name in (
+        "autocomplete", "duplicate_line", "delete_line", "toggle_comment", "delete_forward",
+        "save", "cut", "paste", "undo", "redo", "replace", "replace_regex")}
+    loading_blocked_keys.update((10, 13, curses.KEY_ENTER, curses.KEY_BACKSPACE, 127, 8, 9,
+                                 curses.KEY_BTAB, 566, 525, 47))
+
     # Macro State
     macro_keys = []
     recording_macro = False
@@ -205,18 +574,41 @@ def main(stdscr, filepath):
         if not tab_manager.open_tabs:
             break # Sai se não houver mais abas abertas
             
+        # Arquivos pedidos por outros processos (tasma_client.py) e por plugins fora do processo
+        for request in server.poll() + plugin_manager.open_requests():
+            try:
+                editor = tab_manager.open_file(request["path"])
+                if isinstance(request.get("line"), int):
+                    editor.goto_line(request["line"])
+                split_tab_indices[active_split] = tab_manager.current_tab_index
+                status_msg = f"Aberto pelo {request.get('origin', 'cliente')}: {request['path']}"
+            except Exception as e:
+                status_msg = f"Erro ao abrir arquivo: {e}"
+
         # Sync tab manager with active split
         tab_manager.current_tab_index = split_tab_indices[active_split]
         if tab_manager.current_tab_index >= len(tab_manager.open_tabs):
              tab_manager.current_tab_index = len(tab_manager.open_tabs) - 1
              split_tab_indices[active_split] = tab_manager.current_tab_index
 
-        # Prepare editors for drawing
-        editors_to_draw = [tab_manager.open_tabs[split_tab_indices[0]]['editor']]
+        # Prepare editors for drawing (abas da sessão só carregam aqui, ao aparecer pela primeira vez)
+        editors_to_draw = [tab_manager.ensure_loaded(split_tab_indices[0])]
+        if split_mode != 0 and editors_to_draw[0] is not None:
+            idx2 = split_tab_indices[1] if split_tab_indices[1] < len(tab_manager.open_tabs) else 0
+            editors_to_draw.append(tab_manager.ensure_loaded(idx2))
+        if None in editors_to_draw:
+            # Aba da sessão ilegível foi fechada: corrige os índices do split e mostra o erro
+            dropped_index, status_msg = tab_manager.dropped
+            tab_manager.dropped = None
+            if not tab_manager.open_tabs:
+                tab_manager.open_file("novo_arquivo.txt") # Como na inicialização sem abas
+            for k in range(2):
+                if split_tab_indices[k] > dropped_index:
+                    split_tab_indices[k] -= 1
+                split_tab_indices[k] = max(0, min(split_tab_indices[k], len(tab_manager.open_tabs) - 1))
+            continue
         filepaths_to_draw = [tab_manager.open_tabs[split_tab_indices[0]]['filepath']]
         if split_mode != 0:
-            idx2 = split_tab_indices[1] if split_tab_indices[1] < len(tab_manager.open_tabs) else 0
-            editors_to_draw.append(tab_manager.open_tabs[idx2]['editor'])
             filepaths_to_draw.append(tab_manager.open_tabs[idx2]['filepath'])
         
         current_editor = editors_to_draw[active_split]
@@ -224,26 +616,121 @@ def main(stdscr, filepath):
         tab_info = tab_manager.get_tab_info()
 
         # Update System Stats (every 2 seconds)
-        if psutil and (time.time() - last_stats_time > 2.0):
-            # Coleta métricas do processo atual
-            cpu = current_process.cpu_percent(interval=None)
-            mem_mb = current_process.memory_info().rss / 1024 / 1024
-            system_status = f"CPU: {cpu:.1f}% RAM: {mem_mb:.1f}MB"
+        if time.time() - last_stats_time > 2.0:
+            if current_process is None:
+                try:
+                    import psutil
+                    current_process = psutil.Process(os.getpid())
+                except ImportError:
+                    current_process = False
+            # Orçamento de memória das abas: despeja as inativas usadas há mais tempo
+            visible_tabs = split_tab_indices[:2] if split_mode != 0 else split_tab_indices[:1]
+            for evicted in tab_manager.enforce_memory_budget(visible_tabs):
+                linter.forget(evicted)
+            tab_memory = f"Aba: {tab_manager.memory['current'] / 1024 / 1024:.1f}/{tab_manager.memory['total'] / 1024 / 1024:.1f}MB"
+            if current_process:
+                # Coleta métricas do processo atual
+                cpu = current_process.cpu_percent(interval=None)
+                mem_mb = current_process.memory_info().rss / 1024 / 1024
+                system_status = f"CPU: {cpu:.1f}% RAM: {mem_mb:.1f}MB {tab_memory}"
+            else:
+                system_status = f"psutil not installed {tab_memory}"
             last_stats_time = time.time()
-        elif not psutil:
-            system_status = "psutil not installed"
 
+        # Observa a pasta exibida e recarrega a sidebar se algo mudou fora do editor
+        dir_watcher.watch_only(sidebar_tree.watched_dirs() if sidebar_visible else [])
+        changed_dirs = dir_watcher.poll_changes()
+        if changed_dirs:
+            sidebar_tree.invalidate(changed_dirs)
+        if sidebar_tree.poll():
+            status_msg = "Árvore expandida."
+
+        # Blocos de arquivos abrindo em background
+        for msg in tab_manager.poll_loading():
+            status_msg = msg
+        if not tab_manager.open_tabs:
+            break
+
+        # Operações de arquivo concluídas em background: undo, sidebar e aviso
+        for op in file_ops.poll():
+            sidebar_tree.invalidate([os.path.dirname(op.src), os.path.dirname(op.dst)])
+            if op.status == "done":
+                if op.undo:
+                    sidebar_undo_stack.append(op.undo)
+                    sidebar_redo_stack.clear()
+                if op.reverts:
+                    sidebar_redo_stack.append(op.reverts)
+                status_msg = f"Concluído: {op.describe()}"
+            else:
+                if op.reverts:
+                    sidebar_undo_stack.append(op.reverts) # Undo não aconteceu: dá para tentar de novo
+                if op.status == "cancelled":
+                    status_msg = f"Cancelado: {op.name}"
+                else:
+                    status_msg = f"Erro em {op.name}: {op.error}"
+        if sidebar_mode == 'files':
+            sidebar_items = sidebar_tree.rows
+            sidebar_idx = min(sidebar_idx, max(0, len(sidebar_items) - 1))
+
+        # Resultados de lint prontos (descarta os de versões antigas do buffer)
+        lint_changed = linter.poll()
+        if sidebar_mode == 'problems' and (lint_changed or diagnostics.changed):
+            sidebar_items = diagnostics.problems(tab_manager.open_tabs)
+            sidebar_idx = min(sidebar_idx, max(0, len(sidebar_items) - 1))
+
+        background_progress = " | ".join(p for p in (file_ops.progress_text(), diagnostics.progress_text()) if p)
+        status_right = f"{background_progress} | {system_status}" if background_progress else system_status
+
+        # Timeout curto no input para o loop acordar e processar eventos em background
+        # (mais curto enquanto há arquivo carregando, para a tela acompanhar a leitura)
+        stdscr.timeout(30 if tab_manager.loaders else config.settings.get("idle_tick_ms", 250))
         ui.draw(editors_to_draw, active_split, split_mode, status_msg, filepaths_to_draw, tab_info,
-                sidebar_items, sidebar_idx, sidebar_focus, sidebar_visible, sidebar_path, system_status)
+                sidebar_items, sidebar_idx, sidebar_focus, sidebar_visible, sidebar_path, status_right)
+        if profiler.first_frame is None:
+            profiler.frame_drawn()
+            if profile_startup:
+                break # --profile-startup: mede até o primeiro quadro e sai (sem gravar a sessão)
         
         # Limpa estado de sujo após o desenho
         for tab in tab_manager.open_tabs:
-            tab['editor'].clean_dirty()
+            if tab['editor'] is not None:
+                tab['editor'].clean_dirty()
+
+        # Eventos dos plugins: cursor e ocioso entram na fila; tudo é entregue aqui, depois do desenho
+        cursor_state = (current_filepath, current_editor.cy, current_editor.cx)
+        if cursor_state != last_cursor_state:
+            last_cursor_state = cursor_state
+            events.emit("on_cursor", {'path': current_filepath, 'line': current_editor.cy, 'col': current_editor.cx})
+        if not idle_notified and time.time() - last_keypress_time > 1.0:
+            idle_notified = True
+            events.emit("on_idle", {'idle': time.time() - last_keypress_time})
+        events.dispatch()
 
         # Linter Logic (Debounce)
-        if lint_needed and (time.time() - last_keypress_time > 1.0):
+        if lint_needed and not current_editor.loading and (time.time() - last_keypress_time > 1.0):
             linter.lint(current_editor, current_filepath)
             lint_needed = False
+        elif not lint_needed and (time.time() - last_keypress_time > 2.0):
+            # Ocioso: as outras abas também são lintadas (só as que mudaram geram pedido)
+            diagnostics.lint_open_tabs(tab_manager.open_tabs)
+
+        # Plugins fora do processo: respostas, pedidos de buffers/decorações e reinícios
+        for msg in plugin_manager.poll_hosts():
+            status_msg = msg
+
+        # Plugins adiados que fornecem itens de status: importados no primeiro momento ocioso
+        if plugin_manager.deferred and time.time() - last_keypress_time > 1.0:
+            for msg in plugin_manager.load_deferred():
+                status_msg = msg
+
+        # Diário de recuperação: grava no disco quando ocioso (ou a cada 5s digitando sem parar)
+        if journal.has_pending() and (time.time() - last_keypress_time > 0.5 or time.time() - last_journal_flush > 5.0):
+            journal.flush()
+            last_journal_flush = time.time()
+
+        # Sessão (pasta da sidebar etc.): só vai para o disco quando ocioso
+        if session_manager.dirty and time.time() - last_keypress_time > 1.0:
+            session_manager.flush()
 
         # Input Handling
         if input_queue:
@@ -252,11 +739,15 @@ def main(stdscr, filepath):
             curses.napms(10)
         else:
             key = ui.get_input()
+            stdscr.timeout(-1) # Janelas modais abertas a partir daqui esperam input normalmente
+            if key == -1:
+                key = None # Timeout sem tecla
             
         # Se houve input, atualiza timer do linter
         if key is not None:
             last_keypress_time = time.time()
             lint_needed = True
+            idle_notified = False
 
         if key is None:
             continue
@@ -268,14 +759,22 @@ def main(stdscr, filepath):
             
         # Check for global plugin commands first
         if key_code in global_commands:
-            global_commands[key_code]()
+            error = plugin_manager.run_command(key_code)
             # Force a full redraw after plugin window closes
             stdscr.clear()
-            status_msg = "Plugin window closed."
+            status_msg = error or "Plugin window closed."
+            continue
+
+        # Alt+m: tempo gasto por cada plugin
+        elif key_code == config.get_key("plugin_stats"):
+            from plugin_stats_window import PluginStatsWindow
+            PluginStatsWindow(ui, plugin_metrics).run()
+            stdscr.clear()
             continue
 
         # Ctrl+P (Fuzzy Find File)
         elif key_code == config.get_key("fuzzy_find_file"):
+            from fuzzy_finder import FuzzyFinderWindow
             finder = FuzzyFinderWindow(ui, project_root, tab_manager, show_hidden)
             finder.run()
             # Force redraw after window closes
@@ -299,6 +798,7 @@ def main(stdscr, filepath):
         
         # Ctrl+E (Import Theme)
         elif key_code == config.get_key("import_theme"):
+            from file_picker import FilePicker
             picker = FilePicker(ui, start_path=".", allowed_extensions=['.json', '.zip'])
             path = picker.run()
             
@@ -310,6 +810,9 @@ def main(stdscr, filepath):
                 # Força desenho para mostrar status "Importando..."
                 ui.draw(editors_to_draw, active_split, split_mode, status_msg, filepaths_to_draw, tab_info,
                         sidebar_items, sidebar_idx, sidebar_focus, sidebar_visible, sidebar_path, system_status)
+                if theme_extractor is None:
+                    from extractor import ThemeExtractor
+                    theme_extractor = ThemeExtractor(config.theme_dir)
                 success, msg = theme_extractor.import_themes(path)
                 status_msg = msg
             else:
@@ -321,6 +824,10 @@ def main(stdscr, filepath):
             if ui.left_sidebar_plugin:
                 if not ui.left_sidebar_plugin.is_visible:
                     ui.left_sidebar_plugin.is_visible = True
+                    if not ui.left_sidebar_plugin.is_visible:
+                        # Plugin adiado não carregou: o stub continua no lugar e diz o porquê
+                        status_msg = getattr(ui.left_sidebar_plugin, 'load_error', None) or "Estrutura indisponível."
+                        continue
                     left_plugin_focus = True
                     sidebar_visible = False # Esconde a sidebar de arquivos padrão
                     status_msg = "Estrutura aberta"
@@ -356,7 +863,8 @@ def main(stdscr, filepath):
             sidebar_visible = not sidebar_visible
             if sidebar_visible:
                 sidebar_focus = True
-                sidebar_items = file_handler.list_directory(sidebar_path, show_hidden)
+                if sidebar_mode == 'files':
+                    sidebar_items = sidebar_tree.refresh()
             else:
                 sidebar_focus = False
             continue
@@ -366,8 +874,12 @@ def main(stdscr, filepath):
             if ui.right_sidebar_plugin:
                 if not ui.right_sidebar_plugin.is_visible:
                     ui.right_sidebar_plugin.is_visible = True
-                    right_sidebar_focus = True # Foca ao abrir
-                    status_msg = "Chattovex aberto (Focado)"
+                    if ui.right_sidebar_plugin.is_visible:
+                        right_sidebar_focus = True # Foca ao abrir
+                        status_msg = "Chattovex aberto (Focado)"
+                    else:
+                        # Plugin adiado não carregou: o stub continua no lugar e diz o porquê
+                        status_msg = getattr(ui.right_sidebar_plugin, 'load_error', None) or "Chattovex indisponível."
                 else:
                     # Se já visível, alterna foco ou fecha
                     if right_sidebar_focus:
@@ -393,14 +905,25 @@ def main(stdscr, filepath):
 
         # Lógica da Sidebar Esquerda (Arquivos)
         elif sidebar_focus and sidebar_visible:
+            # Linha selecionada da árvore: (nome, is_dir, caminho) ou None no modo de busca
+            entry = sidebar_tree.entry(sidebar_idx) if sidebar_mode == 'files' else None
+
             if key_code == curses.KEY_UP:
                 sidebar_idx = max(0, sidebar_idx - 1)
             elif key_code == curses.KEY_DOWN:
                 sidebar_idx = min(len(sidebar_items) - 1, sidebar_idx + 1)
+
+            # Setas laterais: expandem / recolhem pastas na árvore
+            elif key_code == curses.KEY_RIGHT and entry:
+                if entry[1]: sidebar_tree.expand(sidebar_idx)
+            elif key_code == curses.KEY_LEFT and entry:
+                if not sidebar_tree.collapse(sidebar_idx):
+                    sidebar_idx = sidebar_tree.parent_index(sidebar_idx)
+
             elif key_code in (10, 13): # Enter
                 if not sidebar_items: continue
                 
-                if sidebar_mode == 'search':
+                if sidebar_mode in ('search', 'problems'):
                     item = sidebar_items[sidebar_idx]
                     try:
                         editor = tab_manager.open_file(item['file'])
@@ -410,17 +933,32 @@ def main(stdscr, filepath):
                     except Exception as e:
                         status_msg = f"Erro: {e}"
                 else:
-                    name, is_dir = sidebar_items[sidebar_idx]
-                    full_path = os.path.join(sidebar_path, name)
+                    name, is_dir, full_path = entry
                     
                     if name == "..":
                         sidebar_path = os.path.dirname(sidebar_path)
                         session_manager.save_sidebar_path(sidebar_path)
-                        sidebar_items = file_handler.list_directory(sidebar_path, show_hidden)
+                        sidebar_items = sidebar_tree.set_root(sidebar_path)
+                        dir_watcher.retry_failed() # Pasta nova: tenta de novo as que falharam
                         sidebar_idx = 0
                     elif is_dir:
+                        # Pastas abrem/fecham na própria árvore (listagem preguiçosa)
+                        sidebar_tree.toggle(sidebar_idx)
+                    else:
+                        try:
+                            tab_manager.open_file(full_path)
+                            sidebar_focus = False # Retorna foco ao editor
+                            status_msg = f"Aberto: {name}"
+                        except Exception as e:
+                            status_msg = f"Erro: {e}"
+            
+            # Shift+P (Set Root)
+            elif key_code == config.get_key("set_root"):
+                if entry:
+                    name, is_dir, full_path = entry
+                    if is_dir:
                         confirm_nav = config.settings.get("confirm_navigation", True)
-                        if confirm_nav:
+                        if confirm_nav and name != "..":
                             # Verifica se o destino está dentro da raiz do projeto
                             target_abs = os.path.abspath(full_path)
                             root_abs = os.path.abspath(project_root)
@@ -432,90 +970,71 @@ def main(stdscr, filepath):
                                     status_msg = "Navegação cancelada."
                                     continue
                         sidebar_path = full_path
-                        session_manager.save_sidebar_path(sidebar_path)
-                        sidebar_items = file_handler.list_directory(sidebar_path, show_hidden)
-                        sidebar_idx = 0
-                    else:
-                        try:
-                            tab_manager.open_file(full_path)
-                            sidebar_focus = False # Retorna foco ao editor
-                            status_msg = f"Aberto: {name}"
-                        except Exception as e:
-                            status_msg = f"Erro: {e}"
-            elif key_code == 27: # Esc
-                sidebar_focus = False
-            
-            # Shift+P (Set Root)
-            elif key_code == config.get_key("set_root"):
-                if sidebar_items:
-                    name, is_dir = sidebar_items[sidebar_idx]
-                    if is_dir and name != "..":
-                        sidebar_path = os.path.join(sidebar_path, name)
-                        project_root = sidebar_path
-                        session_manager.save_sidebar_path(sidebar_path)
-                        sidebar_items = file_handler.list_directory(sidebar_path, show_hidden)
-                        sidebar_idx = 0
-                        status_msg = f"Raiz definida para: {sidebar_path}"
-                    elif name == "..":
-                        sidebar_path = os.path.dirname(sidebar_path)
                         project_root = sidebar_path
                         session_manager.save_sidebar_path(sidebar_path)
-                        sidebar_items = file_handler.list_directory(sidebar_path, show_hidden)
+                        sidebar_items = sidebar_tree.set_root(sidebar_path)
+                        dir_watcher.retry_failed() # Pasta nova: tenta de novo as que falharam
                         sidebar_idx = 0
                         status_msg = f"Raiz definida para: {sidebar_path}"
+
+            # E / C (Expandir tudo em background / Recolher tudo)
+            elif key_code == config.get_key("tree_expand_all") and sidebar_mode == 'files':
+                if sidebar_tree.expand_all(file_handler.make_walker(show_hidden), sidebar_idx if entry and entry[1] else None):
+                    status_msg = "Expandindo árvore..."
+                else:
+                    status_msg = "Expansão já em andamento."
+            elif key_code == config.get_key("tree_collapse_all") and sidebar_mode == 'files':
+                sidebar_items = sidebar_tree.collapse_all()
+                sidebar_idx = 0
+                status_msg = "Árvore recolhida."
             
             # F2 (Rename)
             elif key_code == config.get_key("rename"):
-                if sidebar_items:
-                    name, is_dir = sidebar_items[sidebar_idx]
+                if entry:
+                    name, is_dir, old_path = entry
                     if name != "..":
-                        old_path = os.path.join(sidebar_path, name)
                         new_name = ui.prompt(f"Renomear '{name}' para: ")
                         if new_name:
-                            new_path = os.path.join(sidebar_path, new_name)
+                            new_path = os.path.join(os.path.dirname(old_path), new_name)
                             if file_handler.move_file(old_path, new_path):
                                 tab_manager.rename_open_file(old_path, new_path)
                                 sidebar_undo_stack.append({'type': 'rename', 'old': old_path, 'new': new_path})
                                 sidebar_redo_stack.clear()
-                                sidebar_items = file_handler.list_directory(sidebar_path, show_hidden)
+                                sidebar_items = sidebar_tree.invalidate([os.path.dirname(old_path)])
                                 status_msg = "Renomeado com sucesso"
                             else:
                                 status_msg = "Erro ao renomear"
 
             # Delete (KEY_DC)
             elif key_code == config.get_key("delete_file"):
-                if sidebar_items:
-                    name, is_dir = sidebar_items[sidebar_idx]
+                if entry:
+                    name, is_dir, target_path = entry
                     if name != "..":
-                        target_path = os.path.join(sidebar_path, name)
                         confirm = ui.prompt(f"Deletar '{name}'? (s/n): ")
                         if confirm and confirm.lower() == 's':
-                            trash_path = os.path.join(trash_dir, os.path.basename(target_path) + "_" + str(os.getpid()))
-                            if file_handler.move_file(target_path, trash_path):
-                                sidebar_undo_stack.append({'type': 'delete', 'original': target_path, 'trash': trash_path})
-                                sidebar_redo_stack.clear()
-                                sidebar_items = file_handler.list_directory(sidebar_path, show_hidden)
-                                status_msg = "Deletado (movido para lixeira)"
-                            else:
-                                status_msg = "Erro ao deletar"
+                            trash_path = os.path.join(trash_dir, f"{os.path.basename(target_path)}_{os.getpid()}_{time.time_ns()}")
+                            # A lixeira pode estar em outro disco (vira cópia): roda em background
+                            file_ops.delete(target_path, trash_path, undo={'type': 'delete', 'original': target_path, 'trash': trash_path})
+                            status_msg = "Deletando (movendo para lixeira)..."
 
             # Ctrl+Z (Undo Sidebar)
             elif key_code == config.get_key("undo"):
                 if sidebar_undo_stack:
                     action = sidebar_undo_stack.pop()
-                    sidebar_redo_stack.append(action)
                     if action['type'] == 'rename':
                         file_handler.move_file(action['new'], action['old'])
                         tab_manager.rename_open_file(action['new'], action['old'])
+                        sidebar_redo_stack.append(action)
                         status_msg = f"Desfeito: Renomear"
+                    # Delete/copy desfazem em background: o registro vai para o redo só se der certo
                     elif action['type'] == 'delete':
-                        file_handler.move_file(action['trash'], action['original'])
-                        status_msg = f"Desfeito: Deletar"
+                        file_ops.move(action['trash'], action['original'], reverts=action)
+                        status_msg = f"Desfazendo: Deletar..."
                     elif action['type'] == 'copy':
-                        trash_path = os.path.join(trash_dir, os.path.basename(action['dest']) + "_undo_" + str(os.getpid()))
-                        file_handler.move_file(action['dest'], trash_path)
-                        status_msg = f"Desfeito: Copiar"
-                    sidebar_items = file_handler.list_directory(sidebar_path, show_hidden)
+                        trash_path = os.path.join(trash_dir, f"{os.path.basename(action['dest'])}_undo_{os.getpid()}_{time.time_ns()}")
+                        file_ops.delete(action['dest'], trash_path, reverts=action)
+                        status_msg = f"Desfazendo: Copiar..."
+                    sidebar_items = sidebar_tree.reload()
                 else:
                     status_msg = "Nada para desfazer na sidebar"
 
@@ -528,22 +1047,25 @@ def main(stdscr, filepath):
             # h (Toggle Hidden Files)
             elif key_code == config.get_key("toggle_hidden"):
                 show_hidden = not show_hidden
-                sidebar_items = file_handler.list_directory(sidebar_path, show_hidden)
+                sidebar_items = sidebar_tree.set_show_hidden(show_hidden)
                 sidebar_idx = 0
                 status_msg = f"Arquivos ocultos: {'Visíveis' if show_hidden else 'Escondidos'}"
 
             # r (Refresh)
             elif key_code == config.get_key("refresh"):
-                sidebar_items = file_handler.list_directory(sidebar_path, show_hidden)
+                sidebar_items = sidebar_tree.reload()
+                dir_watcher.retry_failed()
+                sidebar_mode = 'files'
+                sidebar_idx = min(sidebar_idx, max(0, len(sidebar_items) - 1))
                 status_msg = "Sidebar atualizada."
 
             # n (New File)
             elif key_code == config.get_key("new_file"):
                 name = ui.prompt("Novo arquivo: ")
                 if name:
-                    path = os.path.join(sidebar_path, name)
+                    path = os.path.join(sidebar_tree.target_dir(sidebar_idx), name)
                     if file_handler.create_file(path):
-                        sidebar_items = file_handler.list_directory(sidebar_path, show_hidden)
+                        sidebar_items = sidebar_tree.invalidate([os.path.dirname(path)])
                         status_msg = f"Arquivo criado: {name}"
                     else:
                         status_msg = "Erro ao criar arquivo"
@@ -552,46 +1074,49 @@ def main(stdscr, filepath):
             elif key_code == config.get_key("new_dir"):
                 name = ui.prompt("Nova pasta: ")
                 if name:
-                    path = os.path.join(sidebar_path, name)
+                    path = os.path.join(sidebar_tree.target_dir(sidebar_idx), name)
                     if file_handler.create_directory(path):
-                        sidebar_items = file_handler.list_directory(sidebar_path, show_hidden)
+                        sidebar_items = sidebar_tree.invalidate([os.path.dirname(path)])
                         status_msg = f"Pasta criada: {name}"
                     else:
                         status_msg = "Erro ao criar pasta"
 
             # Ctrl+C (Copy File)
             elif key_code == config.get_key("copy"):
-                if sidebar_items:
-                    name, is_dir = sidebar_items[sidebar_idx]
+                if entry:
+                    name, is_dir, full_path = entry
                     if name != "..":
-                        sidebar_clipboard = os.path.join(sidebar_path, name)
+                        sidebar_clipboard = full_path
                         status_msg = f"Copiado para área de transferência: {name}"
 
             # Ctrl+V (Paste File)
             elif key_code == config.get_key("paste"):
                 if sidebar_clipboard and os.path.exists(sidebar_clipboard):
                     src = sidebar_clipboard
+                    dst_dir = sidebar_tree.target_dir(sidebar_idx)
                     dst_name = os.path.basename(src)
-                    dst = os.path.join(sidebar_path, dst_name)
+                    dst = os.path.join(dst_dir, dst_name)
                     
                     # Evitar sobrescrever se já existir
                     if os.path.exists(dst):
                         base, ext = os.path.splitext(dst_name)
-                        dst = os.path.join(sidebar_path, f"{base}_copy{ext}")
+                        dst = os.path.join(dst_dir, f"{base}_copy{ext}")
                     
-                    if file_handler.copy_path(src, dst):
-                        sidebar_items = file_handler.list_directory(sidebar_path, show_hidden)
-                        # Adicionar ao undo stack (Undo de copy é deletar o destino)
-                        sidebar_undo_stack.append({'type': 'copy', 'dest': dst})
-                        sidebar_redo_stack.clear()
-                        status_msg = f"Colado: {os.path.basename(dst)}"
-                    else:
-                        status_msg = "Erro ao colar arquivo"
+                    # Cópia em background; o undo (deletar o destino) entra na pilha quando terminar
+                    file_ops.copy(src, dst, undo={'type': 'copy', 'dest': dst})
+                    status_msg = f"Colando: {os.path.basename(dst)}..."
                 elif sidebar_clipboard:
                     status_msg = "Arquivo de origem não encontrado"
                 else:
                     status_msg = "Nada para colar"
             
+            # x (Cancelar operações de arquivo em andamento)
+            elif key_code == config.get_key("cancel_file_op"):
+                if file_ops.cancel():
+                    status_msg = "Cancelando operações de arquivo..."
+                else:
+                    status_msg = "Nenhuma operação de arquivo em andamento."
+
             # / (Grep Search)
             elif key_code == ord('/'):
                 query = ui.prompt("Grep: ")
@@ -603,16 +1128,44 @@ def main(stdscr, filepath):
                 else:
                     status_msg = "Busca cancelada."
 
+            # p (Lista de problemas: lint das abas abertas + varredura do projeto)
+            elif key_code == config.get_key("show_problems"):
+                if sidebar_mode == 'problems':
+                    sidebar_mode = 'files'
+                    sidebar_items = sidebar_tree.rows
+                    status_msg = "Modo de arquivos."
+                else:
+                    diagnostics.lint_open_tabs(tab_manager.open_tabs)
+                    sidebar_mode = 'problems'
+                    sidebar_items = diagnostics.problems(tab_manager.open_tabs)
+                    status_msg = f"Problemas: {len(sidebar_items)}"
+                sidebar_idx = 0
+
+            # S (Varrer o projeto inteiro em background)
+            elif key_code == config.get_key("sweep_project"):
+                if diagnostics.sweep(sidebar_path, show_hidden):
+                    status_msg = f"Analisando projeto: {sidebar_path}"
+                else:
+                    diagnostics.cancel_sweep()
+                    status_msg = "Análise do projeto cancelada."
+                sidebar_mode = 'problems'
+                sidebar_items = diagnostics.problems(tab_manager.open_tabs)
+                sidebar_idx = 0
+
             # Esc (Sair do modo de busca ou da sidebar)
             elif key_code == 27:
-                if sidebar_mode == 'search':
+                if sidebar_mode in ('search', 'problems'):
                     sidebar_mode = 'files'
-                    sidebar_items = file_handler.list_directory(sidebar_path, show_hidden)
+                    sidebar_items = sidebar_tree.rows
                     sidebar_idx = 0
                     status_msg = "Modo de arquivos."
                 else:
                     sidebar_focus = False
 
+            if sidebar_mode == 'files':
+                sidebar_items = sidebar_tree.rows
+            elif sidebar_mode == 'problems' and sidebar_items and key_code in (curses.KEY_UP, curses.KEY_DOWN):
+                status_msg = sidebar_items[sidebar_idx]['content']
             continue
 
         # Se sidebar visível mas não focada, permite voltar o foco com Ctrl+E ou algo assim?
@@ -626,6 +1179,12 @@ def main(stdscr, filepath):
         total_margin = sidebar_w + gutter_width
         content_start_y = 1 if tab_info else 0
 
+        # Enquanto o arquivo carrega o buffer é só leitura (navegar, buscar e copiar continuam)
+        if current_editor.loading and (key_code in loading_blocked_keys or
+                                       (isinstance(key, str) and key.isprintable()) or 32 <= key_code <= 126):
+            status_msg = f"Carregando arquivo... ({len(current_editor.lines)} linhas) - edição bloqueada"
+            continue
+
         # Ctrl+Space (Autocomplete) - ASCII 0
         if key_code == config.get_key("autocomplete"):
             completions, prefix = current_editor.get_completions()
@@ -639,6 +1198,7 @@ def main(stdscr, filepath):
                     ui.draw_autocomplete(completions, idx, current_editor, content_start_y, total_margin)
                     
                     ch = ui.get_input()
+                    if ch is None or ch == -1: continue # Timeout (ex: plugin de chat animando)
                     
                     if ch == curses.KEY_UP: # get_input agora pode retornar int ou str, mas KEY_UP é int
                         idx = (idx - 1) % len(completions)
@@ -839,6 +1399,7 @@ def main(stdscr, filepath):
                 else:
                     status_msg = f"'{query}' não encontrado"
             else:
+                current_editor.clear_search_hits()
                 status_msg = "" # Limpa status se a busca for cancelada
 
         # Alt+F (Find Regex)
@@ -852,6 +1413,7 @@ def main(stdscr, filepath):
                 else:
                     status_msg = f"Regex '{query}' não encontrado"
             else:
+                current_editor.clear_search_hits()
                 status_msg = ""
 
         # Ctrl+G (Find Next) - ASCII 7
@@ -911,6 +1473,7 @@ def main(stdscr, filepath):
         elif key_code == config.get_key("undo"):
             if current_editor.undo():
                 status_msg = "Desfeito"
+                last_keypress_time = 0 # Estado conhecido: o cache de lint responde na hora
             else:
                 status_msg = "Nada para desfazer"
 
@@ -918,6 +1481,7 @@ def main(stdscr, filepath):
         elif key_code == config.get_key("redo"):
             if current_editor.redo():
                 status_msg = "Refeito"
+                last_keypress_time = 0
             else:
                 status_msg = "Nada para refazer"
 
@@ -1021,6 +1585,9 @@ def main(stdscr, filepath):
             out_path = ui.prompt(f"Exportar HTML para ({default_name}): ")
             if not out_path: out_path = default_name
             
+            if html_exporter is None:
+                from html_exporter import HtmlExporter
+                html_exporter = HtmlExporter()
             if html_exporter.export(current_editor.lines, out_path):
                 status_msg = f"Exportado para {out_path}"
             else:
@@ -1036,6 +1603,7 @@ def main(stdscr, filepath):
 
         # Shift+C (Open Settings)
         elif key_code == config.get_key("open_settings"):
+            from config_window import ConfigWindow
             config_win = ConfigWindow(ui, config)
             config_win.run()
             # After closing, a restart is needed to apply some changes (like colors)
@@ -1053,7 +1621,9 @@ def main(stdscr, filepath):
                     sidebar_path = os.path.abspath(folder_path)
                     project_root = sidebar_path
                     session_manager.save_sidebar_path(sidebar_path)
-                    sidebar_items = file_handler.list_directory(sidebar_path, show_hidden)
+                    sidebar_items = sidebar_tree.set_root(sidebar_path)
+                    dir_watcher.retry_failed() # Pasta nova: tenta de novo as que falharam
+                    sidebar_mode = 'files'
                     sidebar_idx = 0
                     status_msg = f"Pasta de trabalho: {sidebar_path}"
                 else:
@@ -1078,6 +1648,7 @@ def main(stdscr, filepath):
                     continue
                 # Se for 'n' ou qualquer outra coisa, apenas prossegue para fechar
 
+            linter.forget(current_editor)
             if tab_manager.close_current_tab():
                 status_msg = "Aba fechada."
                 # Update indices after closing
@@ -1096,15 +1667,43 @@ def main(stdscr, filepath):
             split_tab_indices[active_split] = (split_tab_indices[active_split] + 1) % len(tab_manager.open_tabs)
             status_msg = f"Trocado para: {tab_manager.get_current_filepath()}"
 
+    if not profile_startup:
+        # --profile-startup não deixa rastro: sessão e diários ficam como estavam
+        session_manager.save_session(tab_manager.session_tabs(), tab_manager.current_tab_index,
+                                     split_mode, split_tab_indices, active_split)
+        session_manager.flush()
+        journal.close() # Saída normal: nada a recuperar
+    server.stop()
+    plugin_manager.stop_hosts()
+    ui.status_bar.plugin_manager.stop()
+    dir_watcher.stop()
+    tab_manager.spill.close()
+    linter.stop()
+    diagnostics.cancel_sweep()
+    file_ops.stop()
+
 if __name__ == "__main__":
     locale.setlocale(locale.LC_ALL, '')
     parser = argparse.ArgumentParser(description="Tasma Code Editor")
-    parser.add_argument("filename", help="Nome do arquivo para editar", nargs='?', default="novo_arquivo.txt")
+    parser.add_argument("filenames", help="Arquivos para editar ('arquivo:linha' também vale)", nargs='*')
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Mede a inicialização até o primeiro quadro, imprime os tempos e sai")
+    parser.add_argument("--startup-budget", type=float, metavar="MS",
+                        help="Com --profile-startup: sai com erro se o primeiro quadro passar de MS milissegundos")
     args = parser.parse_args()
 
     try:
-        curses.wrapper(main, args.filename)
+        curses.wrapper(main, args.filenames, args.profile_startup)
     except KeyboardInterrupt:
         pass
     except Exception as e:
         print(f"Ocorreu um erro fatal: {e}")
+
+    if args.profile_startup:
+        print(profiler.report())
+        if args.startup_budget is not None and profiler.first_frame is not None:
+            first_frame_ms = profiler.first_frame * 1000
+            if first_frame_ms > args.startup_budget:
+                print(f"Orçamento estourado: {first_frame_ms:.1f} ms > {args.startup_budget:.1f} ms")
+                sys.exit(1)
+            print(f"Dentro do orçamento: {first_frame_ms:.1f} ms <= {args.startup_budget:.1f} ms")
@@ -0,0 +1,349 @@
+# /home/johnb/tasma-code-absulut/src/markers.py
+import random
+
+# Tipos de marcadores guardados por editor
+MARKER_KINDS = ("bookmark", "fold", "diagnostic", "search", "decoration")
+
+
+class _Node:
+    __slots__ = ("line", "payload", "prio", "left", "right", "lazy")
+
+    def __init__(self, line, payload):
+        self.line = line
+        self.payload = payload
+        self.prio = random.random()
+        self.left = None
+        self.right = None
+        self.lazy = 0 # Deslocamento pendente para os filhos
+
+
+def _push(node):
+    """Propaga o deslocamento pendente para os filhos."""
+    if node.lazy:
+        for child in (node.left, node.right):
+            if child:
+                child.line += node.lazy
+                child.lazy += node.lazy
+        node.lazy = 0
+
+
+def _split(node, line):
+    """Divide em (linhas < line, linhas >= line)."""
+    if node is None:
+        return None, None
+    _push(node)
+    if node.line < line:
+        left, right = _split(node.right, line)
+        node.right = left
+        return node, right
+    left, right = _split(node.left, line)
+    node.left = right
+    return left, node
+
+
+def _merge(a, b):
+    """Junta duas árvores (todas as linhas de 'a' menores que as de 'b')."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.prio > b.prio:
+        _push(a)
+        a.right = _merge(a.right, b)
+        return a
+    _push(b)
+    b.left = _merge(a, b.left)
+    return b
+
+
+def _shift(node, delta):
+    if node is not None:
+        node.line += delta
+        node.lazy += delta
+
+
+class MarkerTree:
+    """
+    Responsabilidade: Guardar marcadores ancorados em linhas (no máximo um por linha)
+    numa treap com deslocamento preguiçoso. Inserir ou remover linhas desloca todos os
+    marcadores abaixo em O(log n), sem reindexar um por um.
+    """
+    def __init__(self):
+        self.root = None
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _find(self, line):
+        node = self.root
+        while node is not None:
+            _push(node)
+            if line == node.line:
+                return node
+            node = node.left if line < node.line else node.right
+        return None
+
+    def __contains__(self, line):
+        return self._find(line) is not None
+
+    def get(self, line, default=None):
+        node = self._find(line)
+        return node.payload if node is not None else default
+
+    def set(self, line, payload=True):
+        node = self._find(line)
+        if node is not None:
+            node.payload = payload
+            return
+        left, right = _split(self.root, line)
+        self.root = _merge(_merge(left, _Node(line, payload)), right)
+        self.count += 1
+
+    def discard(self, line):
+        """Remove o marcador da linha. Retorna True se existia."""
+        left, right = _split(self.root, line)
+        middle, right = _split(right, line + 1)
+        self.root = _merge(left, right)
+        if middle is not None:
+            self.count -= 1
+            return True
+        return False
+
+    def clear(self):
+        self.root = None
+        self.count = 0
+
+    def replace(self, items):
+        """Troca todo o conteúdo por items [(linha, payload)]."""
+        self.clear()
+        for line, payload in sorted(items, key=lambda item: item[0]):
+            self.root = _merge(self.root, _Node(line, payload))
+            self.count += 1
+
+    def range(self, start, end):
+        """Marcadores com start <= linha < end, em ordem: [(linha, payload)]."""
+        out = []
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            if node is not None:
+                _push(node)
+                if node.line >= start:
+                    stack.append(node)
+                    node = node.left
+                else:
+                    node = node.right
+                continue
+            node = stack.pop()
+            if node.line >= end:
+                break
+            out.append((node.line, node.payload))
+            node = node.right
+        return out
+
+    def items(self):
+        return self.range(float("-inf"), float("inf"))
+
+    def lines(self):
+        return [line for line, _ in self.items()]
+
+    def next_after(self, line):
+        """Primeira linha marcada > line (ou None)."""
+        best = None
+        node = self.root
+        while node is not None:
+            _push(node)
+            if node.line > line:
+                best = node.line
+                node = node.left
+            else:
+                node = node.right
+        return best
+
+    def prev_before(self, line):
+        """Última linha marcada < line (ou None)."""
+        best = None
+        node = self.root
+        while node is not None:
+            _push(node)
+            if node.line < line:
+                best = node.line
+                node = node.right
+            else:
+                node = node.left
+        return best
+
+    def insert_lines(self, at, count):
+        """'count' linhas novas na posição 'at': marcadores em linhas >= at descem."""
+        left, right = _split(self.root, at)
+        _shift(right, count)
+        self.root = _merge(left, right)
+
+    def delete_lines(self, start, count):
+        """Remove as linhas [start, start+count): marcadores nelas somem, os de baixo sobem."""
+        left, right = _split(self.root, start)
+        middle, right = _split(right, start + count)
+        self.count -= len(_collect(middle))
+        _shift(right, -count)
+        self.root = _merge(left, right)
+
+    def clear_range(self, start, end):
+        """Remove os marcadores de [start, end) sem deslocar nada."""
+        left, right = _split(self.root, start)
+        middle, right = _split(right, end)
+        self.count -= len(_collect(middle))
+        self.root = _merge(left, right)
+
+
+def _collect(node):
+    out = []
+    stack = [node] if node is not None else []
+    while stack:
+        n = stack.pop()
+        out.append(n)
+        if n.left: stack.append(n.left)
+        if n.right: stack.append(n.right)
+    return out
+
+
+class MarkerStore:
+    """
+    Responsabilidade: Agrupar as árvores de marcadores de um editor (bookmarks, dobras,
+    diagnósticos, ocorrências de busca e decorações de plugins) e aplicar nelas as edições.
+    """
+    def __init__(self):
+        self.trees = {kind: MarkerTree() for kind in MARKER_KINDS}
+
+    def tree(self, kind):
+        """Árvore de um tipo (plugins podem criar tipos próprios)."""
+        tree = self.trees.get(kind)
+        if tree is None:
+            tree = self.trees[kind] = MarkerTree()
+        return tree
+
+    def apply_edit(self, start, removed, inserted):
+        """
+        As linhas [start, start+removed) viraram 'inserted' linhas novas.
+        As primeiras min(removed, inserted) contam como editadas no lugar (marcadores ficam);
+        o resto é inserção ou remoção de linhas.
+        """
+        common = min(removed, inserted)
+        for tree in self.trees.values():
+            if not tree.count:
+                continue
+            if inserted > removed:
+                tree.insert_lines(start + common, inserted - removed)
+            elif removed > inserted:
+                tree.delete_lines(start + common, removed - inserted)
+        # Colunas das ocorrências de busca nas linhas editadas não valem mais
+        search = self.trees["search"]
+        if search.count and inserted:
+            search.clear_range(start, start + inserted)
+
+    def visible(self, start, end):
+        """Marcadores de todas as árvores na faixa [start, end): {tipo: {linha: payload}}."""
+        return {kind: dict(tree.range(start, end)) for kind, tree in self.trees.items() if tree.count}
+
+
+class MarkerSet:
+    """Visão tipo set() de uma MarkerTree (compatível com o antigo editor.bookmarks / editor.folds)."""
+    __hash__ = None
+
+    def __init__(self, tree):
+        self.tree = tree
+
+    def __contains__(self, line):
+        return line in self.tree
+
+    def __iter__(self):
+        return iter(self.tree.lines())
+
+    def __len__(self):
+        return len(self.tree)
+
+    def __bool__(self):
+        return len(self.tree) > 0
+
+    def add(self, line):
+        self.tree.set(line, True)
+
+    def discard(self, line):
+        self.tree.discard(line)
+
+    def remove(self, line):
+        if not self.tree.discard(line):
+            raise KeyError(line)
+
+    def __eq__(self, other):
+        if isinstance(other, (set, frozenset, MarkerSet)):
+            return set(self) == set(other)
+        return NotImplemented
+
+    def __copy__(self):
+        return set(self)
+
+    def __deepcopy__(self, memo):
+        return set(self)
+
+    def __repr__(self):
+        return f"MarkerSet({set(self)!r})"
+
+
+class MarkerMap:
+    """Visão tipo dict {linha: payload} de uma MarkerTree (compatível com editor.linter_errors)."""
+    __hash__ = None
+
+    def __init__(self, tree):
+        self.tree = tree
+
+    def __contains__(self, line):
+        return line in self.tree
+
+    def __getitem__(self, line):
+        node = self.tree._find(line)
+        if node is None:
+            raise KeyError(line)
+        return node.payload
+
+    def __setitem__(self, line, payload):
+        self.tree.set(line, payload)
+
+    def __delitem__(self, line):
+        if not self.tree.discard(line):
+            raise KeyError(line)
+
+    def get(self, line, default=None):
+        return self.tree.get(line, default)
+
+    def __iter__(self):
+        return iter(self.tree.lines())
+
+    def keys(self):
+        return self.tree.lines()
+
+    def values(self):
+        return [payload for _, payload in self.tree.items()]
+
+    def items(self):
+        return self.tree.items()
+
+    def __len__(self):
+        return len(self.tree)
+
+    def __bool__(self):
+        return len(self.tree) > 0
+
+    def __eq__(self, other):
+        if isinstance(other, (dict, MarkerMap)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __copy__(self):
+        return dict(self.items())
+
+    def __deepcopy__(self, memo):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"MarkerMap({dict(self.items())!r})"
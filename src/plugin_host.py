@@ -0,0 +1,334 @@
+# /home/johnb/tasma-code-absulut/src/plugin_host.py
+"""
+Host de plugins fora do processo do editor.
+Um plugin com "out_of_process": true no plugin.json roda num processo próprio
+(python plugin_host.py <arquivo do plugin>) e conversa com o editor por stdin/stdout,
+uma mensagem JSON por linha:
+    editor -> host:  {"type": "call", "id": 1, "command": "nome", "args": [...]}
+                     {"type": "response", "id": 7, "result": ..., "error": null}
+    host -> editor:  {"type": "result", "id": 1, "value": ..., "error": null}
+                     {"type": "request", "id": 7, "method": "get_lines", "params": {...}}
+                     {"type": "notify", "method": "set_status", "params": {...}}
+O plugin define register_remote(api) e usa a RemoteAPI (buffers, comandos, decorações).
+Um plugin lento ou travado só atrasa o próprio processo: o editor aplica timeout nas
+chamadas e reinicia o host.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import threading
+import subprocess
+import importlib.util
+
+
+# --- Lado do plugin (processo host) ---------------------------------------------
+
+class RemoteAPI:
+    """O que o plugin enxerga do editor. Pedidos bloqueiam só a thread do plugin."""
+    def __init__(self, out):
+        self.out = out
+        self.out_lock = threading.Lock()
+        self.next_id = 0
+        self.responses = {}
+        self.responses_ready = threading.Condition()
+        self.commands = {} # nome -> função
+
+    def _send(self, message):
+        with self.out_lock:
+            self.out.write(json.dumps(message) + "\n")
+            self.out.flush()
+
+    def request(self, method, timeout=5.0, **params):
+        """Pede algo ao editor e espera a resposta (TimeoutError se o editor não responder)."""
+        with self.responses_ready:
+            self.next_id += 1
+            request_id = self.next_id
+        self._send({"type": "request", "id": request_id, "method": method, "params": params})
+        deadline = time.time() + timeout
+        with self.responses_ready:
+            while request_id not in self.responses:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise TimeoutError(method)
+                self.responses_ready.wait(remaining)
+            response = self.responses.pop(request_id)
+        if response.get("error"):
+            raise RuntimeError(response["error"])
+        return response.get("result")
+
+    def notify(self, method, **params):
+        """Avisa o editor sem esperar resposta."""
+        self._send({"type": "notify", "method": method, "params": params})
+
+    def _deliver(self, message):
+        with self.responses_ready:
+            self.responses[message.get("id")] = message
+            self.responses_ready.notify_all()
+
+    # Atalhos para os métodos do editor (ver HostBridge)
+
+    def get_lines(self, path=None):
+        return self.request("get_lines", path=path)
+
+    def current_file(self):
+        return self.request("current_file")
+
+    def open_file(self, path, line=None):
+        self.notify("open_file", path=path, line=line)
+
+    def set_status(self, text):
+        self.notify("set_status", text=text)
+
+    def set_decorations(self, path, marks):
+        """marks: {linha 0-based: caractere da calha} (substitui as decorações do arquivo)."""
+        self.notify("set_decorations", path=path, marks={str(k): v for k, v in marks.items()})
+
+    def command(self, name, key=None):
+        """Decorador: registra um comando (e opcionalmente a tecla em global_commands)."""
+        def wrap(func):
+            self.commands[name] = func
+            self.notify("register_command", name=name, key=key)
+            return func
+        return wrap
+
+
+def serve(plugin_path, stdin, stdout):
+    """Loop do processo host: carrega o plugin e atende as chamadas do editor."""
+    api = RemoteAPI(stdout)
+    spec = importlib.util.spec_from_file_location("remote_plugin", plugin_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if hasattr(module, "register_remote"):
+        module.register_remote(api)
+
+    # Comandos rodam numa thread própria: enquanto um comando espera uma resposta do
+    # editor, este loop continua lendo o stdin para entregá-la
+    calls = queue.Queue()
+
+    def worker():
+        while True:
+            message = calls.get()
+            if message is None:
+                return
+            func = api.commands.get(message.get("command"))
+            reply = {"type": "result", "id": message.get("id"), "value": None, "error": None}
+            if func is None:
+                reply["error"] = f"comando desconhecido: {message.get('command')}"
+            else:
+                try:
+                    reply["value"] = func(*message.get("args", []))
+                except Exception as e:
+                    reply["error"] = f"{type(e).__name__}: {e}"
+            try:
+                api._send(reply)
+            except (TypeError, ValueError):
+                api._send({"type": "result", "id": message.get("id"), "value": None,
+                           "error": "resultado não serializável"})
+
+    threading.Thread(target=worker, daemon=True).start()
+    for line in stdin:
+        try:
+            message = json.loads(line)
+        except ValueError:
+            continue
+        if message.get("type") == "call":
+            calls.put(message)
+        elif message.get("type") == "response":
+            api._deliver(message)
+    calls.put(None)
+
+
+# --- Lado do editor ---------------------------------------------------------------
+
+class HostBridge:
+    """
+    Responsabilidade: Atender, na thread principal, os pedidos que os plugins remotos
+    fazem ao editor (buffers, abrir arquivo, status, decorações, registro de comandos).
+    """
+    def __init__(self, context):
+        self.context = context
+        self.status_messages = []
+        self.open_requests = [] # Abertos pelo loop principal (que também põe a aba no split ativo)
+
+    def _tab_manager(self):
+        return self.context.get('tab_manager')
+
+    def _editor_for(self, path):
+        tab_manager = self._tab_manager()
+        if path is None:
+            return tab_manager.get_current_editor()
+        abs_path = os.path.abspath(path)
+        for tab in tab_manager.open_tabs:
+            if os.path.abspath(tab['filepath']) == abs_path:
+                return tab['editor'] # None se a aba ainda não foi carregada
+        return None
+
+    def handle(self, host, method, params):
+        if method == "get_lines":
+            editor = self._editor_for(params.get("path"))
+            return list(editor.lines) if editor is not None and not editor.loading else None
+        if method == "current_file":
+            tab_manager = self._tab_manager()
+            editor = tab_manager.get_current_editor()
+            return {"path": tab_manager.get_current_filepath(), "line": editor.cy + 1,
+                    "col": editor.cx, "modified": editor.is_modified}
+        if method == "open_file":
+            line = params.get("line")
+            self.open_requests.append({"path": params["path"], "line": int(line) if line else None,
+                                       "origin": f"plugin {host.name}"})
+            return None
+        if method == "set_status":
+            self.status_messages.append(f"[{host.name}] {params.get('text', '')}")
+            return None
+        if method == "set_decorations":
+            editor = self._editor_for(params.get("path"))
+            if editor is not None:
+                marks = params.get("marks") or {}
+                editor.markers.tree("decoration").replace((int(k), v) for k, v in marks.items())
+                editor.mark_all_dirty()
+            return None
+        if method == "register_command":
+            commands = self.context.get('global_commands')
+            key = params.get("key")
+            if commands is not None and isinstance(key, int):
+                name = params.get("name")
+                commands[key] = lambda: host.call(name)
+            return None
+        raise ValueError(f"método desconhecido: {method}")
+
+
+class PluginHost:
+    """
+    Responsabilidade: Manter o processo de um plugin remoto: enviar chamadas sem bloquear,
+    entregar respostas via poll() (thread principal), aplicar timeout por chamada e
+    reiniciar o processo se ele morrer ou travar (desiste depois de max_restarts seguidos).
+    """
+    def __init__(self, name, plugin_path, timeout=2.0, max_restarts=3):
+        self.name = name
+        self.plugin_path = plugin_path
+        self.timeout = timeout
+        self.max_restarts = max_restarts
+        self.proc = None
+        self.inbox = queue.Queue()
+        self.pending = {} # id -> (prazo, callback)
+        self.next_id = 0
+        self.restarts = [] # Horários dos reinícios recentes
+        self.failed = False
+
+    def start(self):
+        try:
+            self.proc = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), self.plugin_path],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                text=True, encoding='utf-8', bufsize=1
+            )
+        except OSError:
+            self.proc = None
+            self.failed = True
+            return False
+        threading.Thread(target=self._reader, args=(self.proc,), daemon=True).start()
+        return True
+
+    def _reader(self, proc):
+        for line in proc.stdout:
+            try:
+                self.inbox.put((proc, json.loads(line)))
+            except ValueError:
+                continue
+        self.inbox.put((proc, None)) # EOF: processo saiu
+
+    def _send(self, message):
+        if self.proc is None or self.proc.poll() is not None:
+            return False
+        try:
+            self.proc.stdin.write(json.dumps(message) + "\n")
+            self.proc.stdin.flush()
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def call(self, command, args=(), callback=None):
+        """Chama um comando do plugin sem esperar. callback(valor, erro) vem depois, no poll()."""
+        if self.failed:
+            if callback:
+                callback(None, "plugin desativado")
+            return None
+        self.next_id += 1
+        self.pending[self.next_id] = (time.time() + self.timeout, callback)
+        if not self._send({"type": "call", "id": self.next_id, "command": command, "args": list(args)}):
+            self._restart("processo não responde")
+        return self.next_id
+
+    def poll(self, bridge):
+        """Processa as mensagens recebidas e os timeouts. Retorna mensagens de status."""
+        messages = []
+        while True:
+            try:
+                proc, message = self.inbox.get_nowait()
+            except queue.Empty:
+                break
+            if proc is not self.proc:
+                continue # Resto de um processo que já foi reiniciado
+            if message is None:
+                messages.append(self._restart("processo terminou"))
+                continue
+            kind = message.get("type")
+            if kind == "result":
+                _, callback = self.pending.pop(message.get("id"), (None, None))
+                if callback:
+                    try:
+                        callback(message.get("value"), message.get("error"))
+                    except Exception:
+                        pass
+                elif message.get("error"):
+                    messages.append(f"[{self.name}] {message['error']}")
+            elif kind in ("request", "notify"):
+                try:
+                    result, error = bridge.handle(self, message.get("method"), message.get("params") or {}), None
+                except Exception as e:
+                    result, error = None, str(e)
+                if kind == "request":
+                    self._send({"type": "response", "id": message.get("id"), "result": result, "error": error})
+
+        now = time.time()
+        if any(deadline < now for deadline, _ in self.pending.values()):
+            messages.append(self._restart("chamada passou do tempo limite"))
+        messages.extend(bridge.status_messages)
+        bridge.status_messages = []
+        return [m for m in messages if m]
+
+    def _restart(self, reason):
+        # Chamadas em andamento não vão ter resposta
+        pending, self.pending = self.pending, {}
+        for _, callback in pending.values():
+            if callback:
+                try:
+                    callback(None, reason)
+                except Exception:
+                    pass
+        self.stop()
+        now = time.time()
+        self.restarts = [t for t in self.restarts if now - t < 60] + [now]
+        if len(self.restarts) > self.max_restarts:
+            self.failed = True
+            return f"Plugin {self.name} desativado ({reason})"
+        self.start()
+        return f"Plugin {self.name} reiniciado ({reason})"
+
+    def stop(self):
+        proc, self.proc = self.proc, None
+        if proc and proc.poll() is None:
+            try:
+                proc.kill()
+                proc.wait(timeout=1)
+            except Exception:
+                pass
+
+
+if __name__ == "__main__":
+    # O protocolo usa o stdout: prints do plugin vão para o stderr
+    out = sys.stdout
+    sys.stdout = sys.stderr
+    serve(sys.argv[1], sys.stdin, out)
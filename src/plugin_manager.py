@@ -1,11 +1,80 @@
 # /home/johnb/tasma-code-absulut/src/plugin_manager.py
 import os
+import json
+import time
 import importlib.util
 import sys
+from plugin_host import PluginHost, HostBridge
+
+MANIFEST_NAME = "plugin.json"
+
+
+class LazySidebar:
+    """
+    Stub de sidebar de um plugin ainda não importado. Fica no lugar de ui.right_sidebar_plugin
+    (ou left) e carrega o plugin de verdade na primeira vez que a sidebar é aberta; o register()
+    do plugin então se coloca no lugar deste stub.
+    """
+    def __init__(self, manager, item, side, name):
+        self.manager = manager
+        self.item = item
+        self.side = side
+        self.name = name
+
+    @property
+    def is_visible(self):
+        return False
+
+    @is_visible.setter
+    def is_visible(self, value):
+        if not value:
+            return
+        self.manager.load_plugin(self.item)
+        real = getattr(self.manager.context.get('ui'), self.side, None)
+        if real is not None and real is not self:
+            real.is_visible = True
+
+    @property
+    def load_error(self):
+        """Por que a sidebar não abriu (import ou register falhou), para a barra de status."""
+        error = self.manager.errors.get(self.item)
+        if error:
+            return f"Erro ao carregar {self.name}: {error}"
+        if self.item in self.manager.loaded:
+            return f"{self.name} não registrou a sidebar."
+        return None
+
+    def draw(self, *args, **kwargs):
+        pass
+
+    def handle_input(self, key_code):
+        pass
+
 
 class PluginManager:
-    def __init__(self, plugin_dir="plugins"):
+    """
+    Responsabilidade: Descobrir e carregar os plugins da pasta plugins/.
+    Plugins com manifesto (plugin.json) e "lazy": true não são importados na inicialização:
+    o manifesto declara o que o plugin oferece e o editor registra stubs no lugar.
+        {"name": "...", "lazy": true,
+         "keybindings": [7],             # global_commands: importa ao apertar a tecla
+         "right_sidebar": true,          # ou "left_sidebar": importa ao abrir a sidebar
+         "status_items": ["..."]}        # importa quando o editor fica ocioso (load_deferred)
+    Com "out_of_process": true o plugin roda num processo separado (plugin_host.py), com
+    "entry" (padrão __init__.py) definindo register_remote(api) e "timeout" por chamada.
+    """
+    def __init__(self, plugin_dir="plugins", metrics=None):
         self.plugin_dir = plugin_dir
+        self.metrics = metrics # PluginMetrics (tempo do register e dos comandos)
+        self.command_owners = {} # tecla em global_commands -> plugin que a registrou
+        self.load_times = {} # plugin -> segundos (import + register), para --profile-startup
+        self.context = None
+        self.manifests = {} # plugin -> manifesto dos plugins adiados
+        self.loaded = set()
+        self.deferred = [] # Plugins com status_items: carregados no primeiro momento ocioso
+        self.errors = {} # plugin -> erro ao carregar sob demanda
+        self.hosts = [] # Plugins rodando fora do processo (PluginHost)
+        self.bridge = None
         if not os.path.exists(self.plugin_dir):
             os.makedirs(self.plugin_dir)
 
@@ -14,29 +83,175 @@ class PluginManager:
         Carrega plugins do diretório.
         Context é um dict {'editor': editor, 'ui': ui, ...}
         """
+        self.context = context
         if not os.path.exists(self.plugin_dir):
             return
 
         for item in os.listdir(self.plugin_dir):
-            path = os.path.join(self.plugin_dir, item)
-            module = None
-            
-            if os.path.isfile(path) and item.endswith(".py"):
-                plugin_name = item[:-3]
-                spec = importlib.util.spec_from_file_location(plugin_name, path)
+            manifest = self._read_manifest(item)
+            if manifest and manifest.get("out_of_process"):
+                self._start_host(item, manifest)
+                continue
+            if manifest and manifest.get("lazy"):
+                self._register_stubs(item, manifest)
+                continue
+            self._load(item, context)
+
+    def _read_manifest(self, item):
+        path = os.path.join(self.plugin_dir, item, MANIFEST_NAME)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            return manifest if isinstance(manifest, dict) else None
+        except (IOError, ValueError):
+            return None # Manifesto inválido: carrega do jeito antigo
+
+    def _start_host(self, item, manifest):
+        entry = os.path.join(self.plugin_dir, item, manifest.get("entry", "__init__.py"))
+        if not os.path.isfile(entry):
+            self.errors[item] = f"entry não encontrado: {entry}"
+            return
+        host = PluginHost(manifest.get("name", item), entry, timeout=manifest.get("timeout", 2.0))
+        if host.start():
+            self.hosts.append(host)
+            self.loaded.add(item)
+        else:
+            self.errors[item] = "não foi possível iniciar o processo do plugin"
+
+    def poll_hosts(self):
+        """Atende os plugins remotos (thread principal). Retorna mensagens de status."""
+        if not self.hosts:
+            return []
+        if self.bridge is None:
+            self.bridge = HostBridge(self.context)
+        messages = []
+        for host in self.hosts:
+            if not host.failed:
+                messages.extend(host.poll(self.bridge))
+        return messages
+
+    def open_requests(self):
+        """Arquivos que os plugins remotos pediram para abrir desde a última chamada."""
+        if self.bridge is None:
+            return []
+        requests, self.bridge.open_requests = self.bridge.open_requests, []
+        return requests
+
+    def stop_hosts(self):
+        for host in self.hosts:
+            host.stop()
+
+    def _register_stubs(self, item, manifest):
+        self.manifests[item] = manifest
+        name = manifest.get("name", item)
+        commands = self.context.get('global_commands')
+        if commands is not None:
+            for key in manifest.get("keybindings", []):
+                if isinstance(key, int):
+                    commands[key] = self._command_stub(item, key)
+                    self.command_owners[key] = item
+        ui = self.context.get('ui')
+        if ui is not None:
+            if manifest.get("right_sidebar"):
+                ui.right_sidebar_plugin = LazySidebar(self, item, 'right_sidebar_plugin', name)
+            if manifest.get("left_sidebar"):
+                ui.left_sidebar_plugin = LazySidebar(self, item, 'left_sidebar_plugin', name)
+        if manifest.get("status_items"):
+            self.deferred.append(item)
+
+    def _command_stub(self, item, key):
+        def stub():
+            self.load_plugin(item)
+            real = self.context['global_commands'].get(key)
+            if real is not None and real is not stub:
+                real() # O register() do plugin trocou o stub pelo comando de verdade
+        return stub
+
+    def run_command(self, key):
+        """
+        Executa o comando de uma tecla em global_commands (medido, se houver métricas; o tempo
+        vai para as estatísticas, mas não conta contra o orçamento do plugin).
+        Retorna uma mensagem de status se o comando falhou ou está desativado.
+        """
+        command = self.context['global_commands'][key]
+        if self.metrics is None:
+            command()
+            return None
+        owner = self.command_owners.get(key, "comandos")
+        if not self.metrics.allowed(owner, "command"):
+            return f"Plugin {owner} desativado (estourou o orçamento de tempo)."
+        started = time.perf_counter()
+        error = None
+        try:
+            command()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        self.metrics.record(owner, "command", (time.perf_counter() - started) * 1000, error)
+        return f"Erro no plugin {owner}: {error}" if error else None
+
+    def load_plugin(self, item):
+        """Importa e registra um plugin adiado (uma vez só). Retorna True se está carregado."""
+        if item in self.loaded:
+            return True
+        try:
+            self._load(item, self.context)
+        except Exception as e:
+            self.errors[item] = str(e)
+            self.loaded.add(item) # Não tenta de novo a cada tecla
+            return False
+        return True
+
+    def load_deferred(self):
+        """
+        Carrega os plugins com status_items (chamado quando o editor está ocioso).
+        Retorna as mensagens de erro dos que falharam.
+        """
+        messages = []
+        while self.deferred:
+            item = self.deferred.pop(0)
+            self.load_plugin(item)
+            if item in self.errors:
+                messages.append(f"Erro ao carregar {item}: {self.errors[item]}")
+        return messages
+
+    def _load(self, item, context):
+        started = time.perf_counter()
+        path = os.path.join(self.plugin_dir, item)
+        module = None
+
+        if os.path.isfile(path) and item.endswith(".py"):
+            plugin_name = item[:-3]
+            spec = importlib.util.spec_from_file_location(plugin_name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+
+        elif os.path.isdir(path):
+            init_path = os.path.join(path, "__init__.py")
+            if os.path.exists(init_path):
+                plugin_name = item
+                spec = importlib.util.spec_from_file_location(plugin_name, init_path)
                 module = importlib.util.module_from_spec(spec)
                 spec.loader.exec_module(module)
-            
-            elif os.path.isdir(path):
-                init_path = os.path.join(path, "__init__.py")
-                if os.path.exists(init_path):
-                    plugin_name = item
-                    spec = importlib.util.spec_from_file_location(plugin_name, init_path)
-                    module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(module)
-
-            if module and hasattr(module, "register"):
-                try:
-                    module.register(context)
-                except Exception as e:
-                    print(f"Erro ao registrar plugin {item}: {e}")
\ No newline at end of file
+
+        if module:
+            self.loaded.add(item)
+        if module and hasattr(module, "register"):
+            commands = context.get('global_commands') or {}
+            before = {key: commands[key] for key in commands}
+            register_started = time.perf_counter()
+            error = None
+            try:
+                module.register(context)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                self.errors[item] = error
+            if self.metrics is not None:
+                self.metrics.record(item, "register", (time.perf_counter() - register_started) * 1000, error)
+            # Teclas novas (ou trocadas) em global_commands pertencem a este plugin
+            for key, command in commands.items():
+                if before.get(key) is not command:
+                    self.command_owners[key] = item
+        if module:
+            self.load_times[item] = time.perf_counter() - started
@@ -0,0 +1,157 @@
+# /home/johnb/tasma-code-absulut/src/plugin_metrics.py
+import time
+import threading
+import collections
+
+# Orçamento padrão (ms) por tipo de chamada; "plugin_budgets_ms" nas configurações sobrescreve
+# ("provider" = barra de status no worker: não atrasa o quadro, só desativa quem trava)
+DEFAULT_BUDGETS_MS = {"register": 200, "draw": 10, "status": 3, "event": 10, "provider": 2000}
+# Só medidos (janela de estatísticas), nunca estrangulados: comandos abrem janelas que esperam teclas
+UNBUDGETED_KINDS = ("command",)
+# Tipos chamados a cada quadro: um plugin estrangulado roda no máximo uma vez por THROTTLE_INTERVAL
+PER_FRAME_KINDS = ("draw", "status", "event")
+THROTTLE_INTERVAL = 1.0
+
+
+class RollingHistogram:
+    """Últimas 'size' medições (ms) de um tipo de chamada, mais os totais desde o início."""
+    BUCKETS_MS = (1, 4, 16, 50) # Limites superiores; o último balde é ">= 50 ms"
+
+    def __init__(self, size=256):
+        self.samples = collections.deque(maxlen=size)
+        self.count = 0
+        self.total_ms = 0.0
+        self.errors = 0
+
+    def add(self, ms):
+        self.samples.append(ms)
+        self.count += 1
+        self.total_ms += ms
+
+    def percentile(self, p):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def mean(self):
+        return sum(self.samples) / len(self.samples) if self.samples else 0.0
+
+    def max(self):
+        return max(self.samples) if self.samples else 0.0
+
+    def buckets(self):
+        """Contagem da janela por faixa de tempo: [<1, <4, <16, <50, >=50] ms."""
+        counts = [0] * (len(self.BUCKETS_MS) + 1)
+        for ms in self.samples:
+            for i, limit in enumerate(self.BUCKETS_MS):
+                if ms < limit:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+        return counts
+
+
+class PluginMetrics:
+    """
+    Responsabilidade: Medir o tempo de cada plugin (register, draw, status, comandos e eventos)
+    e aplicar orçamentos (menos aos comandos, que incluem o tempo esperando o usuário).
+    Um plugin que estoura o orçamento de um tipo 'strikes' vezes seguidas passa a ser estrangulado
+    (chamadas por quadro no máximo 1x por segundo); se continuar estourando, é desativado.
+    """
+    def __init__(self, settings=None):
+        settings = settings or {}
+        self.budgets = dict(DEFAULT_BUDGETS_MS)
+        self.budgets.update(settings.get("plugin_budgets_ms", {}))
+        self.strikes_limit = settings.get("plugin_budget_strikes", 5)
+        self.histograms = {} # (plugin, tipo) -> RollingHistogram
+        self.states = {} # plugin -> {'strikes': {tipo: n}, 'throttled', 'disabled', 'last_run', 'last_error'}
+        # Os provedores da barra de status registram da thread deles; a janela lê da principal
+        self.lock = threading.RLock()
+
+    def _state(self, plugin):
+        state = self.states.get(plugin)
+        if state is None:
+            state = self.states[plugin] = {'strikes': {}, 'throttled': False, 'disabled': False,
+                                           'last_run': 0.0, 'last_error': None}
+        return state
+
+    def allowed(self, plugin, kind):
+        with self.lock:
+            state = self._state(plugin)
+            if state['disabled']:
+                return False
+            if state['throttled'] and kind in PER_FRAME_KINDS:
+                return time.time() - state['last_run'] >= THROTTLE_INTERVAL
+            return True
+
+    def record(self, plugin, kind, ms, error=None):
+        with self.lock:
+            histogram = self.histograms.get((plugin, kind))
+            if histogram is None:
+                histogram = self.histograms[(plugin, kind)] = RollingHistogram()
+            histogram.add(ms)
+            state = self._state(plugin)
+            state['last_run'] = time.time()
+            if error is not None:
+                histogram.errors += 1
+                state['last_error'] = error
+            budget = self.budgets.get(kind)
+            if budget is None or kind in UNBUDGETED_KINDS:
+                return
+            # Estouros seguidos contam por tipo: um status rápido não perdoa um draw sempre lento
+            strikes = state['strikes']
+            if ms <= budget:
+                strikes[kind] = 0
+                return
+            strikes[kind] = strikes.get(kind, 0) + 1
+            if strikes[kind] >= self.strikes_limit:
+                strikes[kind] = 0
+                if state['throttled']:
+                    state['disabled'] = True
+                else:
+                    state['throttled'] = True
+
+    def call(self, plugin, kind, func, *args, default=None):
+        """Roda func medindo o tempo. Erros são registrados (não propagam); retorna default."""
+        if not self.allowed(plugin, kind):
+            return default
+        started = time.perf_counter()
+        error = None
+        try:
+            return func(*args)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            return default
+        finally:
+            self.record(plugin, kind, (time.perf_counter() - started) * 1000, error)
+
+    def status_of(self, plugin):
+        with self.lock:
+            state = self._state(plugin)
+            if state['disabled']:
+                return "desativado"
+            if state['throttled']:
+                return "estrangulado"
+            return "ok"
+
+    def enable(self, plugin):
+        """Volta o plugin ao normal (janela de estatísticas)."""
+        with self.lock:
+            state = self._state(plugin)
+            state.update(strikes={}, throttled=False, disabled=False)
+
+    def rows(self):
+        """Linhas para a janela de estatísticas, dos plugins mais caros para os mais baratos."""
+        with self.lock:
+            rows = []
+            for (plugin, kind), histogram in self.histograms.items():
+                rows.append({
+                    'plugin': plugin, 'kind': kind, 'calls': histogram.count,
+                    'mean': histogram.mean(), 'p95': histogram.percentile(95), 'max': histogram.max(),
+                    'total': histogram.total_ms, 'errors': histogram.errors, 'buckets': histogram.buckets(),
+                    'status': self.status_of(plugin),
+                })
+            rows.sort(key=lambda row: row['total'], reverse=True)
+            return rows
@@ -0,0 +1,56 @@
+# /home/johnb/tasma-code-absulut/src/plugin_stats_window.py
+import curses
+
+class PluginStatsWindow:
+    """
+    Responsabilidade: Mostrar quanto tempo cada plugin gasta (register, draw, status,
+    comandos, eventos) e permitir reativar um plugin estrangulado ou desativado.
+    """
+    def __init__(self, ui, metrics):
+        self.ui = ui
+        self.metrics = metrics
+        self.selected = 0
+
+    def run(self):
+        """Setas escolhem a linha, 'e' reativa o plugin, Esc/q fecha."""
+        while True:
+            rows = self.metrics.rows()
+            self.selected = min(self.selected, max(0, len(rows) - 1))
+            self.draw(rows)
+            key = self.ui.get_input()
+            key_code = ord(key) if isinstance(key, str) and len(key) == 1 else key
+            if key_code in (27, ord('q')):
+                return
+            elif key_code == curses.KEY_UP:
+                self.selected = max(0, self.selected - 1)
+            elif key_code == curses.KEY_DOWN:
+                self.selected = min(max(0, len(rows) - 1), self.selected + 1)
+            elif key_code == ord('e') and rows:
+                self.metrics.enable(rows[self.selected]['plugin'])
+
+    def draw(self, rows):
+        h, w = self.ui.height, self.ui.width
+        win_h = min(24, h - 2)
+        win_w = min(100, w - 2)
+        win = curses.newwin(win_h, win_w, (h - win_h) // 2, (w - win_w) // 2)
+        win.bkgd(' ', curses.color_pair(5))
+        win.box()
+        try:
+            win.addstr(0, 2, " Desempenho dos Plugins (Alt+m) ", curses.A_BOLD)
+            header = f"{'Plugin':<20}{'Tipo':<10}{'Chamadas':>9}{'Média':>9}{'p95':>9}{'Máx':>9}{'Erros':>7}  {'<1/<4/<16/<50/+':<18}Estado"
+            win.addstr(1, 2, header[:win_w - 4], curses.A_UNDERLINE)
+            visible = win_h - 4
+            first = max(0, self.selected - visible + 1)
+            for i, row in enumerate(rows[first:first + visible]):
+                buckets = "/".join(str(c) for c in row['buckets'])
+                line = (f"{row['plugin'][:19]:<20}{row['kind']:<10}{row['calls']:>9}"
+                        f"{row['mean']:>8.1f}m{row['p95']:>8.1f}m{row['max']:>8.1f}m{row['errors']:>7}  "
+                        f"{buckets:<18}{row['status']}")
+                attr = curses.A_REVERSE if first + i == self.selected else 0
+                win.addstr(2 + i, 2, line[:win_w - 4], attr)
+            if not rows:
+                win.addstr(2, 2, "Nenhuma chamada de plugin medida ainda.")
+            win.addstr(win_h - 2, 2, "Setas: escolher | e: reativar plugin | Esc: fechar"[:win_w - 4])
+        except curses.error:
+            pass
+        win.refresh()
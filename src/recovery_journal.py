@@ -0,0 +1,255 @@
+# /home/johnb/tasma-code-absulut/src/recovery_journal.py
+import os
+import json
+import stat
+import hashlib
+
+JOURNAL_SUFFIX = ".journal"
+
+
+def _digest(lines):
+    return hashlib.sha1("\n".join(lines).encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+def default_directory():
+    """Diretório por usuário que sobrevive a um reboot: $XDG_STATE_HOME/tasma/recovery."""
+    base = os.environ.get("XDG_STATE_HOME") or os.path.join(os.path.expanduser("~"), ".local", "state")
+    return os.path.join(base, "tasma", "recovery")
+
+
+def private_dir(directory):
+    """Cria o diretório com modo 0700 e confere se é nosso (não um link nem de outro usuário)."""
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        info = os.lstat(directory)
+        if not stat.S_ISDIR(info.st_mode):
+            return False
+        if hasattr(os, "getuid") and info.st_uid != os.getuid():
+            return False
+        if stat.S_IMODE(info.st_mode) & 0o077:
+            os.chmod(directory, 0o700)
+    except OSError:
+        return False
+    return True
+
+
+def _pid_alive(pid):
+    if not isinstance(pid, int) or pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class RecoveryJournal:
+    """
+    Responsabilidade: Guardar as edições não salvas de cada buffer num diário só de acréscimo
+    (uma operação JSON por linha), para recuperar o trabalho depois de um crash.
+    - Cabeçalho: caminho do arquivo e hash do conteúdo base (o que está no disco).
+    - Operações: {"s": início, "r": removidas, "l": [linhas novas]} vindas de Editor._edit.
+    As operações ficam em memória e vão para o disco em flush() (uma escrita + um fsync por
+    arquivo, chamado quando o editor está ocioso). Salvar o arquivo compacta o diário.
+    Se o diretório não for seguro (de outro usuário ou um link), o diário fica desligado.
+    """
+    def __init__(self, directory=None):
+        self.directory = directory or default_directory()
+        self.enabled = private_dir(self.directory)
+        self.entries = {} # Editor -> {'path', 'journal', 'base', 'pending', 'started'}
+        self.suspended = [] # Entradas de buffers tirados da memória (a aba continua aberta)
+
+    def journal_path(self, filepath):
+        name = hashlib.sha1(os.path.abspath(filepath).encode('utf-8', 'surrogatepass')).hexdigest()
+        return os.path.join(self.directory, name + JOURNAL_SUFFIX)
+
+    # --- Gravação ---------------------------------------------------------------
+
+    def attach(self, editor, filepath, base_lines=None):
+        """Começa a registrar as edições do editor (base = conteúdo no disco, por padrão o atual)."""
+        if not self.enabled or editor in self.entries or not filepath:
+            return
+        self.entries[editor] = {
+            'path': os.path.abspath(filepath),
+            'journal': self.journal_path(filepath),
+            'base': _digest(editor.lines if base_lines is None else base_lines),
+            'pending': [],
+            'started': False, # O arquivo do diário só é criado na primeira edição
+        }
+        editor.edit_listeners.append(self._on_edit)
+
+    def detach(self, editor, discard=True):
+        entry = self.entries.pop(editor, None)
+        if not entry:
+            return
+        if self._on_edit in editor.edit_listeners:
+            editor.edit_listeners.remove(self._on_edit)
+        if discard:
+            self._remove(entry['journal'])
+
+    def suspend(self, editor):
+        """O Editor vai sair da memória: grava o pendente e guarda a entrada até resume()."""
+        entry = self.entries.pop(editor, None)
+        if not entry:
+            return None
+        if self._on_edit in editor.edit_listeners:
+            editor.edit_listeners.remove(self._on_edit)
+        self._write(entry)
+        self.suspended.append(entry)
+        return entry
+
+    def resume(self, editor, entry):
+        """O buffer voltou (num Editor novo): continua no mesmo diário."""
+        if entry not in self.suspended:
+            return
+        self.suspended.remove(entry)
+        self.entries[editor] = entry
+        editor.edit_listeners.append(self._on_edit)
+
+    def abandon(self, entry):
+        """O buffer não pôde voltar: o diário fica no disco para ser recuperado na próxima sessão."""
+        if entry in self.suspended:
+            self.suspended.remove(entry)
+
+    def _on_edit(self, editor, start, removed, inserted):
+        entry = self.entries.get(editor)
+        if entry is None:
+            return
+        if not entry['started']:
+            header = {"type": "header", "path": entry['path'], "base": entry['base'], "pid": os.getpid()}
+            entry['pending'].append(json.dumps(header))
+            entry['started'] = True
+        op = {"s": start, "r": removed, "l": editor.lines[start:start + inserted]}
+        entry['pending'].append(json.dumps(op))
+
+    def has_pending(self):
+        return any(entry['pending'] for entry in self.entries.values())
+
+    def flush(self):
+        """Grava as operações acumuladas: uma escrita e um fsync por diário (group commit)."""
+        for entry in self.entries.values():
+            self._write(entry)
+
+    def _write(self, entry):
+        if not entry['pending']:
+            return
+        data = "\n".join(entry['pending']) + "\n"
+        entry['pending'] = []
+        try:
+            fd = os.open(entry['journal'], os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            try:
+                os.write(fd, data.encode('utf-8'))
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+    def compact(self, editor):
+        """Arquivo salvo: o conteúdo atual vira a nova base e o diário volta a ficar vazio."""
+        entry = self.entries.get(editor)
+        if not entry:
+            return
+        entry['base'] = _digest(editor.lines)
+        entry['pending'] = []
+        entry['started'] = False
+        self._remove(entry['journal'])
+
+    def rename(self, editor, new_path):
+        """Arquivo renomeado/movido: mesmo conteúdo base, novo caminho."""
+        entry = self.entries.get(editor)
+        if not entry:
+            return
+        self.flush()
+        old_journal = entry['journal']
+        entry['path'] = os.path.abspath(new_path)
+        entry['journal'] = self.journal_path(new_path)
+        if entry['started']:
+            # Reescreve o cabeçalho com o caminho novo (as operações continuam valendo)
+            header = {"type": "header", "path": entry['path'], "base": entry['base'], "pid": os.getpid()}
+            try:
+                with open(old_journal, 'r', encoding='utf-8') as f:
+                    ops = f.read().splitlines()[1:]
+                with open(entry['journal'], 'w', encoding='utf-8') as f:
+                    f.write("\n".join([json.dumps(header)] + ops) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError:
+                pass
+        self._remove(old_journal)
+
+    def close(self):
+        """Saída normal: nada a recuperar, remove os diários desta sessão."""
+        for editor in list(self.entries):
+            self.detach(editor, discard=True)
+        for entry in self.suspended:
+            self._remove(entry['journal'])
+        self.suspended = []
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    # --- Recuperação ------------------------------------------------------------
+
+    def find_orphans(self):
+        """Diários deixados por sessões que não terminaram: [(diário, caminho do arquivo)]."""
+        orphans = []
+        if not self.enabled:
+            return orphans
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return orphans
+        for name in sorted(names):
+            if not name.endswith(JOURNAL_SUFFIX):
+                continue
+            journal = os.path.join(self.directory, name)
+            header = self._read_header(journal)
+            if not header:
+                self._remove(journal)
+                continue
+            if header.get("pid") != os.getpid() and _pid_alive(header.get("pid", -1)):
+                continue # Outra instância do editor ainda está usando
+            orphans.append((journal, header["path"]))
+        return orphans
+
+    def _read_header(self, journal):
+        try:
+            with open(journal, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline())
+        except (OSError, ValueError):
+            return None
+        if not isinstance(header, dict) or header.get("type") != "header" or not header.get("path"):
+            return None
+        return header
+
+    def replay(self, journal, base_lines):
+        """
+        Reaplica as operações do diário sobre o conteúdo base (O(edições)).
+        Retorna as linhas recuperadas ou None se o arquivo no disco não é mais a base do diário.
+        """
+        header = self._read_header(journal)
+        if not header or header.get("base") != _digest(base_lines):
+            return None
+        lines = list(base_lines)
+        try:
+            with open(journal, 'r', encoding='utf-8') as f:
+                f.readline()
+                for raw in f:
+                    try:
+                        op = json.loads(raw)
+                    except ValueError:
+                        break # Última linha cortada pelo crash: o que veio antes vale
+                    start, removed = op["s"], op["r"]
+                    lines[start:start + removed] = op["l"]
+        except OSError:
+            return None
+        return lines if lines else [""]
+
+    def discard(self, journal):
+        self._remove(journal)
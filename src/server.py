@@ -0,0 +1,142 @@
+# /home/johnb/tasma-code-absulut/src/server.py
+import os
+import json
+import stat
+import queue
+import socket
+import tempfile
+import threading
+from recovery_journal import private_dir
+
+
+def default_socket_path():
+    """Um socket por usuário, num diretório 0700 só dele (em XDG_RUNTIME_DIR, senão no temp)."""
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return os.path.join(base, f"tasma-{uid}", "server.sock")
+
+
+def is_trusted(socket_path):
+    """O socket e o diretório dele são do usuário atual (ninguém mais pode ter criado ou trocado)."""
+    uid = os.getuid() if hasattr(os, "getuid") else None
+    try:
+        info = os.lstat(os.path.dirname(socket_path))
+        if not stat.S_ISDIR(info.st_mode) or stat.S_IMODE(info.st_mode) & 0o077:
+            return False
+        if uid is not None and info.st_uid != uid:
+            return False
+        info = os.lstat(socket_path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(info.st_mode) and (uid is None or info.st_uid == uid)
+
+
+def parse_target(arg):
+    """'arquivo:linha' -> (caminho absoluto, linha ou None)."""
+    path, line = arg, None
+    head, sep, tail = arg.rpartition(':')
+    if sep and head and tail.isdigit() and not os.path.exists(arg):
+        path, line = head, int(tail)
+    return os.path.abspath(os.path.expanduser(path)), line
+
+
+class EditorServer:
+    """
+    Responsabilidade: Receber pedidos de outros processos (tasma_client.py) num socket Unix
+    enquanto o editor está aberto. Uma mensagem JSON por linha:
+        pedido:   {"cmd": "open", "path": "/abs/arquivo", "line": 12}
+        resposta: {"ok": true}
+    A thread do servidor só enfileira; o loop principal consome com poll() e abre as abas.
+    """
+    def __init__(self, socket_path=None):
+        self.socket_path = socket_path or default_socket_path()
+        self.requests = queue.Queue()
+        self.sock = None
+        self.thread = None
+
+    def start(self):
+        """Começa a escutar. Retorna False se outra instância já é o servidor (ou sem suporte)."""
+        if not hasattr(socket, "AF_UNIX"):
+            return False
+        if not private_dir(os.path.dirname(self.socket_path)):
+            return False # Diretório de outro usuário (ou um link): não escuta nem apaga nada lá
+        if os.path.lexists(self.socket_path):
+            if not is_trusted(self.socket_path):
+                return False
+            if self._is_alive():
+                return False
+            try:
+                os.remove(self.socket_path) # Socket de uma instância que morreu
+            except OSError:
+                return False
+        old_umask = os.umask(0o077) # O socket já nasce 0600: só o próprio usuário manda comandos
+        try:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.bind(self.socket_path)
+            sock.listen(8)
+        except OSError:
+            return False
+        finally:
+            os.umask(old_umask)
+        self.sock = sock
+        self.thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self.thread.start()
+        return True
+
+    def _is_alive(self):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.settimeout(0.5)
+                probe.connect(self.socket_path)
+            return True
+        except OSError:
+            return False
+
+    def _accept_loop(self):
+        while self.sock is not None:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return # Socket fechado em stop()
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            conn.settimeout(5)
+            try:
+                reader = conn.makefile('r', encoding='utf-8')
+                for line in reader:
+                    try:
+                        request = json.loads(line)
+                    except ValueError:
+                        request = None
+                    if not isinstance(request, dict) or request.get("cmd") != "open" or not request.get("path"):
+                        reply = {"ok": False, "error": "pedido inválido"}
+                    else:
+                        self.requests.put(request)
+                        reply = {"ok": True}
+                    conn.sendall((json.dumps(reply) + "\n").encode('utf-8'))
+            except OSError:
+                pass
+
+    def poll(self):
+        """Pedidos recebidos desde a última chamada (thread principal)."""
+        pending = []
+        while True:
+            try:
+                pending.append(self.requests.get_nowait())
+            except queue.Empty:
+                return pending
+
+    def stop(self):
+        sock, self.sock = self.sock, None
+        if sock is None:
+            return
+        try:
+            sock.close()
+        except OSError:
+            pass
+        try:
+            os.remove(self.socket_path)
+        except OSError:
+            pass
@@ -1,11 +1,19 @@
 # /home/johnb/tasma-code-absulut/src/session_manager.py
 import json
 import os
+import tempfile
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 class SessionManager:
     """
-    Responsabilidade: Gerenciar a persistência de estado da sessão (ex: última pasta aberta).
+    Responsabilidade: Gerenciar a persistência de estado da sessão (última pasta aberta,
+    abas abertas com cursor/rolagem/dobras/marcadores e o layout do split).
     Isola a lógica de I/O de configuração de sessão do fluxo principal.
+    O estado fica em memória: salvar só marca as chaves como sujas e flush() grava
+    (chamado quando o editor está ocioso e na saída).
     """
     def __init__(self, session_file="session.json"):
         # Define o caminho do arquivo de sessão relativo à raiz do projeto
@@ -13,40 +21,134 @@ class SessionManager:
         base_dir = os.path.dirname(os.path.abspath(__file__))
         project_root = os.path.dirname(base_dir)
         self.session_path = os.path.join(project_root, session_file)
+        self.data = self._read() # Lido uma vez; depois tudo é servido da memória
+        self.dirty = set() # Chaves alteradas por esta instância desde o último flush
+        self.synced_session = self.data.get("session") # Sessão como estava no disco no último read/flush
 
-    def save_sidebar_path(self, path):
-        """Salva o caminho atual da sidebar no arquivo de sessão."""
+    def _read(self):
+        """Lê o arquivo de sessão inteiro ({} se não existir ou estiver corrompido)."""
+        if not os.path.exists(self.session_path):
+            return {}
         try:
-            data = {}
-            # Tenta ler dados existentes para não sobrescrever outras configs futuras
-            if os.path.exists(self.session_path):
+            with open(self.session_path, 'r') as f:
+                data = json.load(f)
+                return data if isinstance(data, dict) else {}
+        except (IOError, json.JSONDecodeError):
+            return {}
+
+    def _update(self, **values):
+        """Altera as chaves só em memória (sem I/O)."""
+        for key, value in values.items():
+            if self.data.get(key) != value:
+                self.data[key] = value
+                self.dirty.add(key)
+
+    def flush(self):
+        """
+        Grava as chaves sujas de forma atômica (arquivo temporário + rename).
+        Política com várias instâncias abertas: relê o arquivo e só sobrescreve as chaves que
+        esta instância alterou; as demais ficam como a outra instância deixou (e passam a valer aqui).
+        As abas ("session") são mescladas: ver _merge_tabs.
+        """
+        if not self.dirty:
+            return
+        lock = None
+        try:
+            if fcntl:
+                # Serializa o ler-mesclar-gravar entre instâncias
+                lock = open(self.session_path + ".lock", 'w')
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            data = self._read()
+            for key in self.dirty:
+                if key == "session":
+                    self.data[key] = self._merge_tabs(self.data[key], data.get(key))
+                data[key] = self.data[key]
+            fd, tmp_path = tempfile.mkstemp(prefix=".session-", dir=os.path.dirname(self.session_path))
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(data, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.session_path)
+            except BaseException:
                 try:
-                    with open(self.session_path, 'r') as f:
-                        data = json.load(f)
-                except json.JSONDecodeError:
-                    pass # Se corrompido, sobrescreve
-            
-            data["last_path"] = os.path.abspath(path)
-            
-            with open(self.session_path, 'w') as f:
-                json.dump(data, f)
-        except IOError:
-            pass # Falha silenciosa em I/O não deve travar o editor
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+            self.data = data
+            self.synced_session = data.get("session")
+            self.dirty.clear()
+        except (IOError, OSError):
+            pass # Falha silenciosa em I/O não deve travar o editor (tenta de novo no próximo flush)
+        finally:
+            if lock:
+                lock.close() # Fechar libera o flock
+
+    def _merge_tabs(self, ours, theirs):
+        """
+        Abas desta instância primeiro (os índices do layout continuam valendo) e, no fim, as que
+        outra instância abriu desde a última sincronização. Abas que já estavam no disco e esta
+        instância fechou não voltam; o layout (aba atual, split) é o desta instância.
+        """
+        def paths(session):
+            if not isinstance(session, dict):
+                return set()
+            return {t.get("path") for t in session.get("tabs", []) if isinstance(t, dict)}
+
+        if not isinstance(theirs, dict) or not isinstance(theirs.get("tabs"), list):
+            return ours
+        known = paths(ours) | paths(self.synced_session)
+        extra = [t for t in theirs["tabs"]
+                 if isinstance(t, dict) and t.get("path") and t.get("path") not in known]
+        if not extra:
+            return ours
+        return dict(ours, tabs=list(ours["tabs"]) + extra)
+
+    def save_sidebar_path(self, path):
+        """Guarda o caminho atual da sidebar (vai para o disco no próximo flush)."""
+        self._update(last_path=os.path.abspath(path))
 
     def load_sidebar_path(self):
         """Carrega o último caminho da sidebar ou retorna a home do usuário."""
         default_path = os.path.expanduser("~")
-        
-        if not os.path.exists(self.session_path):
-            return default_path
-            
-        try:
-            with open(self.session_path, 'r') as f:
-                data = json.load(f)
-                last_path = data.get("last_path")
-                if last_path and os.path.isdir(last_path):
-                    return last_path
-        except (IOError, json.JSONDecodeError):
-            pass
-            
-        return default_path
\ No newline at end of file
+        last_path = self.data.get("last_path")
+        if last_path and os.path.isdir(last_path):
+            return last_path
+        return default_path
+
+    def save_session(self, tabs, current_tab, split_mode, split_tab_indices, active_split):
+        """
+        Guarda as abas abertas e o layout (vai para o disco no próximo flush).
+        tabs: [{'path', 'cx', 'cy', 'scroll_x', 'scroll_y', 'folds', 'bookmarks'}]
+        """
+        self._update(session={
+            "tabs": tabs,
+            "current_tab": current_tab,
+            "split_mode": split_mode,
+            "split_tab_indices": list(split_tab_indices),
+            "active_split": active_split,
+        })
+
+    def load_session(self):
+        """Carrega as abas e o layout salvos (sessão vazia se não houver)."""
+        session = self.data.get("session")
+        if not isinstance(session, dict):
+            session = {}
+        tabs = [t for t in session.get("tabs", []) if isinstance(t, dict) and t.get("path")]
+        count = len(tabs)
+
+        def valid_index(value):
+            return value if isinstance(value, int) and 0 <= value < count else 0
+
+        split_mode = session.get("split_mode", 0)
+        indices = session.get("split_tab_indices", [0, 0])
+        if not isinstance(indices, list) or len(indices) != 2:
+            indices = [0, 0]
+        return {
+            "tabs": tabs,
+            "current_tab": valid_index(session.get("current_tab")),
+            "split_mode": split_mode if split_mode in (0, 1, 2) else 0,
+            "split_tab_indices": [valid_index(i) for i in indices],
+            "active_split": 1 if session.get("active_split") == 1 else 0,
+        }
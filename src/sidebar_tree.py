@@ -0,0 +1,201 @@
+# /home/johnb/tasma-code-absulut/src/sidebar_tree.py
+import os
+import threading
+
+class SidebarTree:
+    """
+    Responsabilidade: Manter a árvore de arquivos da sidebar.
+    Lista diretórios só quando são expandidos, guarda as subárvores já listadas e
+    mantém a lista achatada de linhas visíveis (rows) que a UI desenha por janela.
+    Cada linha é (nome, is_dir, profundidade, caminho_absoluto).
+    """
+    MAX_WATCHED_DIRS = 256
+
+    def __init__(self, file_handler, root, show_hidden=False):
+        self.file_handler = file_handler
+        self.root = os.path.abspath(root)
+        self.show_hidden = show_hidden
+        self.expanded = set() # Caminhos de diretórios expandidos
+        self.children = {} # Cache: caminho -> [(nome, is_dir)] sem ".."
+        self.rows = []
+        self.lock = threading.Lock()
+        self.expand_thread = None
+        self.pending_expand = None # Resultado do expand-all em background: (raiz, listagem)
+        self.refresh()
+
+    # --- Listagem ---------------------------------------------------------------
+
+    def _list_children(self, path):
+        items = self.children.get(path)
+        if items is None:
+            items = [i for i in self.file_handler.list_directory(path, self.show_hidden) if i[0] != ".."]
+            self.children[path] = items
+        return items
+
+    def _flatten(self, path, depth, out):
+        """Achata a subárvore de 'path' (respeitando o que está expandido) em 'out'."""
+        # Pilha explícita: árvores profundas não estouram o limite de recursão
+        stack = [(path, depth, 0)]
+        while stack:
+            dir_path, d, start = stack.pop()
+            items = self._list_children(dir_path)
+            for i in range(start, len(items)):
+                name, is_dir = items[i]
+                child = os.path.join(dir_path, name)
+                out.append((name, is_dir, d, child))
+                if is_dir and child in self.expanded:
+                    stack.append((dir_path, d, i + 1))
+                    stack.append((child, d + 1, 0))
+                    break
+        return out
+
+    def refresh(self):
+        """Reconstrói as linhas visíveis a partir da raiz (usa o cache para pastas já listadas)."""
+        rows = []
+        if self.root != os.path.abspath(os.sep):
+            rows.append(("..", True, 0, os.path.dirname(self.root)))
+        self.rows = self._flatten(self.root, 0, rows)
+        return self.rows
+
+    def invalidate(self, paths):
+        """Descarta as listagens de 'paths' (mudaram no disco) e reconstrói as linhas."""
+        for path in paths:
+            self.children.pop(os.path.abspath(path), None)
+            self.file_handler.dir_cache.invalidate(path)
+        return self.refresh()
+
+    def reload(self):
+        """Esquece todas as listagens (ex: alternou arquivos ocultos)."""
+        self.children.clear()
+        return self.refresh()
+
+    def set_root(self, path):
+        self.root = os.path.abspath(path)
+        self.expanded.clear()
+        self.children.clear()
+        return self.refresh()
+
+    def set_show_hidden(self, show_hidden):
+        self.show_hidden = show_hidden
+        return self.reload()
+
+    # --- Consultas --------------------------------------------------------------
+
+    def entry(self, index):
+        """Retorna (nome, is_dir, caminho) da linha ou None."""
+        if 0 <= index < len(self.rows):
+            name, is_dir, _, path = self.rows[index]
+            return name, is_dir, path
+        return None
+
+    def index_of(self, path, default=0):
+        for i, row in enumerate(self.rows):
+            if row[3] == path and row[0] != "..":
+                return i
+        return default
+
+    def target_dir(self, index):
+        """Diretório onde criar/colar: a pasta selecionada ou a pasta do arquivo selecionado."""
+        entry = self.entry(index)
+        if not entry or entry[0] == "..":
+            return self.root
+        name, is_dir, path = entry
+        return path if is_dir else os.path.dirname(path)
+
+    def watched_dirs(self):
+        """Raiz e pastas expandidas (limitado, para não esgotar watches do inotify)."""
+        dirs = [self.root]
+        dirs.extend(sorted(self.expanded)[:self.MAX_WATCHED_DIRS - 1])
+        return dirs
+
+    # --- Expandir / Recolher ----------------------------------------------------
+
+    def _subtree_end(self, index):
+        depth = self.rows[index][2]
+        end = index + 1
+        while end < len(self.rows) and self.rows[end][2] > depth:
+            end += 1
+        return end
+
+    def expand(self, index):
+        entry = self.entry(index)
+        if not entry or not entry[1] or entry[0] == ".." or entry[2] in self.expanded:
+            return False
+        path = entry[2]
+        self.expanded.add(path)
+        # Insere só a subárvore nova (o resto das linhas não é recalculado)
+        self.rows[index + 1:index + 1] = self._flatten(path, self.rows[index][2] + 1, [])
+        return True
+
+    def collapse(self, index):
+        entry = self.entry(index)
+        if not entry or entry[2] not in self.expanded:
+            return False
+        # O cache de filhos fica: reexpandir é instantâneo e mantém as subpastas abertas
+        del self.rows[index + 1:self._subtree_end(index)]
+        self.expanded.discard(entry[2])
+        return True
+
+    def toggle(self, index):
+        entry = self.entry(index)
+        if entry and entry[2] in self.expanded:
+            return self.collapse(index)
+        return self.expand(index)
+
+    def parent_index(self, index):
+        """Índice da linha da pasta que contém a linha 'index' (para a seta esquerda)."""
+        if not (0 <= index < len(self.rows)):
+            return index
+        depth = self.rows[index][2]
+        for i in range(index - 1, -1, -1):
+            if self.rows[i][2] < depth:
+                return i
+        return index
+
+    def collapse_all(self):
+        self.expanded.clear()
+        return self.refresh()
+
+    def expand_all(self, walker, index=None):
+        """
+        Expande tudo abaixo da raiz (ou da pasta na linha 'index') em uma thread.
+        O FileWalker (respeita .gitignore e globs de exclusão) só escolhe quais pastas abrir;
+        o conteúdo de cada pasta vem da mesma listagem sem filtro da árvore (list_directory),
+        para que nada suma da sidebar. O resultado é aplicado pelo loop principal em poll().
+        """
+        if self.expand_thread and self.expand_thread.is_alive():
+            return False
+        root = base = self.root
+        entry = self.entry(index) if index is not None else None
+        if entry and entry[1] and entry[0] != "..":
+            base = entry[2]
+
+        def target():
+            dirs = [base] + [path for path, _, is_dir in walker.walk(base, include_dirs=True) if is_dir]
+            listing = {}
+            for path in dirs:
+                listing[path] = [i for i in self.file_handler.list_directory(path, self.show_hidden) if i[0] != ".."]
+            with self.lock:
+                self.pending_expand = (root, listing)
+
+        self.expand_thread = threading.Thread(target=target, daemon=True)
+        self.expand_thread.start()
+        return True
+
+    def is_busy(self):
+        return bool(self.expand_thread and self.expand_thread.is_alive())
+
+    def poll(self):
+        """Aplica um expand-all concluído. Retorna True se as linhas mudaram."""
+        with self.lock:
+            pending, self.pending_expand = self.pending_expand, None
+        if pending is None:
+            return False
+        root, listing = pending
+        if root != self.root:
+            return False # A raiz mudou (set_root) enquanto listava: o resultado é da árvore antiga
+        self.children.update(listing)
+        self.expanded.update(listing.keys())
+        self.expanded.discard(self.root)
+        self.refresh()
+        return True
@@ -0,0 +1,48 @@
+# /home/johnb/tasma-code-absulut/src/startup_profiler.py
+import time
+
+# Importado antes de tudo em main.py: o tempo dos imports conta a partir daqui
+_START = time.perf_counter()
+
+
+class StartupProfiler:
+    """
+    Responsabilidade: Medir as etapas da inicialização (imports, config/tema, cada plugin,
+    primeiro desenho) para o modo --profile-startup. Medir é barato e sempre acontece;
+    o relatório só é impresso quando o modo foi pedido.
+    """
+    def __init__(self):
+        self.steps = [] # [(etapa, segundos)]
+        self.last = _START
+        self.first_frame = None # Segundos desde o início até o primeiro desenho
+
+    def mark(self, label):
+        """Fecha a etapa 'label': tempo desde a marca anterior."""
+        now = time.perf_counter()
+        self.steps.append((label, now - self.last))
+        self.last = now
+
+    def add(self, label, seconds):
+        """Registra uma sub-etapa medida por fora (ex: um plugin); não move a marca."""
+        self.steps.append(("  " + label, seconds))
+
+    def frame_drawn(self):
+        if self.first_frame is None:
+            self.mark("primeiro desenho")
+            self.first_frame = time.perf_counter() - _START
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - _START) * 1000
+
+    def report(self):
+        """Tabela de tempos (uma linha por etapa)."""
+        lines = ["Inicialização do Tasma Code", "-" * 44]
+        for label, seconds in self.steps:
+            lines.append(f"{label:<34} {seconds * 1000:8.1f} ms")
+        lines.append("-" * 44)
+        if self.first_frame is not None:
+            lines.append(f"{'até o primeiro quadro':<34} {self.first_frame * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+
+profiler = StartupProfiler()
@@ -6,6 +6,18 @@ class StatusBar:
     def __init__(self):
         self.plugin_manager = StatusBarPluginManager()
         self.plugin_manager.load_plugins()
+        self.last_drawn = None # Assinatura do que está na tela (redesenha só quando muda)
+
+    def invalidate(self):
+        """A tela foi apagada: o próximo draw redesenha mesmo sem mudança."""
+        self.last_drawn = None
+
+    def _still_on_screen(self, stdscr, y, attr):
+        # stdscr.clear()/erase() fora do UI (janelas modais) também apagam a barra
+        try:
+            return (stdscr.inch(y, 0) & curses.A_ATTRIBUTES) == (attr & curses.A_ATTRIBUTES)
+        except curses.error:
+            return False
 
     def draw(self, ui, active_editor, active_split, system_info, status_message, active_filepath):
         height, width = ui.height, ui.width
@@ -13,16 +25,23 @@ class StatusBar:
         
         # --- Partes da Direita ---
         plugin_context = {'filepath': active_filepath, 'status_message': status_message, 'editor': active_editor}
-        plugin_statuses = self.plugin_manager.get_all_statuses(plugin_context)
+        plugin_statuses = self.plugin_manager.get_all_statuses(plugin_context, getattr(ui, 'plugin_metrics', None))
         
         # --- Partes da Esquerda ---
         pct = int((active_editor.cy + 1) / max(1, len(active_editor.lines)) * 100)
         error_msg = f" [ERR: {active_editor.linter_errors[active_editor.cy][0]}]" if active_editor.cy in active_editor.linter_errors else ""
         left_part_1 = f" {system_info} | Split:{active_split+1} | Ln {active_editor.cy + 1}/{len(active_editor.lines)} ({pct}%) | Col {active_editor.cx + 1} | {'[+] ' if active_editor.is_modified else ''}"
-        
+        message_attr = self.plugin_manager.get_message_color(status_message, ui) if status_message else None
+        statusbar_pair = getattr(ui, 'statusbar_pair', curses.A_REVERSE)
+
+        signature = (height, width, left_part_1, status_message, message_attr, error_msg,
+                     tuple((s['text'], s['color_name']) for s in plugin_statuses))
+        if signature == self.last_drawn and self._still_on_screen(stdscr, height - 1, statusbar_pair):
+            return
+        self.last_drawn = signature
+
         try:
             # 1. Desenha a barra de fundo
-            statusbar_pair = getattr(ui, 'statusbar_pair', curses.A_REVERSE)
             stdscr.attron(statusbar_pair)
             stdscr.addstr(height - 1, 0, " " * (width - 1))
             
@@ -33,7 +52,6 @@ class StatusBar:
 
             # Desenha a mensagem de status com cor customizada
             if status_message:
-                message_attr = self.plugin_manager.get_message_color(status_message, ui)
                 if message_attr:
                     stdscr.attroff(statusbar_pair)
                     stdscr.addstr(height - 1, current_x, status_message, message_attr)
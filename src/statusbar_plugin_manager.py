@@ -1,14 +1,54 @@
 # /home/johnb/tasma-code-absulut/src/statusbar_plugin_manager.py
 import os
+import time
+import threading
 import importlib.util
 import sys
 
+# Gatilho especial (além dos eventos do EventBus): o arquivo ativo mudou
+FILE_TRIGGER = "file"
+
+
+class StatusProvider:
+    """
+    Um plugin da barra de status. Plugins que declaram REFRESH_INTERVAL (segundos) e/ou
+    TRIGGERS (eventos do EventBus ou "file") rodam no worker e publicam segmentos em cache;
+    os outros continuam sendo chamados no quadro, como antes.
+    """
+    def __init__(self, name, func, interval=None, triggers=()):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.triggers = tuple(triggers)
+        self.segments = [] # Último resultado normalizado (lista de {'text', 'color_name'})
+        self.next_run = 0.0 # Primeira execução assim que o worker começa
+        self.due = True
+
+    @property
+    def is_async(self):
+        return bool(self.interval) or bool(self.triggers)
+
+
+def _normalize(status):
+    if isinstance(status, str):
+        return [{'text': status, 'color_name': None}] if status else []
+    if isinstance(status, list): # Assumes list of dicts
+        return status
+    return []
+
+
 class StatusBarPluginManager:
     def __init__(self, plugin_dir="plugins/statu_bar-plugins"):
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.plugin_dir = os.path.join(base_dir, plugin_dir)
-        self.plugins = []
+        self.plugins = [] # StatusProvider
         self.color_modifiers = []
+        self.metrics = None
+        self.context = {} # Último contexto publicado pelo quadro (lido pelo worker)
+        self.last_filepath = None
+        self.wake = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
         if not os.path.exists(self.plugin_dir):
             try:
                 os.makedirs(self.plugin_dir)
@@ -29,27 +69,108 @@ class StatusBarPluginManager:
                     sys.modules[plugin_name] = module
                     spec.loader.exec_module(module)
                     if hasattr(module, "get_status"):
-                        self.plugins.append(getattr(module, "get_status"))
+                        self.plugins.append(StatusProvider(
+                            item[:-3], getattr(module, "get_status"),
+                            getattr(module, "REFRESH_INTERVAL", None), getattr(module, "TRIGGERS", ())
+                        ))
                     if hasattr(module, "get_message_color_attr"):
                         self.color_modifiers.append(getattr(module, "get_message_color_attr"))
                 except Exception:
                     pass
 
-    def get_all_statuses(self, context):
-        statuses = []
-        # statuses will be a list of lists of dicts
-        for plugin_func in self.plugins:
+    # --- Worker dos provedores assíncronos ---------------------------------------
+
+    def start(self, events=None, metrics=None):
+        """Liga os gatilhos no EventBus e inicia o worker (só se houver provedor assíncrono)."""
+        self.metrics = metrics
+        providers = [p for p in self.plugins if p.is_async]
+        if not providers or self.thread is not None:
+            return
+        if events is not None:
+            for event in {t for p in providers for t in p.triggers if t != FILE_TRIGGER}:
+                try:
+                    events.subscribe(event, lambda payloads, event=event: self.trigger(event), mode="coalesce")
+                except ValueError:
+                    pass # Evento desconhecido declarado pelo plugin
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def trigger(self, event):
+        """Marca para atualizar os provedores que dependem do evento."""
+        woke = False
+        for provider in self.plugins:
+            if event in provider.triggers:
+                provider.due = True
+                woke = True
+        if woke:
+            self.wake.set()
+
+    def _loop(self):
+        while not self.stop_event.is_set():
+            # Limpa antes de olhar 'due': um trigger() que chega durante a varredura acorda o wait
+            self.wake.clear()
+            now = time.time()
+            for provider in self.plugins:
+                if not provider.is_async:
+                    continue
+                if provider.interval and now >= provider.next_run:
+                    provider.due = True
+                if provider.due:
+                    provider.due = False
+                    self._refresh(provider)
+                    if provider.interval:
+                        provider.next_run = time.time() + provider.interval
+            # Dorme até o próximo intervalo ou até um gatilho
+            deadlines = [p.next_run for p in self.plugins if p.is_async and p.interval]
+            timeout = max(0.0, min(deadlines) - time.time()) if deadlines else None
+            self.wake.wait(timeout)
+
+    def _refresh(self, provider):
+        context = dict(self.context)
+        if self.metrics is not None:
+            status = self.metrics.call(provider.name, "provider", provider.func, context)
+        else:
             try:
-                status = plugin_func(context)
-                if status:
-                    # Normalize to a list of dicts
-                    if isinstance(status, str):
-                        statuses.append([{'text': status, 'color_name': None}])
-                    elif isinstance(status, list): # Assumes list of dicts
-                        statuses.append(status)
+                status = provider.func(context)
             except Exception:
-                pass
-        
+                status = None
+        # Troca a referência inteira: o quadro nunca vê uma lista pela metade
+        provider.segments = _normalize(status)
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake.set()
+
+    # --- Quadro -----------------------------------------------------------------
+
+    def get_all_statuses(self, context, metrics=None):
+        """
+        Compõe os segmentos da direita. Provedores assíncronos só contribuem o cache; o contexto
+        publicado para o worker não leva o Editor (ele muda no thread principal).
+        """
+        self.context = {k: v for k, v in context.items() if k != 'editor'}
+        editor = context.get('editor')
+        if editor is not None:
+            self.context.update(line=editor.cy, col=editor.cx, modified=editor.is_modified,
+                                line_count=len(editor.lines))
+        if context.get('filepath') != self.last_filepath:
+            self.last_filepath = context.get('filepath')
+            self.trigger(FILE_TRIGGER)
+
+        statuses = []
+        for provider in self.plugins:
+            if provider.is_async:
+                segments = provider.segments
+            elif metrics is not None:
+                segments = _normalize(metrics.call(provider.name, "status", provider.func, context))
+            else:
+                try:
+                    segments = _normalize(provider.func(context))
+                except Exception:
+                    segments = []
+            if segments:
+                statuses.append(segments)
+
         # Flatten and add separators
         flat_list = []
         for i, group in enumerate(statuses):
@@ -69,4 +190,4 @@ class StatusBarPluginManager:
                     return attr # Retorna o primeiro que encontrar
             except Exception:
                 pass
-        return None # Retorna None se nenhum plugin retornar uma cor
\ No newline at end of file
+        return None # Retorna None se nenhum plugin retornar uma cor
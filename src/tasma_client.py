@@ -0,0 +1,44 @@
+# /home/johnb/tasma-code-absulut/src/tasma_client.py
+"""
+Cliente leve do editor: abre arquivos numa instância já aberta (como emacsclient/nvr).
+    python src/tasma_client.py arquivo.py:42 outro.txt
+Sem instância aberta, inicia o editor normalmente com todos os arquivos.
+"""
+import os
+import sys
+import json
+import socket
+from server import default_socket_path, is_trusted, parse_target
+
+
+def send_open(targets, socket_path=None):
+    """Envia os pedidos de abertura. Retorna False se não há servidor escutando (ou não é confiável)."""
+    socket_path = socket_path or default_socket_path()
+    if not is_trusted(socket_path):
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(2)
+            sock.connect(socket_path)
+            reader = sock.makefile('r', encoding='utf-8')
+            for path, line in targets:
+                sock.sendall((json.dumps({"cmd": "open", "path": path, "line": line}) + "\n").encode('utf-8'))
+                reply = json.loads(reader.readline() or "{}")
+                if not reply.get("ok"):
+                    print(f"Erro ao abrir {path}: {reply.get('error', 'sem resposta')}", file=sys.stderr)
+        return True
+    except (OSError, ValueError, AttributeError):
+        return False
+
+
+def main(argv):
+    targets = [parse_target(arg) for arg in argv]
+    if targets and send_open(targets):
+        return 0
+    # Nenhuma instância aberta: vira o próprio editor (ele também entende 'arquivo:linha')
+    main_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    os.execv(sys.executable, [sys.executable, main_py] + argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -17,6 +17,7 @@ class UI:
         self.height, self.width = stdscr.getmaxyx()
         self.right_sidebar_plugin = None # Plugin registrado para a direita
         self.left_sidebar_plugin = None # Plugin registrado para a esquerda
+        self.plugin_metrics = None # PluginMetrics: mede e limita o draw dos plugins
         self.status_bar = StatusBar()
         
         # Configurações do Curses
@@ -88,12 +89,22 @@ class UI:
         active_color = self.active_tab_pairs.get(color_name, curses.color_pair(4))
         return icon, sidebar_color, active_color
 
+    def _draw_plugin(self, plugin, x, y, height, width):
+        """Desenha a sidebar de um plugin (medida e sujeita ao orçamento de tempo, se houver métricas)."""
+        if self.plugin_metrics is None:
+            plugin.draw(self.stdscr, x, y, height, width)
+            return
+        name = getattr(plugin, 'name', type(plugin).__name__)
+        self.plugin_metrics.call(name, "draw", plugin.draw, self.stdscr, x, y, height, width)
+
     def get_input(self):
-        """Captura uma tecla pressionada."""
+        """Captura uma tecla pressionada. Retorna None se o timeout do stdscr passou sem tecla."""
         try:
             return self.stdscr.get_wch()
-        except (AttributeError, curses.error):
-            return self.stdscr.getch()
+        except AttributeError:
+            return self.stdscr.getch() # curses sem get_wch
+        except curses.error:
+            return None # Timeout: chamar getch() aqui esperaria um segundo timeout inteiro
 
     def update_dimensions(self):
         """Atualiza dimensões se o terminal for redimensionado."""
@@ -256,22 +267,34 @@ class UI:
         try: self.stdscr.addstr(1, 0, "─" * width)
         except curses.error: pass
 
-        # Itens
+        # Itens (virtualizado: só as linhas da janela visível são montadas)
         start_y = 2
         max_items = self.height - 3
         scroll = 0
         if selection_index >= max_items:
             scroll = selection_index - max_items + 1
             
-        for i, item in enumerate(items[scroll:]):
-            if i >= max_items: break
+        for i in range(min(max_items, len(items) - scroll)):
+            item = items[scroll + i]
             y = start_y + i
             style = curses.color_pair(5)
             if i + scroll == selection_index:
                 style = curses.A_REVERSE | (curses.color_pair(4) if focus else curses.color_pair(5))
             
             # Adiciona ícone e nome
-            if isinstance(item, tuple):
+            indent = ""
+            if isinstance(item, tuple) and len(item) == 4:
+                # Linha da árvore: (nome, is_dir, profundidade, caminho)
+                name, is_dir, depth, _ = item
+                icon, sidebar_icon_color, _ = self.get_file_icon(name, is_dir)
+                marker = ""
+                if is_dir and name != "..":
+                    next_item = items[scroll + i + 1] if scroll + i + 1 < len(items) else None
+                    is_open = next_item is not None and next_item[2] > depth
+                    marker = "▾" if is_open else "▸"
+                indent = "  " * depth
+                display_name = f"{marker}{name}" if marker else f" {name}"
+            elif isinstance(item, tuple):
                 name, is_dir = item
                 icon, sidebar_icon_color, _ = self.get_file_icon(name, is_dir)
                 display_name = f" {name}"
@@ -285,17 +308,19 @@ class UI:
             else:
                 continue
 
-            if len(display_name) > width - 2:
-                display_name = display_name[:width-3] + "…"
+            indent = indent[:max(0, width - 8)]
+            if len(display_name) > width - 2 - len(indent):
+                display_name = display_name[:width - 3 - len(indent)] + "…"
             
             try:
+                icon_x = 1 + len(indent)
                 if i + scroll == selection_index:
                     # Item selecionado: tudo com cor de seleção (geralmente reverso)
-                    self.stdscr.addstr(y, 1, f"{icon}{display_name}", style)
+                    self.stdscr.addstr(y, icon_x, f"{icon}{display_name}", style)
                 else:
                     # Item normal: ícone colorido, texto padrão
-                    self.stdscr.addstr(y, 1, icon, sidebar_icon_color)
-                    self.stdscr.addstr(y, 2, display_name, style)
+                    self.stdscr.addstr(y, icon_x, icon, sidebar_icon_color)
+                    self.stdscr.addstr(y, icon_x + 1, display_name, style)
             except curses.error: pass
             except curses.error: pass
 
@@ -309,6 +334,7 @@ class UI:
         if layout_changed:
             self.stdscr.erase()
             for ed in editors: ed.mark_all_dirty()
+            self.status_bar.invalidate()
             self.last_sidebar_visible = show_sidebar
             self.last_split_mode = split_mode
 
@@ -317,7 +343,7 @@ class UI:
         sidebar_width = 0
         if self.left_sidebar_plugin and self.left_sidebar_plugin.is_visible:
             sidebar_width = 25
-            self.left_sidebar_plugin.draw(self.stdscr, 0, 0, self.height - 1, sidebar_width)
+            self._draw_plugin(self.left_sidebar_plugin, 0, 0, self.height - 1, sidebar_width)
         elif show_sidebar:
             sidebar_width = 25
             self.draw_sidebar(sidebar_items, sidebar_selection, sidebar_focus, sidebar_width - 1, sidebar_path)
@@ -406,7 +432,7 @@ class UI:
             # Vamos assumir que o plugin gerencia seu estado visual ou simplificar.
             # Na verdade, o plugin não sabe se tem foco global. Vamos alterar a chamada no main.py para passar o foco?
             # Não, o UI.draw é chamado pelo main. Vamos adicionar um parametro opcional no UI.draw ou deixar o plugin desenhar o cursor se tiver texto.
-            self.right_sidebar_plugin.draw(self.stdscr, self.width - right_sidebar_w, content_start_y, display_height, right_sidebar_w)
+            self._draw_plugin(self.right_sidebar_plugin, self.width - right_sidebar_w, content_start_y, display_height, right_sidebar_w)
 
         # Barra de Status (Global)
         active_editor = editors[active_split]
@@ -482,6 +508,16 @@ class UI:
             lines_to_draw = [i for i in range(h) if (i + editor.scroll_offset_y) < len(visual_indices) and 
                              visual_indices[i + editor.scroll_offset_y] in editor.dirty_lines]
 
+        # Marcadores só da faixa visível (uma consulta por tipo, não uma por linha)
+        first_visible = visual_indices[editor.scroll_offset_y] if editor.scroll_offset_y < len(visual_indices) else 0
+        last_visible = visual_indices[min(len(visual_indices), editor.scroll_offset_y + h) - 1] if visual_indices else 0
+        marks = editor.markers.visible(first_visible, last_visible + 1)
+        folds = marks.get("fold", {})
+        bookmarks = marks.get("bookmark", {})
+        diagnostics = marks.get("diagnostic", {})
+        search_hits = marks.get("search", {})
+        decorations = marks.get("decoration", {})
+
         # Desenhar linhas visíveis
         for i in lines_to_draw:
             vis_idx = i + editor.scroll_offset_y
@@ -491,7 +527,7 @@ class UI:
             file_line_idx = visual_indices[vis_idx]
             line_content = editor.lines[file_line_idx]
             
-            if file_line_idx in editor.folds:
+            if file_line_idx in folds:
                 line_content += " ..."
             
             # Adjust y-coordinate for content drawing
@@ -511,16 +547,19 @@ class UI:
                 line_attr = curses.A_BOLD | curses.color_pair(1) # Realce linha atual
             
             # Marcadores
-            if file_line_idx in editor.bookmarks:
+            if file_line_idx in bookmarks:
                 line_attr = curses.color_pair(7) | curses.A_BOLD # Vermelho para bookmark
             
             # Linter Errors
             linter_char = "│"
-            if file_line_idx in editor.linter_errors:
+            if file_line_idx in decorations:
+                # Decoração de plugin: um caractere na calha
+                linter_char = str(decorations[file_line_idx])[:1] or "│"
+            if file_line_idx in diagnostics:
                 linter_char = "E"
                 line_attr = curses.color_pair(8) | curses.A_BOLD
             
-            fold_char = "+" if file_line_idx in editor.folds else " "
+            fold_char = "+" if file_line_idx in folds else " "
             
             try:
                 self.stdscr.addstr(screen_y_for_content, x, f"{line_num_str}{fold_char}{linter_char}", line_attr)
@@ -550,6 +589,11 @@ class UI:
                     if highlight_text:
                         self._addstr_clipped(screen_y_for_content, screen_x_for_highlight, highlight_text, curses.A_REVERSE, min_x=total_left_margin)
             
+            # Ocorrências da última busca
+            for hit_start, hit_end in search_hits.get(file_line_idx, ()):
+                hit_x = hit_start - editor.scroll_offset_x + total_left_margin
+                self._addstr_clipped(screen_y_for_content, hit_x, line_content[hit_start:hit_end], curses.A_UNDERLINE | curses.A_BOLD, min_x=total_left_margin)
+
             # Highlight matching bracket
             if matching_bracket:
                 mb_y, mb_x = matching_bracket